@@ -3,3 +3,9 @@
 __author__ = 'Rafael Lopes Conde dos Reis'
 __email__ = 'rafael.lcreis@gmail.com'
 __version__ = '1.0.0'
+
+try:
+    from .stream import subscribe  # noqa: F401
+except SyntaxError:
+    # Python 2 has no asynchronous iterators
+    pass
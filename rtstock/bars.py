@@ -0,0 +1,239 @@
+"""
+Bars module.
+
+This module contains the bar aggregator, which builds OHLCV bars from live
+quotes. Bars are emitted in the same shape request_historical() returns for
+daily bars.
+"""
+
+from __future__ import unicode_literals
+import array
+import time
+
+from .symbols import intern_symbol, ticker_of
+from .utils import to_float
+
+INTERVALS = {'1s': 1, '5s': 5, '1m': 60, '5m': 300, '15m': 900,
+             '30m': 1800, '1h': 3600}
+
+
+class BarAggregator(object):
+    """Class for handling bar aggregation.
+
+    Keeps the open bar of every ticker in flat arrays indexed by ticker slot,
+    so updates cost a few array writes. All bars are aligned to multiples of
+    the interval since the epoch (UTC). When an update falls on a new
+    interval, every open bar is closed and emitted. Call advance() on a timer
+    to close bars of tickers that stopped updating. Updates older than the
+    current interval are dropped and counted on late. Tickers can be given
+    by their ids on the global symbol table as well.
+
+    Quote volumes are the cumulative daily volume, so by default the volume
+    of a bar is the growth of that figure during the bar.
+
+    >>> from rtstock.bars import BarAggregator
+    >>>
+    >>> bars = BarAggregator('1m')
+    >>> bars.update('AAPL', 95.89, 33169600, timestamp=1456842600)
+    []
+    >>> bars.update('AAPL', 95.95, 33170000, timestamp=1456842660)
+    [
+        ('AAPL',
+         {
+             'Close': '95.89',
+             'Low': '95.89',
+             'High': '95.89',
+             'Adj_Close': '95.89',
+             'Date': '2016-03-01 14:30:00',
+             'Open': '95.89',
+             'Volume': '0'
+         })
+    ]
+
+    :param interval: Bar interval, one of INTERVALS' keys or a number of
+        seconds, defaults to '1m'
+    :type interval: string or integer, optional
+    :param on_bar: Function called with the ticker and the bar of every
+        closed bar, defaults to None
+    :type on_bar: function, optional
+    :param cumulative_volume: Whether volumes are cumulative, defaults to True
+    :type cumulative_volume: boolean, optional
+    """
+
+    def __init__(self, interval='1m', on_bar=None, cumulative_volume=True):
+        """Instantiate BarAggregator class."""
+        self.interval = INTERVALS.get(interval, interval)
+        if not isinstance(self.interval, int) or self.interval <= 0:
+            raise ValueError("Interval should be one of " +
+                             ', '.join(sorted(INTERVALS)) +
+                             " or a positive number of seconds.")
+        self.on_bar = on_bar
+        self.cumulative_volume = cumulative_volume
+        self.late = 0
+        self.tickers = []
+        self.__slots = {}
+        self.__open = array.array('d')
+        self.__high = array.array('d')
+        self.__low = array.array('d')
+        self.__close = array.array('d')
+        self.__volume = array.array('d')
+        self.__last_volume = array.array('d')
+        self.__active = []
+        self.__is_active = array.array('b')
+        self.__period = None
+
+    def __repr__(self):
+        """An unambiguous representation of a BarAggregator's instance."""
+        return '<BarAggregator {interval}s {n} tickers>'.format(
+            interval=self.interval, n=len(self.tickers))
+
+    def update(self, ticker, price, volume=None, timestamp=None):
+        """Update the open bar of a ticker.
+
+        :param ticker: Stock ticker in Yahoo Finances format, or its symbol id.
+        :type ticker: string or integer
+        :param price: Last trade price.
+        :type price: float
+        :param volume: Cumulative or traded volume, defaults to None
+        :type volume: float, optional
+        :param timestamp: Seconds since the epoch, defaults to now
+        :type timestamp: float, optional
+        :returns: Bars closed by this update, as (ticker, bar) tuples.
+        :rtype: list of tuples
+        """
+        timestamp = time.time() if timestamp is None else timestamp
+        closed = self.advance(timestamp)
+        if timestamp < self.__period:
+            self.late += 1
+            return closed
+
+        slot = self.__slots.get(ticker)
+        if slot is None:
+            slot = self.__add(ticker)
+
+        traded = 0.0
+        if volume is not None and volume == volume:
+            if not self.cumulative_volume:
+                traded = volume
+            else:
+                last = self.__last_volume[slot]
+                if last == last:
+                    # The cumulative volume restarts every day
+                    traded = volume - last if volume >= last else volume
+                self.__last_volume[slot] = volume
+
+        if self.__is_active[slot]:
+            if price > self.__high[slot]:
+                self.__high[slot] = price
+            if price < self.__low[slot]:
+                self.__low[slot] = price
+            self.__close[slot] = price
+            self.__volume[slot] += traded
+        else:
+            self.__open[slot] = self.__high[slot] = price
+            self.__low[slot] = self.__close[slot] = price
+            self.__volume[slot] = traded
+            self.__is_active[slot] = 1
+            self.__active.append(slot)
+        return closed
+
+    def update_quotes(self, quotes, timestamp=None):
+        """Update the bars with the quotes returned by request_quotes().
+
+        Quotes need the Symbol and LastTradePriceOnly fields, and may have a
+        Volume field. Quotes without a price are skipped.
+
+        :param quotes: Quotes.
+        :type quotes: list of dictionaries
+        :param timestamp: Seconds since the epoch, defaults to now
+        :type timestamp: float, optional
+        :returns: Bars closed by these updates, as (ticker, bar) tuples.
+        :rtype: list of tuples
+        """
+        timestamp = time.time() if timestamp is None else timestamp
+        closed = []
+        for quote in quotes:
+            price = to_float(quote.get('LastTradePriceOnly'))
+            if price == price:
+                closed.extend(self.update(quote['Symbol'], price,
+                                          to_float(quote.get('Volume')),
+                                          timestamp))
+        return closed
+
+    def advance(self, timestamp=None):
+        """Close the open bars if timestamp is past their interval.
+
+        :param timestamp: Seconds since the epoch, defaults to now
+        :type timestamp: float, optional
+        :returns: Closed bars, as (ticker, bar) tuples.
+        :rtype: list of tuples
+        """
+        timestamp = time.time() if timestamp is None else timestamp
+        period = int(timestamp // self.interval) * self.interval
+        if self.__period is None:
+            self.__period = period
+        if period <= self.__period:
+            return []
+        closed = self.flush()
+        self.__period = period
+        return closed
+
+    def flush(self):
+        """Close every open bar, whatever the time.
+
+        :returns: Closed bars, as (ticker, bar) tuples.
+        :rtype: list of tuples
+        """
+        if not self.__active:
+            return []
+        date = time.strftime('%Y-%m-%d %H:%M:%S', time.gmtime(self.__period))
+        closed = []
+        for slot in self.__active:
+            self.__is_active[slot] = 0
+            bar = {
+                'Date': date,
+                'Open': repr(self.__open[slot]),
+                'High': repr(self.__high[slot]),
+                'Low': repr(self.__low[slot]),
+                'Close': repr(self.__close[slot]),
+                'Adj_Close': repr(self.__close[slot]),
+                'Volume': str(int(self.__volume[slot])),
+            }
+            closed.append((self.tickers[slot], bar))
+        self.__active = []
+        if self.on_bar is not None:
+            for ticker, bar in closed:
+                self.on_bar(ticker, bar)
+        return closed
+
+    def current(self, ticker):
+        """Get the open bar of a ticker.
+
+        :param ticker: Stock ticker in Yahoo Finances format, or its symbol id.
+        :type ticker: string or integer
+        :returns: Open, high, low, close and volume, None if the ticker has
+            no open bar.
+        :rtype: tuple of floats or None
+        """
+        slot = self.__slots.get(ticker)
+        if slot is None or not self.__is_active[slot]:
+            return None
+        return (self.__open[slot], self.__high[slot], self.__low[slot],
+                self.__close[slot], self.__volume[slot])
+
+    def __add(self, symbol):
+        """Allocate a slot for a ticker, found by ticker and symbol id."""
+        ticker = ticker_of(symbol)
+        slot = self.__slots.get(ticker)
+        if slot is not None:
+            self.__slots[symbol] = slot
+            return slot
+        slot = len(self.tickers)
+        self.__slots[ticker] = self.__slots[intern_symbol(ticker)] = slot
+        self.tickers.append(ticker)
+        for column in (self.__open, self.__high, self.__low, self.__close,
+                       self.__volume):
+            column.append(0.0)
+        self.__last_volume.append(float('nan'))
+        self.__is_active.append(0)
+        return slot
@@ -0,0 +1,192 @@
+"""
+Batching module.
+
+This module contains the adaptive batcher, which chooses how many tickers go
+into each YQL request. Chunks are kept under a maximum encoded URL length and
+their size is tuned from the latency observed on previous responses, so as to
+maximize the number of tickers retrieved per second.
+"""
+
+from __future__ import unicode_literals
+import threading
+
+
+class AdaptiveBatcher(object):
+    """Class for handling adaptive batch sizes.
+
+    Batch sizes are taken from a geometric grid between min_size and
+    max_size. For every size on the grid that has been tried, the batcher
+    keeps a moving average of the throughput (tickers per second) of the
+    requests filed under it, computed with their real size, and picks the
+    size with the best one. Untried neighbours of the best size
+    are explored as well, so the batcher climbs towards the optimum as the
+    latency curve is learnt. A batcher can be shared between threads.
+
+    >>> from rtstock.batching import AdaptiveBatcher
+    >>>
+    >>> batcher = AdaptiveBatcher(max_url_length=2000)
+    >>> batcher.observe(50, 0.8)
+    >>> batcher.observe(75, 1.0)
+    >>> batcher.batch_size()
+    112
+
+    :param max_url_length: Maximum length of an encoded request URL,
+        defaults to 2000
+    :type max_url_length: integer, optional
+    :param min_size: Smallest batch size, defaults to 1
+    :type min_size: integer, optional
+    :param max_size: Largest batch size, defaults to 1000
+    :type max_size: integer, optional
+    :param initial_size: Batch size used before any observation, defaults to 50
+    :type initial_size: integer, optional
+    :param growth: Ratio between consecutive sizes of the grid, defaults to 1.5
+    :type growth: float, optional
+    :param smoothing: Weight of a new throughput sample on the moving
+        average, defaults to 0.3
+    :type smoothing: float, optional
+    """
+
+    def __init__(self, max_url_length=2000, min_size=1, max_size=1000,
+                 initial_size=50, growth=1.5, smoothing=0.3):
+        """Instantiate AdaptiveBatcher class."""
+        if not 1 <= min_size <= initial_size <= max_size:
+            raise ValueError("Sizes should satisfy " +
+                             "1 <= min_size <= initial_size <= max_size.")
+        if growth <= 1:
+            raise ValueError("Growth should be greater than 1.")
+        self.max_url_length = max_url_length
+        self.smoothing = smoothing
+        self.__sizes = self.__grid(min_size, max_size, initial_size, growth)
+        self.__limit = len(self.__sizes) - 1
+        self.__current = self.__sizes.index(initial_size)
+        self.__throughput = {}
+        self.__lock = threading.Lock()
+
+    def batch_size(self):
+        """Get the batch size that should be used next.
+
+        :returns: Number of tickers per request.
+        :rtype: integer
+        """
+        return self.__sizes[self.__current]
+
+    def throughput(self, size):
+        """Get the estimated throughput of a batch size.
+
+        :param size: Batch size.
+        :type size: integer
+        :returns: Estimated tickers per second, None if size was never tried.
+        :rtype: float or None
+        """
+        return self.__throughput.get(self.__position(size))
+
+    def observe(self, size, latency):
+        """Record the latency of a successful request.
+
+        Requests smaller than the grid size they are filed under, like the
+        leftovers of a split, count with their real size.
+
+        :param size: Number of tickers in the request.
+        :type size: integer
+        :param latency: Response time in seconds.
+        :type latency: float
+        """
+        position = self.__position(size)
+        throughput = size / max(latency, 1e-9)
+        with self.__lock:
+            previous = self.__throughput.get(position)
+            if previous is None:
+                self.__throughput[position] = throughput
+            else:
+                self.__throughput[position] = previous + \
+                    self.smoothing * (throughput - previous)
+            self.__choose()
+
+    def observe_failure(self, size):
+        """Record a request that failed because of its size.
+
+        Sizes from the failing one upwards are no longer used, for instance
+        after a timeout or an URL rejected for being too long.
+
+        :param size: Number of tickers in the request.
+        :type size: integer
+        """
+        with self.__lock:
+            self.__limit = max(0, min(self.__limit,
+                                      self.__position(size) - 1))
+            for position in list(self.__throughput):
+                if position > self.__limit:
+                    del self.__throughput[position]
+            self.__current = min(self.__current, self.__limit)
+            self.__choose()
+
+    def split(self, items, base_length=0, item_length=len):
+        """Split items into batches.
+
+        Each batch holds at most batch_size() items and its encoded URL,
+        estimated as base_length plus the item_length of every item, does not
+        exceed max_url_length. A single item is always sent on its own, even
+        if it exceeds the limit.
+
+        :param items: Items to be split, usually tickers.
+        :type items: list
+        :param base_length: Length of the URL without any item, defaults to 0
+        :type base_length: integer, optional
+        :param item_length: Function giving the length an item adds to the
+            URL, defaults to len
+        :type item_length: function, optional
+        :returns: Batches in the original order.
+        :rtype: list of lists
+        """
+        size = self.batch_size()
+        batches = []
+        batch = []
+        length = base_length
+        for item in items:
+            extra = item_length(item)
+            if batch and (len(batch) >= size or
+                          length + extra > self.max_url_length):
+                batches.append(batch)
+                batch = []
+                length = base_length
+            batch.append(item)
+            length += extra
+        if batch:
+            batches.append(batch)
+        return batches
+
+    def __choose(self):
+        """Choose the next batch size."""
+        tried = [p for p in self.__throughput if p <= self.__limit]
+        if not tried:
+            return
+        best = max(tried, key=self.__throughput.get)
+        # Explore an untried neighbour of the best size, bigger ones first
+        for position in (best + 1, best - 1):
+            if 0 <= position <= self.__limit and \
+                    position not in self.__throughput:
+                self.__current = position
+                return
+        self.__current = best
+
+    def __position(self, size):
+        """Position on the grid of the closest size not above size."""
+        position = 0
+        for i, grid_size in enumerate(self.__sizes):
+            if grid_size <= size:
+                position = i
+        return position
+
+    @staticmethod
+    def __grid(min_size, max_size, initial_size, growth):
+        """Build the geometric grid of sizes through initial_size."""
+        sizes = set([min_size, initial_size, max_size])
+        size = float(initial_size)
+        while size < max_size:
+            sizes.add(int(size))
+            size *= growth
+        size = float(initial_size)
+        while size > min_size:
+            sizes.add(int(size))
+            size /= growth
+        return sorted(s for s in sizes if min_size <= s <= max_size)
@@ -0,0 +1,307 @@
+"""
+Board module.
+
+This module contains the shared-memory quote board. A single publisher
+process polls the quotes and writes them into shared memory, where every
+process on the host can read them without further requests. It requires
+Python 3.8 or later.
+"""
+
+from __future__ import unicode_literals
+import struct
+import time
+
+try:
+    from multiprocessing import shared_memory
+except ImportError:
+    shared_memory = None
+
+from .symbols import position_index
+from .utils import request_quotes_batched, to_float
+
+MAGIC = b'RTSBOARD'
+VERSION = 1
+_HEADER = struct.Struct('<8sIIII')
+_FIELD_WIDTH = 32
+_TICKER_WIDTH = 16
+
+
+class QuoteBoard(object):
+    """Class for handling a shared-memory quote board.
+
+    The board has a fixed layout: a header, the field names, the tickers and
+    one slot per ticker. A slot holds a version counter, the time of the last
+    update and one float64 per field. Writers make the version odd while
+    updating a slot and even again when done, so readers retry whenever they
+    see an odd version or the version changed during the read (seqlock). Only
+    one process should write to a board.
+
+    >>> from rtstock.board import QuoteBoard
+    >>>
+    >>> # Publisher process
+    >>> board = QuoteBoard.create('quotes', ['AAPL', 'YHOO'],
+    ...                           ['LastTradePriceOnly', 'Volume'])
+    >>> run_publisher(board, interval=1)
+    >>>
+    >>> # Any other process
+    >>> board = QuoteBoard.attach('quotes')
+    >>> board.read('AAPL')
+    ((95.89, 33169600.0), 1469649600.0)
+
+    :param shm: Shared memory block holding the board.
+    :type shm: multiprocessing.shared_memory.SharedMemory
+    """
+
+    def __init__(self, shm):
+        """Instantiate QuoteBoard class."""
+        self.shm = shm
+        magic, version, nslots, nfields, _ = _HEADER.unpack_from(shm.buf)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError("Shared memory block is not a quote board.")
+        offset = _HEADER.size
+        self.fields = _names(shm.buf, offset, nfields, _FIELD_WIDTH)
+        offset += nfields * _FIELD_WIDTH
+        self.tickers = _names(shm.buf, offset, nslots, _TICKER_WIDTH)
+        offset += nslots * _TICKER_WIDTH
+        self.slot_index = position_index(self.tickers)
+        self.__stride = nfields + 2
+        data = shm.buf[offset:offset + nslots * self.__stride * 8]
+        self.__words = data.cast('Q')
+        self.__values = data.cast('d')
+        data.release()
+
+    @classmethod
+    def create(cls, name, tickers_list, fields):
+        """Create a board in a new shared memory block.
+
+        :param name: Name of the shared memory block, None for a random one.
+        :type name: string or None
+        :param tickers_list: Tickers of the slots.
+        :type tickers_list: list of strings
+        :param fields: Numeric fields of each slot.
+        :type fields: list of strings
+        :returns: Board.
+        :rtype: QuoteBoard
+        """
+        _require_shared_memory()
+        size = _HEADER.size + len(fields) * _FIELD_WIDTH + \
+            len(tickers_list) * (_TICKER_WIDTH + (len(fields) + 2) * 8)
+        shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        _HEADER.pack_into(shm.buf, 0, MAGIC, VERSION, len(tickers_list),
+                         len(fields), 0)
+        offset = _HEADER.size
+        for field in fields:
+            _pack_name(shm.buf, offset, field, _FIELD_WIDTH)
+            offset += _FIELD_WIDTH
+        for ticker in tickers_list:
+            _pack_name(shm.buf, offset, ticker, _TICKER_WIDTH)
+            offset += _TICKER_WIDTH
+        board = cls(shm)
+        for i in range(len(board.tickers)):
+            base = i * board.__stride
+            for j in range(1, board.__stride):
+                board.__values[base + j] = float('nan')
+        return board
+
+    @classmethod
+    def attach(cls, name):
+        """Attach to an existing board.
+
+        :param name: Name of the shared memory block.
+        :type name: string
+        :returns: Board.
+        :rtype: QuoteBoard
+        """
+        _require_shared_memory()
+        try:
+            # Readers must not unlink the block when they exit
+            shm = shared_memory.SharedMemory(name=name, track=False)
+        except TypeError:
+            shm = shared_memory.SharedMemory(name=name)
+        return cls(shm)
+
+    @property
+    def name(self):
+        """Name of the shared memory block."""
+        return self.shm.name
+
+    def __repr__(self):
+        """An unambiguous representation of a QuoteBoard's instance."""
+        return '<QuoteBoard {name} {n} tickers>'.format(
+            name=self.name, n=len(self.tickers))
+
+    def __enter__(self):
+        """Enter the context."""
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        """Close the board on leaving the context."""
+        self.close()
+
+    def write(self, ticker, values, updated=None):
+        """Write the values of a ticker.
+
+        :param ticker: Stock ticker in Yahoo Finances format, or its symbol id.
+        :type ticker: string or integer
+        :param values: One value per field, in the board's field order.
+        :type values: list of floats
+        :param updated: Time of the update, defaults to now
+        :type updated: float, optional
+        :raises: KeyError, ValueError
+        """
+        base = self.slot_index[ticker] * self.__stride
+        if len(values) != len(self.fields):
+            raise ValueError("Expected {0} values, one per field, got "
+                             "{1}.".format(len(self.fields), len(values)))
+        # Converted before the update starts, so a bad value cannot leave
+        # the slot locked
+        values = [float(v) for v in values]
+        words = self.__words
+        words[base] += 1
+        data = self.__values
+        data[base + 1] = time.time() if updated is None else updated
+        for j, value in enumerate(values, base + 2):
+            data[j] = value
+        words[base] += 1
+
+    def publish(self, quotes, updated=None):
+        """Write quotes to the board.
+
+        Quotes are matched to slots by their Symbol field. Quotes of tickers
+        without a slot are ignored.
+
+        :param quotes: Quotes as returned by request_quotes().
+        :type quotes: list of dictionaries
+        :param updated: Time of the update, defaults to now
+        :type updated: float, optional
+        """
+        updated = time.time() if updated is None else updated
+        for quote in quotes:
+            ticker = quote.get('Symbol')
+            if ticker in self.slot_index:
+                self.write(ticker, [to_float(quote.get(f))
+                                    for f in self.fields], updated)
+
+    def read(self, ticker, timeout=1.0):
+        """Read the values of a ticker.
+
+        Retries while the slot is being written, for up to timeout seconds,
+        since a writer that died halfway through an update leaves the slot
+        locked forever.
+
+        :param ticker: Stock ticker in Yahoo Finances format, or its symbol id.
+        :type ticker: string or integer
+        :param timeout: Seconds to retry a slot being written, defaults to 1
+        :type timeout: float, optional
+        :returns: One value per field, NaN if never written, and the time of
+            the last update, NaN if never written.
+        :rtype: tuple of (tuple of floats, float)
+        :raises: KeyError, TimeoutError
+        """
+        base = self.slot_index[ticker] * self.__stride
+        words = self.__words
+        values = self.__values
+        end = base + self.__stride
+        deadline = None
+        while True:
+            version = words[base]
+            if not version & 1:
+                updated = values[base + 1]
+                row = tuple(values[base + 2:end])
+                if words[base] == version:
+                    return row, updated
+            if deadline is None:
+                deadline = time.time() + timeout
+            elif time.time() > deadline:
+                raise TimeoutError("The slot of {0} is still being written "
+                                   "after {1} seconds.".format(ticker,
+                                                               timeout))
+
+    def read_dict(self, ticker, timeout=1.0):
+        """Read the values of a ticker as a dictionary.
+
+        :param ticker: Stock ticker in Yahoo Finances format, or its symbol id.
+        :type ticker: string or integer
+        :param timeout: Seconds to retry a slot being written, defaults to 1
+        :type timeout: float, optional
+        :returns: Values by field name.
+        :rtype: dictionary
+        :raises: KeyError, TimeoutError
+        """
+        row, _ = self.read(ticker, timeout)
+        return dict(zip(self.fields, row))
+
+    def version(self, ticker):
+        """Get the version of a ticker's slot.
+
+        The version grows by two on every write, so it can be used to poll
+        for changes cheaply.
+
+        :param ticker: Stock ticker in Yahoo Finances format, or its symbol id.
+        :type ticker: string or integer
+        :rtype: integer
+        """
+        return self.__words[self.slot_index[ticker] * self.__stride]
+
+    def close(self):
+        """Detach from the shared memory block."""
+        self.__words.release()
+        self.__values.release()
+        self.shm.close()
+
+    def unlink(self):
+        """Destroy the shared memory block.
+
+        Should be called once, by the publisher, when the board is no longer
+        needed.
+        """
+        self.shm.unlink()
+
+
+def run_publisher(board, interval=1.0, stop=None, batcher=None):
+    """Poll the quotes of a board's tickers and publish them.
+
+    Runs until stop is set.
+
+    :param board: Board to be published to.
+    :type board: QuoteBoard
+    :param interval: Seconds between polls, defaults to 1
+    :type interval: float, optional
+    :param stop: Event that stops the publisher when set, defaults to None
+    :type stop: threading.Event or multiprocessing.Event, optional
+    :param batcher: Batcher choosing the batch sizes, defaults to None
+    :type batcher: rtstock.batching.AdaptiveBatcher, optional
+    """
+    columns = list(board.fields)
+    if 'Symbol' not in columns:
+        columns.append('Symbol')
+    while stop is None or not stop.is_set():
+        started = time.time()
+        quotes, _ = request_quotes_batched(board.tickers, columns,
+                                           batcher=batcher)
+        board.publish(quotes)
+        remaining = interval - (time.time() - started)
+        if stop is not None:
+            stop.wait(max(0.0, remaining))
+        else:
+            time.sleep(max(0.0, remaining))
+
+
+def _pack_name(buf, offset, name, width):
+    """Write a fixed-width ASCII name."""
+    encoded = name.encode('ascii')
+    if len(encoded) > width:
+        raise ValueError(name + " is longer than " + str(width) + " bytes.")
+    buf[offset:offset + width] = encoded.ljust(width, b'\0')
+
+
+def _names(buf, offset, count, width):
+    """Read count fixed-width ASCII names."""
+    return [bytes(buf[offset + i * width:offset + (i + 1) * width])
+            .rstrip(b'\0').decode('ascii') for i in range(count)]
+
+
+def _require_shared_memory():
+    """Raise an ImportError if shared memory is not available."""
+    if shared_memory is None:
+        raise ImportError("Quote boards require Python 3.8 or later.")
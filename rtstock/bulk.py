@@ -0,0 +1,243 @@
+"""
+Bulk module.
+
+This module contains blocking bulk versions of the Stock methods, which run
+the requests of many stocks at once on a pool of threads. Results keep the
+order of the stocks, and the errors of the failing ones are returned next to
+them instead of aborting the whole call::
+
+    >>> from rtstock import bulk
+    >>>
+    >>> stocks = [Stock('AAPL'), Stock('fake_ticker'), Stock('YHOO')]
+    >>> rows, errors = bulk.get_historical(stocks, '2016-03-01',
+    ...                                    '2016-03-02', workers=8)
+    >>> errors
+    {<Stock fake_ticker>: RequestError('Unable to process the request...')}
+"""
+
+from __future__ import unicode_literals
+import threading
+import time
+
+from multiprocessing.pool import ThreadPool
+
+from .error import CancelledError, DeadlineError
+from .stock import Stock
+
+
+class BulkExecutor(object):
+    """Class for handling a pool of threads running bulk requests.
+
+    The pool is started on the first request and kept until closed, so it can
+    be shared by many bulk calls. Items are run in any order, but results
+    always follow the order of the items.
+
+    >>> from rtstock.bulk import BulkExecutor
+    >>>
+    >>> with BulkExecutor(workers=16) as executor:
+    ...     info, errors = bulk.get_info(stocks, executor=executor)
+    ...     prices, errors = bulk.get_latest_price(stocks, executor=executor)
+
+    :param workers: Number of threads, defaults to 8
+    :type workers: integer, optional
+    """
+
+    #: Seconds between checks of the cancel event while waiting.
+    poll_interval = 0.05
+
+    def __init__(self, workers=8):
+        """Instantiate BulkExecutor class."""
+        self.workers = max(1, workers)
+        self.__pool = None
+        self.__lock = threading.Lock()
+
+    def __repr__(self):
+        """An unambiguous representation of a BulkExecutor's instance."""
+        return '<BulkExecutor {n} workers>'.format(n=self.workers)
+
+    def __enter__(self):
+        """Enter the runtime context of the executor."""
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        """Close the executor."""
+        self.close()
+
+    def map(self, function, items, timeout=None, cancel=None):
+        """Call a function on every item.
+
+        function is called with an item and the seconds left before the
+        timeout, None without timeout. Items not finished by the timeout get
+        a DeadlineError, and items not finished when cancel is set get a
+        CancelledError. Both return without waiting for the requests in
+        flight.
+
+        :param function: Function called with an item and a timeout.
+        :type function: function
+        :param items: Items.
+        :type items: list
+        :param timeout: Seconds to wait for all the items, defaults to None,
+            waiting indefinitely
+        :type timeout: float, optional
+        :param cancel: Event cancelling the items not finished yet when set,
+            defaults to None
+        :type cancel: threading.Event, optional
+        :returns: Result of every item, in order, None for failed ones, and a
+            dictionary mapping each failed item to its error.
+        :rtype: tuple of (list, dictionary)
+        """
+        items = list(items)
+        deadline = None if timeout is None else time.time() + timeout
+
+        def run(item):
+            if cancel is not None and cancel.is_set():
+                raise CancelledError('Request cancelled.')
+            remaining = None
+            if deadline is not None:
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    raise DeadlineError('Unable to process the request ' +
+                                        'before its deadline.')
+            return function(item, remaining)
+
+        pool = self.__get_pool()
+        pending = [pool.apply_async(run, (item,)) for item in items]
+        results = []
+        errors = {}
+        for item, result in zip(items, pending):
+            error = self.__wait(result, deadline, cancel)
+            if error is None:
+                try:
+                    results.append(result.get())
+                    continue
+                except Exception as e:
+                    error = e
+            results.append(None)
+            errors[item] = error
+        return results, errors
+
+    def close(self):
+        """Stop the threads once the requests in flight are done."""
+        with self.__lock:
+            pool, self.__pool = self.__pool, None
+        if pool is not None:
+            pool.close()
+
+    def __get_pool(self):
+        """Get the pool of threads, starting it if needed."""
+        with self.__lock:
+            if self.__pool is None:
+                self.__pool = ThreadPool(self.workers)
+            return self.__pool
+
+    def __wait(self, result, deadline, cancel):
+        """Wait for a result, returning the error that stopped the wait."""
+        while not result.ready():
+            wait = None
+            if cancel is not None:
+                if cancel.is_set():
+                    return CancelledError('Request cancelled.')
+                wait = self.poll_interval
+            if deadline is not None:
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    return DeadlineError('Unable to process the request ' +
+                                         'before its deadline.')
+                wait = remaining if wait is None else min(wait, remaining)
+            result.wait(wait)
+        return None
+
+
+def _run(method, stocks, workers, timeout, cancel, executor):
+    """Call a Stock method on every stock."""
+    owned = executor is None
+    if owned:
+        executor = BulkExecutor(min(workers, len(stocks)) or 1)
+    try:
+        return executor.map(
+            lambda stock, remaining: method(
+                stock if isinstance(stock, Stock) else Stock(stock),
+                remaining),
+            stocks, timeout, cancel)
+    finally:
+        if owned:
+            executor.close()
+
+
+def get_latest_price(stocks, workers=8, timeout=None, cancel=None,
+                     executor=None):
+    """Get the latest price of many stocks.
+
+    Bulk version of Stock.get_latest_price().
+
+    >>> prices, errors = get_latest_price([Stock('AAPL'), Stock('YHOO')])
+
+    :param stocks: Stocks, or their tickers.
+    :type stocks: list of rtstock.stock.Stock or strings
+    :param workers: Number of threads when no executor is given,
+        defaults to 8
+    :type workers: integer, optional
+    :param timeout: Seconds to wait for all the stocks, defaults to None,
+        waiting indefinitely
+    :type timeout: float, optional
+    :param cancel: Event cancelling the stocks not finished yet when set,
+        defaults to None
+    :type cancel: threading.Event, optional
+    :param executor: Executor running the requests, defaults to a new one
+        closed when done
+    :type executor: rtstock.bulk.BulkExecutor, optional
+    :returns: Result of every stock, in order, None for failed ones, and a
+        dictionary mapping each failed stock to its error.
+    :rtype: tuple of (list, dictionary)
+    """
+    return _run(lambda s, t: s.get_latest_price(timeout=t), stocks, workers,
+                timeout, cancel, executor)
+
+
+def get_info(stocks, workers=8, timeout=None, cancel=None, executor=None):
+    """Get all the information of many stocks.
+
+    Bulk version of Stock.get_info(). Takes the same parameters and returns
+    the same as get_latest_price().
+
+    >>> info, errors = get_info([Stock('AAPL'), Stock('YHOO')])
+    """
+    return _run(lambda s, t: s.get_info(timeout=t), stocks, workers, timeout,
+                cancel, executor)
+
+
+def get_historical(stocks, start_date, end_date, calendar=None, workers=8,
+                   timeout=None, cancel=None, executor=None):
+    """Get the daily historical information of many stocks.
+
+    Bulk version of Stock.get_historical(). Takes the same parameters as
+    get_latest_price() besides the period, and returns the same.
+
+    >>> rows, errors = get_historical([Stock('AAPL'), Stock('YHOO')],
+    ...                               '2016-03-01', '2016-03-02', workers=8)
+
+    :param start_date: Start date
+    :type start_date: string on the format of "yyyy-mm-dd"
+    :param end_date: End date
+    :type end_date: string on the format of "yyyy-mm-dd"
+    :param calendar: Trading calendar, or the name of a registered one,
+        used to skip periods without trading sessions, defaults to None
+    :type calendar: rtstock.calendars.TradingCalendar or string, optional
+    """
+    return _run(lambda s, t: s.get_historical(start_date, end_date,
+                                              calendar=calendar, timeout=t),
+                stocks, workers, timeout, cancel, executor)
+
+
+def save_historical(stocks, output_folder, workers=8, timeout=None,
+                    cancel=None, executor=None):
+    """Download the historical data of many stocks.
+
+    Bulk version of Stock.save_historical(). Takes the same parameters as
+    get_latest_price() besides the output folder, and returns the same.
+
+    :param output_folder: Output folder path
+    :type output_folder: string
+    """
+    return _run(lambda s, t: s.save_historical(output_folder, timeout=t),
+                stocks, workers, timeout, cancel, executor)
@@ -0,0 +1,309 @@
+"""
+Cache module.
+
+This module contains the persistent quote cache. Quotes are kept in memory
+and written behind to an SQLite file, so a restarted process can serve the
+quotes it had before the restart right away and refresh them lazily, instead
+of requesting every ticker again at once.
+"""
+
+from __future__ import unicode_literals
+import json
+import sqlite3
+import threading
+import time
+
+try:
+    # Python 3
+    import queue
+except ImportError:
+    # Python 2
+    import Queue as queue
+
+from .error import RequestError
+from .tracing import span
+from .utils import request_quotes_batched
+
+
+class QuoteCache(object):
+    """Class for handling the persistent quote cache.
+
+    Quotes younger than ttl seconds are fresh and served as they are. Older
+    quotes, up to max_stale seconds, are served too, but their tickers are
+    refreshed in the background. Tickers without a usable quote are requested
+    right away, and the errors of those that cannot be served are raised like
+    request_quotes() does. Quotes are cached per ticker and set of columns.
+
+    Writes to the SQLite file happen in a background thread, in batches,
+    unless write_behind is False. Entries older than max_stale are not
+    loaded on startup.
+
+    >>> from rtstock.cache import QuoteCache
+    >>>
+    >>> cache = QuoteCache('quotes.db', ttl=60, max_stale=3600)
+    >>> cache.request_quotes(['AAPL', 'YHOO'], ['Name', 'PERatio'])
+    [
+        {
+            'Name': 'Apple Inc.',
+            'PERatio': '10.82'
+        },
+        {
+            'Name': 'Yahoo! Inc.',
+            'PERatio': None
+        }
+    ]
+    >>> Stock('AAPL').get_info(cache=cache)
+
+    :param path: SQLite file path, ':memory:' for no persistence.
+    :type path: string
+    :param ttl: Seconds a quote is fresh, defaults to 60
+    :type ttl: float, optional
+    :param max_stale: Seconds a stale quote can still be served, defaults
+        to a day
+    :type max_stale: float, optional
+    :param write_behind: Whether to write in a background thread, defaults
+        to True
+    :type write_behind: boolean, optional
+    :param fetch: Function called with tickers, columns and a timeout to
+        request quotes, returning quotes and errors, defaults to
+        request_quotes_batched
+    :type fetch: function, optional
+    """
+
+    def __init__(self, path, ttl=60, max_stale=86400, write_behind=True,
+                 fetch=None):
+        """Instantiate QuoteCache class."""
+        self.path = path
+        self.ttl = ttl
+        self.max_stale = max_stale
+        self.__fetch = fetch or request_quotes_batched
+        self.__entries = {}
+        self.__lock = threading.Lock()
+        self.__refreshing = set()
+        self.__refreshers = set()
+        # The connection is shared by the callers, the refresh threads and
+        # the writer, so every use of it holds this lock.
+        self.__connection_lock = threading.Lock()
+        self.__connection = sqlite3.connect(path, check_same_thread=False)
+        with self.__connection_lock:
+            self.__connection.execute(
+                'CREATE TABLE IF NOT EXISTS quotes (ticker TEXT, '
+                'columns TEXT, quote TEXT, updated REAL, '
+                'PRIMARY KEY (ticker, columns))')
+            self.__connection.commit()
+        self.__load()
+        self.__queue = None
+        self.__writer = None
+        if write_behind:
+            self.__queue = queue.Queue()
+            self.__writer = threading.Thread(target=self.__write_behind)
+            self.__writer.daemon = True
+            self.__writer.start()
+
+    def __repr__(self):
+        """An unambiguous representation of a QuoteCache's instance."""
+        return '<QuoteCache {path} {n} quotes>'.format(
+            path=self.path, n=len(self.__entries))
+
+    def __len__(self):
+        """Number of cached quotes."""
+        return len(self.__entries)
+
+    def __enter__(self):
+        """Enter the context."""
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        """Close the cache on leaving the context."""
+        self.close()
+
+    def get(self, ticker, selected_columns=['*']):
+        """Get a cached quote.
+
+        :param ticker: Stock ticker in Yahoo Finances format.
+        :type ticker: string
+        :param selected_columns: List of columns, defaults to ['*']
+        :type selected_columns: list of strings, optional
+        :returns: Quote and its age in seconds, None if not cached or older
+            than max_stale.
+        :rtype: tuple of (dictionary, float) or None
+        """
+        entry = self.__entries.get((ticker, _key(selected_columns)))
+        if entry is None:
+            return None
+        quote, updated = entry
+        age = time.time() - updated
+        if age > self.max_stale:
+            return None
+        return quote, age
+
+    def put(self, tickers_list, quotes, selected_columns=['*'], updated=None):
+        """Cache quotes.
+
+        :param tickers_list: Tickers of the quotes, in the same order.
+        :type tickers_list: list of strings
+        :param quotes: Quotes as returned by request_quotes().
+        :type quotes: list of dictionaries
+        :param selected_columns: List of columns, defaults to ['*']
+        :type selected_columns: list of strings, optional
+        :param updated: Time of the quotes, defaults to now
+        :type updated: float, optional
+        """
+        updated = time.time() if updated is None else updated
+        key = _key(selected_columns)
+        rows = []
+        for ticker, quote in zip(tickers_list, quotes):
+            self.__entries[(ticker, key)] = (quote, updated)
+            rows.append((ticker, key, json.dumps(quote), updated))
+        if self.__queue is not None:
+            self.__queue.put(rows)
+        else:
+            self.__write(rows)
+
+    def request_quotes(self, tickers_list, selected_columns=['*'],
+                       timeout=None):
+        """Request recent quotes, serving them from the cache when possible.
+
+        The quotes of the tickers that could be requested are cached even
+        when others fail.
+
+        :param tickers_list: List of tickers that will be returned.
+        :type tickers_list: list of strings
+        :param selected_columns: List of columns to be returned,
+            defaults to ['*']
+        :type selected_columns: list of strings, optional
+        :param timeout: Seconds to wait for the quotes not cached, defaults
+            to None, waiting indefinitely
+        :type timeout: float, optional
+        :returns: Quotes in the order of tickers_list.
+        :rtype: list of dictionaries
+        :raises: RequestError, with the error of the first ticker that could
+            not be served
+        """
+        quotes = {}
+        stale = []
+        missing = []
+        with span('cache_lookup', tickers=len(tickers_list)) as lookup:
+            for ticker in tickers_list:
+                cached = self.get(ticker, selected_columns)
+                if cached is None:
+                    missing.append(ticker)
+                    continue
+                quotes[ticker] = cached[0]
+                if cached[1] > self.ttl:
+                    stale.append(ticker)
+            lookup.set(missing=len(missing), stale=len(stale))
+
+        errors = {}
+        if missing:
+            requested, errors = self.__request(missing, selected_columns,
+                                               timeout)
+            quotes.update(requested)
+        if stale:
+            self.__refresh(stale, selected_columns)
+        for ticker in tickers_list:
+            if ticker not in quotes:
+                raise errors.get(ticker) or RequestError(
+                    'Unable to process the request. Check if ' + ticker +
+                    ' is a valid stock ticker.')
+        return [quotes[t] for t in tickers_list]
+
+    def flush(self):
+        """Wait until every pending write is done."""
+        if self.__queue is not None:
+            self.__queue.join()
+
+    def close(self):
+        """Wait for the refreshes, write the pending quotes and close."""
+        with self.__lock:
+            refreshers = list(self.__refreshers)
+        for thread in refreshers:
+            thread.join()
+        if self.__queue is not None:
+            self.__queue.put(None)
+            self.__writer.join()
+            self.__queue = None
+        with self.__connection_lock:
+            self.__connection.close()
+
+    def __request(self, tickers_list, selected_columns, timeout=None):
+        """Request quotes and cache them, returning quotes and errors."""
+        columns = list(selected_columns)
+        # Symbol is needed to tell which quote belongs to which ticker
+        extra = '*' not in columns and 'Symbol' not in columns
+        if extra:
+            columns.append('Symbol')
+        quotes, errors = self.__fetch(tickers_list, columns, timeout=timeout)
+        tickers = [q.get('Symbol') for q in quotes]
+        if extra:
+            quotes = [dict((k, v) for k, v in q.items() if k != 'Symbol')
+                      for q in quotes]
+        self.put(tickers, quotes, selected_columns)
+        return dict(zip(tickers, quotes)), errors
+
+    def __refresh(self, tickers_list, selected_columns):
+        """Refresh stale tickers in the background."""
+        with self.__lock:
+            key = _key(selected_columns)
+            tickers_list = [t for t in tickers_list
+                            if (t, key) not in self.__refreshing]
+            self.__refreshing.update((t, key) for t in tickers_list)
+        if not tickers_list:
+            return
+
+        def refresh():
+            try:
+                self.__request(tickers_list, selected_columns)
+            except Exception:
+                # Keep serving the stale quotes, they will be retried
+                pass
+            finally:
+                with self.__lock:
+                    self.__refreshing.difference_update(
+                        (t, key) for t in tickers_list)
+                    self.__refreshers.discard(thread)
+
+        thread = threading.Thread(target=refresh)
+        thread.daemon = True
+        with self.__lock:
+            self.__refreshers.add(thread)
+        thread.start()
+
+    def __load(self):
+        """Load the quotes younger than max_stale."""
+        oldest = time.time() - self.max_stale
+        with self.__connection_lock:
+            rows = self.__connection.execute(
+                'SELECT ticker, columns, quote, updated FROM quotes '
+                'WHERE updated >= ?', (oldest,)).fetchall()
+        for ticker, key, quote, updated in rows:
+            self.__entries[(ticker, key)] = (json.loads(quote), updated)
+
+    def __write(self, rows):
+        """Write quotes to the file."""
+        with self.__connection_lock:
+            self.__connection.executemany(
+                'INSERT OR REPLACE INTO quotes VALUES (?, ?, ?, ?)', rows)
+            self.__connection.commit()
+
+    def __write_behind(self):
+        """Write queued quotes in batches until closed."""
+        while True:
+            batch = [self.__queue.get()]
+            while True:
+                try:
+                    batch.append(self.__queue.get_nowait())
+                except queue.Empty:
+                    break
+            rows = [r for rows in batch if rows is not None for r in rows]
+            if rows:
+                self.__write(rows)
+            for _ in batch:
+                self.__queue.task_done()
+            if None in batch:
+                return
+
+
+def _key(selected_columns):
+    """Cache key of a set of columns."""
+    return ','.join(sorted(selected_columns))
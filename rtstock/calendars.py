@@ -0,0 +1,271 @@
+"""
+Calendars module.
+
+This module contains the trading calendars used to plan historical data
+requests. A calendar knows which days are trading sessions on an exchange,
+so requests for weekends, holidays or future dates can be shrunk or skipped
+without reaching Yahoo Finance.
+"""
+
+from __future__ import unicode_literals
+import bisect
+import datetime
+import threading
+
+
+class TradingCalendar(object):
+    """Class for handling a trading calendar.
+
+    The base calendar trades on every weekday but the given holidays.
+    Exchange calendars subclass it and override holidays(). Sessions are
+    precomputed, one year at a time, into a sorted index of day ordinals, so
+    range queries are answered by binary search. The index is extended under
+    a lock and swapped in whole, so calendars can be shared between threads.
+
+    >>> from rtstock.calendars import TradingCalendar
+    >>>
+    >>> calendar = TradingCalendar(holidays=['2016-03-25'])
+    >>> calendar.session_window('2016-03-25', '2016-03-27')
+    >>> calendar.session_window('2016-03-24', '2016-03-27')
+    ('2016-03-24', '2016-03-24')
+
+    :param holidays: Days without trading session, defaults to None
+    :type holidays: list of strings on the format of "yyyy-mm-dd", optional
+    """
+
+    name = 'weekdays'
+
+    def __init__(self, holidays=None):
+        """Instantiate TradingCalendar class."""
+        self.__extra_holidays = set(
+            _to_date(day) for day in (holidays or [])
+        )
+        # Covered years and their sessions, replaced together
+        self.__index = (None, [])
+        self.__lock = threading.Lock()
+
+    def holidays(self, year):
+        """Get the exchange holidays of a year.
+
+        :param year: Year.
+        :type year: integer
+        :returns: Weekdays without trading session.
+        :rtype: set of datetime.date
+        """
+        return set()
+
+    def is_session(self, day):
+        """Whether a day is a trading session.
+
+        :param day: Day.
+        :type day: string on the format of "yyyy-mm-dd" or datetime.date
+        :rtype: boolean
+        """
+        ordinal = _to_date(day).toordinal()
+        sessions = self.__cover(ordinal, ordinal)
+        i = bisect.bisect_left(sessions, ordinal)
+        return i < len(sessions) and sessions[i] == ordinal
+
+    def sessions(self, start_date, end_date):
+        """Get the trading sessions between two days, both included.
+
+        :param start_date: Start date
+        :type start_date: string on the format of "yyyy-mm-dd"
+        :param end_date: End date
+        :type end_date: string on the format of "yyyy-mm-dd"
+        :returns: Trading sessions.
+        :rtype: list of datetime.date
+        """
+        sessions, first, last = self.__range(start_date, end_date)
+        return [datetime.date.fromordinal(o) for o in sessions[first:last]]
+
+    def session_window(self, start_date, end_date, today=None):
+        """Shrink a period to its first and last trading sessions.
+
+        Days after today are not considered, as they cannot have data yet.
+
+        :param start_date: Start date
+        :type start_date: string on the format of "yyyy-mm-dd"
+        :param end_date: End date
+        :type end_date: string on the format of "yyyy-mm-dd"
+        :param today: Current day, defaults to the local current day
+        :type today: datetime.date, optional
+        :returns: First and last sessions on the format of "yyyy-mm-dd", None
+            if the period has no trading session.
+        :rtype: tuple of strings or None
+        """
+        today = today or datetime.date.today()
+        end_date = min(_to_date(end_date), today)
+        start_date = _to_date(start_date)
+        if end_date < start_date:
+            return None
+        sessions, first, last = self.__range(start_date, end_date)
+        if first == last:
+            return None
+        return (datetime.date.fromordinal(sessions[first]).isoformat(),
+                datetime.date.fromordinal(sessions[last - 1]).isoformat())
+
+    def __range(self, start_date, end_date):
+        """Session index and positions of the sessions between two days."""
+        start = _to_date(start_date).toordinal()
+        end = _to_date(end_date).toordinal()
+        sessions = self.__cover(start, end)
+        return (sessions, bisect.bisect_left(sessions, start),
+                bisect.bisect_right(sessions, end))
+
+    def __cover(self, start, end):
+        """Session index covering two day ordinals, extended if needed."""
+        first = datetime.date.fromordinal(start).year
+        last = datetime.date.fromordinal(end).year
+        years, sessions = self.__index
+        if years is not None and years[0] <= first and last <= years[1]:
+            return sessions
+        with self.__lock:
+            years, sessions = self.__index
+            low, high = years or (first, first - 1)
+            before = []
+            for year in range(first, low):
+                before.extend(self.__year_sessions(year))
+            after = []
+            for year in range(high + 1, last + 1):
+                after.extend(self.__year_sessions(year))
+            sessions = before + sessions + after
+            self.__index = ((min(first, low), max(last, high)), sessions)
+        return sessions
+
+    def __year_sessions(self, year):
+        """Sorted session ordinals of a year."""
+        holidays = self.holidays(year) | self.__extra_holidays
+        day = datetime.date(year, 1, 1)
+        one_day = datetime.timedelta(days=1)
+        sessions = []
+        while day.year == year:
+            if day.weekday() < 5 and day not in holidays:
+                sessions.append(day.toordinal())
+            day += one_day
+        return sessions
+
+
+class NYSECalendar(TradingCalendar):
+    """Class for handling the New York Stock Exchange calendar.
+
+    Covers the regular holidays since 1971 and the unscheduled closures of
+    recent decades. Early closes are treated as regular sessions.
+    """
+
+    name = 'NYSE'
+
+    closures = set(datetime.date(*d) for d in [
+        (1985, 9, 27), (1994, 4, 27), (2001, 9, 11), (2001, 9, 12),
+        (2001, 9, 13), (2001, 9, 14), (2004, 6, 11), (2007, 1, 2),
+        (2012, 10, 29), (2012, 10, 30), (2018, 12, 5), (2025, 1, 9),
+    ])
+
+    def holidays(self, year):
+        """Get the NYSE holidays of a year.
+
+        :param year: Year.
+        :type year: integer
+        :returns: Weekdays without trading session.
+        :rtype: set of datetime.date
+        """
+        days = set(d for d in self.closures if d.year == year)
+        # A New Year's Day on Saturday is not moved to the previous Friday
+        new_year = datetime.date(year, 1, 1)
+        if new_year.weekday() != 5:
+            days.add(_observed(new_year))
+        if year >= 1998:
+            days.add(_nth_weekday(year, 1, 0, 3))  # Martin Luther King Jr.
+        days.add(_nth_weekday(year, 2, 0, 3))  # Washington's Birthday
+        days.add(_easter(year) - datetime.timedelta(days=2))  # Good Friday
+        days.add(_nth_weekday(year, 5, 0, -1))  # Memorial Day
+        if year >= 2022:
+            days.add(_observed(datetime.date(year, 6, 19)))  # Juneteenth
+        days.add(_observed(datetime.date(year, 7, 4)))  # Independence Day
+        days.add(_nth_weekday(year, 9, 0, 1))  # Labor Day
+        days.add(_nth_weekday(year, 11, 3, 4))  # Thanksgiving
+        days.add(_observed(datetime.date(year, 12, 25)))  # Christmas
+        return days
+
+
+_calendars = {}
+
+
+def register_calendar(calendar_class, name=None):
+    """Register an exchange calendar.
+
+    :param calendar_class: TradingCalendar subclass.
+    :type calendar_class: class
+    :param name: Name of the calendar, defaults to calendar_class.name
+    :type name: string, optional
+    """
+    _calendars[name or calendar_class.name] = calendar_class
+
+
+def get_calendar(name):
+    """Get a registered exchange calendar.
+
+    Calendars are instantiated once, so their session index is shared.
+
+    >>> get_calendar('NYSE').is_session('2016-07-04')
+    False
+
+    :param name: Name of the calendar.
+    :type name: string
+    :returns: Calendar instance.
+    :rtype: TradingCalendar
+    :raises: KeyError
+    """
+    calendar = _calendars[name]
+    if isinstance(calendar, type):
+        calendar = _calendars[name] = calendar()
+    return calendar
+
+
+register_calendar(TradingCalendar)
+register_calendar(NYSECalendar)
+
+
+def _to_date(day):
+    """Convert a "yyyy-mm-dd" string to a date."""
+    if isinstance(day, datetime.datetime):
+        return day.date()
+    if isinstance(day, datetime.date):
+        return day
+    return datetime.datetime.strptime(day, '%Y-%m-%d').date()
+
+
+def _observed(day):
+    """Weekday a holiday is observed on."""
+    if day.weekday() == 5:
+        return day - datetime.timedelta(days=1)
+    if day.weekday() == 6:
+        return day + datetime.timedelta(days=1)
+    return day
+
+
+def _nth_weekday(year, month, weekday, n):
+    """The n-th weekday of a month, counting from its end if n < 0."""
+    if n > 0:
+        day = datetime.date(year, month, 1)
+        day += datetime.timedelta(days=(weekday - day.weekday()) % 7)
+        return day + datetime.timedelta(weeks=n - 1)
+    following = datetime.date(year + month // 12, month % 12 + 1, 1)
+    day = following - datetime.timedelta(days=1)
+    day -= datetime.timedelta(days=(day.weekday() - weekday) % 7)
+    return day + datetime.timedelta(weeks=n + 1)
+
+
+def _easter(year):
+    """Easter Sunday of a year (anonymous Gregorian algorithm)."""
+    a = year % 19
+    b, c = divmod(year, 100)
+    d, e = divmod(b, 4)
+    f = (b + 8) // 25
+    g = (b - f + 1) // 3
+    h = (19 * a + b - d - g + 15) % 30
+    i, k = divmod(c, 4)
+    m = (32 + 2 * e + 2 * i - h - k) % 7
+    n = (a + 11 * h + 22 * m) // 451
+    month, day = divmod(h + m - 7 * n + 114, 31)
+    return datetime.date(year, month, day + 1)
@@ -0,0 +1,270 @@
+"""
+Command line module.
+
+This module contains the rtstock command line interface, with one
+subcommand per bulk operation. Results are written to the standard output,
+as newline delimited JSON or CSV, as soon as each chunk completes::
+
+    $ rtstock quotes -f tickers.txt --columns Name,PreviousClose
+    $ cat tickers.txt | rtstock history --start 2016-01-01 --end 2016-03-01
+    $ rtstock download AAPL YHOO --output history/
+"""
+
+from __future__ import unicode_literals
+import argparse
+import csv
+import json
+import sys
+import threading
+import time
+
+from multiprocessing.pool import ThreadPool
+
+from .error import RequestError
+from .utils import (download_historical, iter_historical,
+                    request_quotes_batched, request_quotes_isolated,
+                    HISTORICAL_COLUMNS)
+
+
+class RateLimiter(object):
+    """Class for handling a requests per second limit.
+
+    :param rate: Requests per second, None for no limit.
+    :type rate: float or None
+    """
+
+    def __init__(self, rate):
+        """Instantiate RateLimiter class."""
+        self.interval = 1.0 / rate if rate else 0.0
+        self.__next = time.time()
+        self.__lock = threading.Lock()
+
+    def wait(self):
+        """Block until the next request is allowed."""
+        if not self.interval:
+            return
+        with self.__lock:
+            now = time.time()
+            start = max(now, self.__next)
+            self.__next = start + self.interval
+        if start > now:
+            time.sleep(start - now)
+
+
+class Writer(object):
+    """Class for handling the streamed output.
+
+    Writes records as newline delimited JSON or as CSV, flushing after every
+    chunk. Safe to use from several threads.
+
+    :param stream: Output stream.
+    :type stream: file
+    :param output_format: 'ndjson' or 'csv'.
+    :type output_format: string
+    :param columns: CSV columns, defaults to the keys of the first record
+    :type columns: list of strings, optional
+    """
+
+    def __init__(self, stream, output_format, columns=None):
+        """Instantiate Writer class."""
+        self.stream = stream
+        self.output_format = output_format
+        self.columns = columns
+        self.__csv = None
+        self.__lock = threading.Lock()
+
+    def write(self, records):
+        """Write a chunk of records.
+
+        :param records: Records.
+        :type records: list of dictionaries
+        """
+        if not records:
+            return
+        with self.__lock:
+            if self.output_format == 'csv':
+                if self.__csv is None:
+                    columns = self.columns or list(records[0])
+                    self.__csv = csv.DictWriter(self.stream, columns,
+                                                extrasaction='ignore')
+                    self.__csv.writeheader()
+                self.__csv.writerows(records)
+            else:
+                self.stream.write(''.join(json.dumps(r) + '\n'
+                                          for r in records))
+            self.stream.flush()
+
+
+def read_tickers(tickers, files, stdin=None):
+    """Gather tickers from arguments, files and the standard input.
+
+    Files hold tickers separated by whitespace or commas. The standard input
+    is read when no ticker and no file is given, or when a file is '-'.
+
+    :param tickers: Tickers given as arguments.
+    :type tickers: list of strings
+    :param files: Paths of ticker files.
+    :type files: list of strings
+    :param stdin: Standard input, defaults to sys.stdin
+    :type stdin: file, optional
+    :returns: Tickers without duplicates, in order of appearance.
+    :rtype: list of strings
+    """
+    stdin = stdin or sys.stdin
+    texts = []
+    for path in files:
+        if path == '-':
+            texts.append(stdin.read())
+        else:
+            with open(path) as f:
+                texts.append(f.read())
+    if not tickers and not files:
+        texts.append(stdin.read())
+    result = []
+    seen = set()
+    for ticker in list(tickers) + ' '.join(texts).replace(',', ' ').split():
+        if ticker not in seen:
+            seen.add(ticker)
+            result.append(ticker)
+    return result
+
+
+def run_quotes(tickers_list, options, writer, errors):
+    """Request quotes in concurrent batches, writing each as it completes."""
+    columns = options.columns.split(',') if options.columns else ['*']
+    if '*' not in columns and 'Symbol' not in columns:
+        columns.insert(0, 'Symbol')
+    limiter = RateLimiter(options.rate)
+
+    def request(batch, selected_columns=columns, timeout=None):
+        limiter.wait()
+        quotes, batch_errors = request_quotes_isolated(batch,
+                                                       selected_columns)
+        writer.write(quotes)
+        errors.update(batch_errors)
+        return quotes, batch_errors
+
+    if options.batch_size:
+        batches = [tickers_list[i:i + options.batch_size]
+                   for i in range(0, len(tickers_list), options.batch_size)]
+        _run(request, batches, options.concurrency)
+    else:
+        # Batches sized and tuned by the batcher of request_quotes_batched
+        request_quotes_batched(tickers_list, columns,
+                               workers=options.concurrency, fetch=request)
+
+
+def run_history(tickers_list, options, writer, errors):
+    """Stream the historical data of every ticker, tagged with its symbol."""
+    limiter = RateLimiter(options.rate)
+
+    def request(ticker):
+        limiter.wait()
+        chunk = []
+        try:
+            for row in iter_historical(ticker, options.start, options.end):
+                row['Symbol'] = ticker
+                chunk.append(row)
+                if len(chunk) == 1000:
+                    writer.write(chunk)
+                    chunk = []
+        except RequestError as e:
+            errors[ticker] = e
+        writer.write(chunk)
+
+    _run(request, tickers_list, options.concurrency)
+
+
+def run_download(tickers_list, options, writer, errors):
+    """Download CSV files, reporting each ticker as it completes."""
+    limiter = RateLimiter(options.rate)
+
+    def request(ticker):
+        limiter.wait()
+        try:
+            download_historical([ticker], options.output)
+        except RequestError as e:
+            errors[ticker] = e
+            return
+        writer.write([{'Symbol': ticker, 'status': 'ok'}])
+
+    _run(request, tickers_list, options.concurrency)
+
+
+def _run(function, items, concurrency):
+    """Call function on every item using a pool of threads."""
+    pool = ThreadPool(max(1, concurrency))
+    try:
+        pool.map(function, items, chunksize=1)
+    finally:
+        pool.close()
+        pool.join()
+
+
+def build_parser():
+    """Build the command line parser."""
+    parser = argparse.ArgumentParser(
+        prog='rtstock',
+        description='Gather stock quotes and historical data from Yahoo '
+                    'Finance.')
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument('tickers', nargs='*',
+                        help='tickers, read from the standard input when '
+                             'neither tickers nor files are given')
+    common.add_argument('-f', '--file', action='append', default=[],
+                        help="file with tickers, '-' for the standard input")
+    common.add_argument('-c', '--concurrency', type=int, default=4,
+                        help='concurrent requests (default: 4)')
+    common.add_argument('-r', '--rate', type=float, default=None,
+                        help='maximum requests per second')
+    common.add_argument('--format', choices=['ndjson', 'csv'],
+                        default='ndjson', help='output format '
+                                               '(default: ndjson)')
+    subparsers = parser.add_subparsers(dest='command')
+    subparsers.required = True
+
+    quotes = subparsers.add_parser('quotes', parents=[common],
+                                   help='request recent quotes')
+    quotes.add_argument('--columns', default='',
+                        help='comma separated columns (default: all)')
+    quotes.add_argument('-b', '--batch-size', type=int, default=None,
+                        help='tickers per request (default: adaptive)')
+
+    history = subparsers.add_parser('history', parents=[common],
+                                    help='request daily historical data')
+    history.add_argument('--start', required=True,
+                         help='start date, yyyy-mm-dd')
+    history.add_argument('--end', required=True, help='end date, yyyy-mm-dd')
+
+    download = subparsers.add_parser('download', parents=[common],
+                                     help='download historical CSV files')
+    download.add_argument('-o', '--output', default='.',
+                          help='output folder (default: current folder)')
+    return parser
+
+
+def main(args=None, stdout=None, stdin=None, stderr=None):
+    """Run the command line interface.
+
+    :returns: Exit status, 1 if any ticker failed.
+    :rtype: integer
+    """
+    stdout = stdout or sys.stdout
+    stderr = stderr or sys.stderr
+    options = build_parser().parse_args(args)
+    tickers_list = read_tickers(options.tickers, options.file, stdin)
+    columns = None
+    if options.command == 'history':
+        columns = ['Symbol'] + HISTORICAL_COLUMNS
+    writer = Writer(stdout, options.format, columns)
+    errors = {}
+    commands = {'quotes': run_quotes, 'history': run_history,
+                'download': run_download}
+    commands[options.command](tickers_list, options, writer, errors)
+    for ticker in sorted(errors):
+        stderr.write('{0}: {1}\n'.format(ticker, errors[ticker]))
+    return 1 if errors else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
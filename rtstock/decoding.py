@@ -0,0 +1,239 @@
+"""
+Decoding module.
+
+This module contains the JSON decoding of provider responses. The fastest
+JSON library installed is used, orjson, ujson or simplejson, falling back to
+the standard library, and decoded quotes can be reduced to tuples of the
+requested columns, converted to their final types, in a single pass.
+"""
+
+from __future__ import unicode_literals
+import json
+from operator import itemgetter
+
+from .tracing import span
+
+#: Decoders in order of preference.
+DECODERS = ('orjson', 'ujson', 'simplejson', 'json')
+
+_decoder = None
+_decoder_name = None
+
+
+def _load_decoder(name):
+    """Get the loads function of a JSON library taking bytes."""
+    if name == 'json':
+        def loads(data):
+            if isinstance(data, bytes):
+                data = data.decode('utf-8')
+            return json.loads(data)
+        return loads
+    module = __import__(name)
+    if name == 'orjson':
+        return module.loads
+
+    def loads(data):
+        if isinstance(data, bytes):
+            data = data.decode('utf-8')
+        return module.loads(data)
+    return loads
+
+
+def use_decoder(name=None):
+    """Choose the JSON library used to decode responses.
+
+    >>> from rtstock.decoding import use_decoder
+    >>>
+    >>> use_decoder()
+    'orjson'
+    >>> use_decoder('json')
+    'json'
+
+    :param name: Library name, one of DECODERS, or None for the fastest one
+        installed, defaults to None
+    :type name: string, optional
+    :returns: Name of the library in use.
+    :rtype: string
+    :raises: ImportError, ValueError
+    """
+    global _decoder, _decoder_name
+    if name is None:
+        for candidate in DECODERS:
+            try:
+                _decoder = _load_decoder(candidate)
+            except ImportError:
+                continue
+            _decoder_name = candidate
+            return candidate
+    if name not in DECODERS:
+        raise ValueError('Unknown JSON decoder: {0}'.format(name))
+    _decoder = _load_decoder(name)
+    _decoder_name = name
+    return name
+
+
+def decoder_name():
+    """Name of the JSON library in use.
+
+    :rtype: string
+    """
+    return _decoder_name
+
+
+def loads(data):
+    """Decode a JSON document with the JSON library in use.
+
+    :param data: JSON document.
+    :type data: bytes or string
+    :returns: Decoded document.
+    """
+    with span('decode', decoder=_decoder_name):
+        return _decoder(data)
+
+
+class Extractor(object):
+    """Class for handling the extraction of columns from quotes.
+
+    Turns decoded quotes into tuples holding the given columns, in order,
+    each converted by its function on types. Missing fields are None before
+    conversion.
+
+    >>> from rtstock.decoding import Extractor
+    >>> from rtstock.utils import to_float
+    >>>
+    >>> extract = Extractor(['Symbol', 'Bid'], {'Bid': to_float})
+    >>> extract([{'Symbol': 'AAPL', 'Bid': '95.60', 'Ask': '95.70'}])
+    [('AAPL', 95.6)]
+
+    :param columns: Columns to extract.
+    :type columns: list of strings
+    :param types: Conversion function by column, defaults to None
+    :type types: dictionary, optional
+    """
+
+    def __init__(self, columns, types=None):
+        """Instantiate Extractor class."""
+        self.columns = list(columns)
+        types = types or {}
+        self.__converters = [(i, types[c]) for i, c in enumerate(columns)
+                             if c in types]
+        if len(self.columns) == 1:
+            column = self.columns[0]
+            self.__getter = lambda item: (item[column],)
+        else:
+            self.__getter = itemgetter(*self.columns)
+
+    def __repr__(self):
+        """An unambiguous representation of an Extractor's instance."""
+        return '<Extractor {columns}>'.format(columns=', '.join(self.columns))
+
+    def __call__(self, items):
+        """Extract the columns of a list of quotes.
+
+        :param items: Decoded quotes.
+        :type items: list of dictionaries
+        :returns: One tuple per quote.
+        :rtype: list of tuples
+        """
+        getter = self.__getter
+        columns = self.columns
+        try:
+            rows = [getter(item) for item in items]
+        except KeyError:
+            rows = [tuple(item.get(c) for c in columns) for item in items]
+        converters = self.__converters
+        if not converters:
+            return rows
+        result = []
+        for row in rows:
+            row = list(row)
+            for i, convert in converters:
+                row[i] = convert(row[i])
+            result.append(tuple(row))
+        return result
+
+
+def extract(data, path, columns, types=None):
+    """Decode a JSON document and extract columns from the items at path.
+
+    A single item at path, as YQL answers one ticker requests, is taken as
+    a list of one item, and a missing one as an empty list.
+
+    >>> extract(body, ['query', 'results', 'quote'], ['Symbol', 'Name'])
+    [('AAPL', 'Apple Inc.')]
+
+    :param data: JSON document.
+    :type data: bytes or string
+    :param path: Keys leading to the items.
+    :type path: list of strings
+    :param columns: Columns to extract.
+    :type columns: list of strings
+    :param types: Conversion function by column, defaults to None
+    :type types: dictionary, optional
+    :returns: One tuple per item.
+    :rtype: list of tuples
+    """
+    items = loads(data)
+    for key in path:
+        if not items:
+            break
+        items = items[key]
+    if not items:
+        return []
+    if isinstance(items, dict):
+        items = [items]
+    return Extractor(columns, types)(items)
+
+
+def iter_items(blocks, name):
+    """Decode the items of a JSON array member as its text arrives.
+
+    Looks for the first member called name and decodes its items one by
+    one, so only the item being parsed is kept in memory. A single object
+    instead of an array is taken as an array of one item.
+
+    >>> list(iter_items(['{"quote": [{"Date": "2016-03-02"}, {"Da',
+    ...                  'te": "2016-03-01"}]}'], 'quote'))
+    [{'Date': '2016-03-02'}, {'Date': '2016-03-01'}]
+
+    :param blocks: Text blocks of a JSON document.
+    :type blocks: iterable of strings
+    :param name: Member name.
+    :type name: string
+    :returns: Generator of the decoded items.
+    """
+    decoder = json.JSONDecoder()
+    marker = '"{0}"'.format(name)
+    buf = ''
+    state = 'seek'
+    for block in blocks:
+        buf += block
+        if state == 'seek':
+            i = buf.find(marker)
+            if i < 0:
+                buf = buf[-len(marker):]
+                continue
+            rest = buf[i + len(marker):].lstrip().lstrip(':').lstrip()
+            if not rest:
+                buf = buf[i:]
+                continue
+            state = 'array' if rest[0] == '[' else 'single'
+            buf = rest[1:] if state == 'array' else rest
+        while True:
+            buf = buf.lstrip().lstrip(',').lstrip()
+            if not buf or buf[0] in ']}':
+                break
+            try:
+                item, end = decoder.raw_decode(buf)
+            except ValueError:
+                # Item not fully received yet
+                break
+            yield item
+            buf = buf[end:]
+            if state == 'single':
+                return
+        if buf and buf[0] in ']}' and state != 'seek':
+            return
+
+
+use_decoder()
@@ -10,3 +10,37 @@ class RequestError(Exception):
     """Class for request exception."""
 
     pass
+
+
+class ColumnError(RequestError):
+    """Class for exception raised when a request answers no quotes.
+
+    Happens when the selected columns are not valid, so it says nothing
+    about the tickers requested.
+    """
+
+    pass
+
+
+class ProviderError(RequestError):
+    """Class for exception raised when every data provider failed.
+
+    :ivar errors: Exception raised by each provider, by provider name.
+    """
+
+    def __init__(self, message, errors=None):
+        """Instantiate ProviderError class."""
+        super(ProviderError, self).__init__(message)
+        self.errors = errors or {}
+
+
+class DeadlineError(RequestError):
+    """Class for exception raised when a request misses its deadline."""
+
+    pass
+
+
+class CancelledError(RequestError):
+    """Class for exception raised when a request is cancelled."""
+
+    pass
@@ -0,0 +1,219 @@
+"""
+Export module.
+
+This module contains the export of historical data and quotes to pandas
+DataFrames and Arrow tables. Data is first laid out in typed column buffers,
+which pandas and Arrow then wrap without further copies. pandas and pyarrow
+are optional and only imported when an export is requested.
+"""
+
+from __future__ import unicode_literals
+import array
+
+from .ingest import COLUMNS, TYPECODES, parse_date
+from .utils import to_float
+
+#: Volume of the days without one, such as 'null' or None volumes.
+MISSING_VOLUME = -1
+
+
+def historical_columns(data):
+    """Lay out historical data in typed column buffers.
+
+    Accepts rows as returned by request_historical(), Stock.get_historical()
+    or iter_historical(), chunks from iter_historical(..., chunk_size=n) and
+    columns from rtstock.ingest, which are returned as they are. Every value
+    is parsed once, straight into its column.
+
+    :param data: Historical data.
+    :type data: list or iterable of dictionaries
+    :returns: Column arrays by column name. Date holds days since
+        1970-01-01, Volume 64 bits integers, MISSING_VOLUME where missing,
+        and the others floats, NaN where missing.
+    :rtype: dictionary of array.array
+    """
+    if isinstance(data, dict) and \
+            all(isinstance(data.get(c), array.array) for c in COLUMNS):
+        return data
+    if isinstance(data, dict):
+        data = [data]
+    columns = dict((c, array.array(TYPECODES[c])) for c in COLUMNS)
+    dates = columns['Date']
+    volumes = columns['Volume']
+    prices = [(c, columns[c]) for c in COLUMNS
+              if c not in ('Date', 'Volume')]
+    for item in data:
+        if isinstance(item.get('Date'), list):
+            # Chunk of column lists
+            dates.extend(parse_date(d) for d in item['Date'])
+            volumes.extend(_volume(v) for v in item['Volume'])
+            for name, column in prices:
+                column.extend(to_float(v) for v in item[name])
+        else:
+            dates.append(parse_date(item['Date']))
+            volumes.append(_volume(item.get('Volume')))
+            for name, column in prices:
+                column.append(to_float(item.get(name)))
+    return columns
+
+
+def historical_to_pandas(data):
+    """Convert historical data to a pandas DataFrame.
+
+    >>> from rtstock.export import historical_to_pandas
+    >>>
+    >>> historical_to_pandas(stock.get_historical('2016-03-01',
+    ...                                           '2016-03-02'))
+            Date        Open        High        Low       Close    Volume  \\
+    0 2016-03-02  100.510002  100.889999  99.639999  100.750000  33169600
+    1 2016-03-01   97.650002  100.769997  97.419998  100.529999  50407100
+
+    :param data: Historical data, in any form historical_columns() accepts.
+    :type data: list or iterable of dictionaries
+    :returns: Frame with a datetime64 Date column, an int64 Volume column,
+        or a nullable Int64 one when some volumes are missing, and float64
+        price columns.
+    :rtype: pandas.DataFrame
+    :raises: ImportError
+    """
+    np = _import('numpy')
+    pd = _import('pandas')
+    columns = historical_columns(data)
+    frame = {}
+    for name in COLUMNS:
+        values = np.frombuffer(columns[name], dtype=columns[name].typecode)
+        if name == 'Date':
+            values = values.astype('datetime64[D]')
+        elif name == 'Volume' and MISSING_VOLUME in columns[name]:
+            values = pd.arrays.IntegerArray(values,
+                                            values == MISSING_VOLUME)
+        frame[name] = values
+    return pd.DataFrame(frame, columns=COLUMNS, copy=False)
+
+
+def historical_to_arrow(data):
+    """Convert historical data to an Arrow table.
+
+    Column buffers are handed to Arrow as they are, Date becoming a date32
+    column. Missing volumes are null.
+
+    :param data: Historical data, in any form historical_columns() accepts.
+    :type data: list or iterable of dictionaries
+    :returns: Table with the same columns as historical_to_pandas().
+    :rtype: pyarrow.Table
+    :raises: ImportError
+    """
+    pa = _import('pyarrow')
+    columns = historical_columns(data)
+    types = {'i': pa.date32(), 'q': pa.int64(), 'd': pa.float64()}
+    arrays = []
+    for name in COLUMNS:
+        column = columns[name]
+        validity = None
+        if name == 'Volume' and MISSING_VOLUME in column:
+            validity = pa.py_buffer(_validity(column, MISSING_VOLUME))
+        arrays.append(pa.Array.from_buffers(
+            types[column.typecode], len(column),
+            [validity, pa.py_buffer(column)]))
+    return pa.Table.from_arrays(arrays, names=COLUMNS)
+
+
+def quote_columns(quotes, fields):
+    """Lay out numeric quote fields in float64 column buffers.
+
+    :param quotes: Quotes as returned by request_quotes().
+    :type quotes: list of dictionaries
+    :param fields: Numeric fields to be converted.
+    :type fields: list of strings
+    :returns: Symbols and column arrays by field name, NaN where missing.
+    :rtype: tuple of (list of strings, dictionary of array.array)
+    """
+    symbols = [q.get('Symbol') for q in quotes]
+    columns = dict((f, array.array('d', [to_float(q.get(f)) for q in quotes]))
+                   for f in fields)
+    return symbols, columns
+
+
+def quotes_to_pandas(quotes, fields=None):
+    """Convert quotes or a snapshot to a pandas DataFrame.
+
+    :param quotes: Quotes as returned by request_quotes(), or a snapshot
+        from rtstock.snapshot, whose matrix is used without copying.
+    :type quotes: list of dictionaries or rtstock.snapshot.Snapshot
+    :param fields: Numeric fields, defaults to every field of the first
+        quote but Symbol
+    :type fields: list of strings, optional
+    :returns: Frame indexed by symbol with one float64 column per field.
+    :rtype: pandas.DataFrame
+    :raises: ImportError
+    """
+    np = _import('numpy')
+    pd = _import('pandas')
+    if hasattr(quotes, 'values') and hasattr(quotes, 'row_index'):
+        return pd.DataFrame(quotes.values, index=quotes.tickers,
+                            columns=quotes.fields, copy=False)
+    fields = fields or _fields(quotes)
+    symbols, columns = quote_columns(quotes, fields)
+    frame = dict((f, np.frombuffer(columns[f], dtype='d')) for f in fields)
+    return pd.DataFrame(frame, index=pd.Index(symbols, name='Symbol'),
+                        columns=fields, copy=False)
+
+
+def quotes_to_arrow(quotes, fields=None):
+    """Convert quotes or a snapshot to an Arrow table.
+
+    :param quotes: Quotes as returned by request_quotes(), or a snapshot
+        from rtstock.snapshot.
+    :type quotes: list of dictionaries or rtstock.snapshot.Snapshot
+    :param fields: Numeric fields, defaults to every field of the first
+        quote but Symbol
+    :type fields: list of strings, optional
+    :returns: Table with a Symbol column and one float64 column per field.
+    :rtype: pyarrow.Table
+    :raises: ImportError
+    """
+    pa = _import('pyarrow')
+    if hasattr(quotes, 'values') and hasattr(quotes, 'row_index'):
+        arrays = [pa.array(quotes.tickers)]
+        arrays.extend(pa.array(quotes.column(f)) for f in quotes.fields)
+        return pa.Table.from_arrays(arrays, names=['Symbol'] + quotes.fields)
+    fields = fields or _fields(quotes)
+    symbols, columns = quote_columns(quotes, fields)
+    arrays = [pa.array(symbols, type=pa.string())]
+    arrays.extend(pa.Array.from_buffers(pa.float64(), len(symbols),
+                                        [None, pa.py_buffer(columns[f])])
+                  for f in fields)
+    return pa.Table.from_arrays(arrays, names=['Symbol'] + list(fields))
+
+
+def _volume(value):
+    """Parse a volume, MISSING_VOLUME if there is none."""
+    volume = to_float(value)
+    if volume != volume:
+        return MISSING_VOLUME
+    return int(volume)
+
+
+def _validity(column, missing):
+    """Arrow validity bitmap of a column, unset where missing."""
+    bitmap = bytearray((len(column) + 7) // 8)
+    for i, value in enumerate(column):
+        if value != missing:
+            bitmap[i >> 3] |= 1 << (i & 7)
+    return bytes(bitmap)
+
+
+def _fields(quotes):
+    """Fields of the first quote but Symbol."""
+    if not quotes:
+        return []
+    return sorted(f for f in quotes[0] if f != 'Symbol')
+
+
+def _import(name):
+    """Import an optional dependency."""
+    try:
+        return __import__(name)
+    except ImportError:
+        raise ImportError(name + " is required for this export. Install " +
+                          "it with 'pip install " + name + "'.")
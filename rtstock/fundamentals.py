@@ -0,0 +1,308 @@
+"""
+Fundamentals module.
+
+This module contains the point-in-time fundamentals store. Snapshots of the
+information of every stock, such as the one from Stock.get_info(), are kept
+in an SQLite file as the fields that changed since the previous snapshot of
+the same ticker, and the information known at any past time can be rebuilt,
+for one ticker or for thousands at once, without look-ahead.
+"""
+
+from __future__ import unicode_literals
+import sqlite3
+import threading
+import time
+
+_SCHEMA = [
+    'CREATE TABLE IF NOT EXISTS symbols (id INTEGER PRIMARY KEY, '
+    'ticker TEXT UNIQUE NOT NULL)',
+    'CREATE TABLE IF NOT EXISTS fields (id INTEGER PRIMARY KEY, '
+    'name TEXT UNIQUE NOT NULL)',
+    # Clustered by ticker, field and time, so the as-of lookups of a ticker
+    # read a contiguous range of the table.
+    'CREATE TABLE IF NOT EXISTS changes (symbol INTEGER NOT NULL, '
+    'field INTEGER NOT NULL, ts REAL NOT NULL, value, '
+    'PRIMARY KEY (symbol, field, ts)) WITHOUT ROWID',
+]
+
+# SQLite allows up to 999 parameters per statement on older versions.
+_MAX_PARAMETERS = 900
+
+
+class FundamentalsStore(object):
+    """Class for handling the point-in-time fundamentals store.
+
+    Every field of a snapshot is compared with the last known value of the
+    ticker, and only the changed ones are written, with the snapshot time.
+    Fields missing from a snapshot, or None, are recorded as removed.
+    Rebuilding the information as of a time takes, for every field, the
+    latest change not after that time.
+
+    Snapshots of a ticker must be recorded in time order.
+
+    >>> from rtstock.fundamentals import FundamentalsStore
+    >>>
+    >>> store = FundamentalsStore('fundamentals.db')
+    >>> store.record('AAPL', Stock('AAPL').get_info()[0])
+    53
+    >>> store.record('AAPL', Stock('AAPL').get_info()[0])
+    4
+    >>> store.as_of('AAPL', 1456866000, ['PERatio'])
+    {'PERatio': '10.82'}
+
+    :param path: SQLite file path, ':memory:' for no persistence.
+    :type path: string
+    """
+
+    def __init__(self, path):
+        """Instantiate FundamentalsStore class."""
+        self.path = path
+        self.__connection = sqlite3.connect(path, check_same_thread=False)
+        self.__lock = threading.Lock()
+        for statement in _SCHEMA:
+            self.__connection.execute(statement)
+        self.__connection.commit()
+        self.__symbols = dict(self.__connection.execute(
+            'SELECT ticker, id FROM symbols'))
+        self.__fields = dict(self.__connection.execute(
+            'SELECT name, id FROM fields'))
+        self.__field_names = dict((i, n) for n, i in self.__fields.items())
+        # Last recorded time and values of every ticker, by symbol id
+        self.__latest = {}
+
+    def __repr__(self):
+        """An unambiguous representation of a FundamentalsStore's instance."""
+        return '<FundamentalsStore {path} {n} tickers>'.format(
+            path=self.path, n=len(self.__symbols))
+
+    def __enter__(self):
+        """Enter the context."""
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        """Close the store on leaving the context."""
+        self.close()
+
+    def tickers(self):
+        """Tickers with recorded snapshots.
+
+        :rtype: list of strings
+        """
+        return sorted(self.__symbols)
+
+    def fields(self):
+        """Fields ever recorded.
+
+        :rtype: list of strings
+        """
+        return sorted(self.__fields)
+
+    def record(self, ticker, info, ts=None):
+        """Record a snapshot of a ticker.
+
+        :param ticker: Stock ticker in Yahoo Finances format.
+        :type ticker: string
+        :param info: Field values, as returned by Stock.get_info().
+        :type info: dictionary
+        :param ts: Snapshot time in seconds since the epoch, defaults to now
+        :type ts: float, optional
+        :returns: Number of changed fields written.
+        :rtype: integer
+        :raises: ValueError
+        """
+        return self.record_many({ticker: info}, ts)
+
+    def record_many(self, infos, ts=None):
+        """Record snapshots of many tickers, taken at the same time.
+
+        >>> store.record_many(dict((q['Symbol'], q) for q in quotes))
+
+        :param infos: Field values by ticker.
+        :type infos: dictionary
+        :param ts: Snapshot time in seconds since the epoch, defaults to now
+        :type ts: float, optional
+        :returns: Number of changed fields written.
+        :rtype: integer
+        :raises: ValueError
+        """
+        ts = time.time() if ts is None else ts
+        with self.__lock:
+            connection = self.__connection
+            known = [self.__symbols[t] for t in infos if t in self.__symbols]
+            self.__load_latest([s for s in known if s not in self.__latest])
+            for ticker in infos:
+                if ticker in self.__symbols:
+                    updated = self.__latest[self.__symbols[ticker]][0]
+                    if updated is not None and ts < updated:
+                        raise ValueError('Snapshots of ' + ticker + ' must ' +
+                                         'be recorded in time order.')
+            symbols = [self.__symbol(t) for t in infos]
+            self.__load_latest([s for s in symbols
+                                if s not in self.__latest])
+            rows = []
+            for symbol, ticker in zip(symbols, infos):
+                values = self.__latest[symbol][1]
+                current = {}
+                for name, value in infos[ticker].items():
+                    if value is not None:
+                        current[self.__field(name)] = value
+                for field, value in current.items():
+                    if values.get(field) != value:
+                        rows.append((symbol, field, ts, value))
+                for field in values:
+                    if field not in current:
+                        rows.append((symbol, field, ts, None))
+                self.__latest[symbol] = (ts, current)
+            connection.executemany(
+                'INSERT OR REPLACE INTO changes VALUES (?, ?, ?, ?)', rows)
+            connection.commit()
+        return len(rows)
+
+    def as_of(self, ticker, ts, fields=None):
+        """Rebuild the information of a ticker as of a time.
+
+        :param ticker: Stock ticker in Yahoo Finances format.
+        :type ticker: string
+        :param ts: Time in seconds since the epoch.
+        :type ts: float
+        :param fields: Fields to rebuild, defaults to all
+        :type fields: list of strings, optional
+        :returns: Field values known at ts, empty if none.
+        :rtype: dictionary
+        """
+        return self.as_of_many([ticker], ts, fields).get(ticker, {})
+
+    def as_of_many(self, tickers_list, ts, fields=None):
+        """Rebuild the information of many tickers as of a time.
+
+        >>> store.as_of_many(['AAPL', 'YHOO'], ts, ['PERatio'])
+        {'AAPL': {'PERatio': '10.82'}, 'YHOO': {'PERatio': None}}
+
+        :param tickers_list: List of tickers.
+        :type tickers_list: list of strings
+        :param ts: Time in seconds since the epoch.
+        :type ts: float
+        :param fields: Fields to rebuild, defaults to all
+        :type fields: list of strings, optional
+        :returns: Field values known at ts by ticker. Tickers without
+            snapshots at ts are left out. With fields, every one of them is
+            present, None when unknown.
+        :rtype: dictionary
+        """
+        with self.__lock:
+            symbols = dict((self.__symbols[t], t) for t in tickers_list
+                           if t in self.__symbols)
+            field_ids = None
+            if fields is not None:
+                field_ids = [self.__fields[f] for f in fields
+                             if f in self.__fields]
+            rows = self.__as_of(list(symbols), ts, field_ids)
+        result = {}
+        for symbol, field, value in rows:
+            info = result.get(symbols[symbol])
+            if info is None:
+                info = result[symbols[symbol]] = {}
+            if value is not None:
+                info[self.__field_names[field]] = value
+        if fields is not None:
+            for info in result.values():
+                for name in fields:
+                    info.setdefault(name, None)
+        return result
+
+    def history(self, ticker, field):
+        """Get every change of a field of a ticker.
+
+        :param ticker: Stock ticker in Yahoo Finances format.
+        :type ticker: string
+        :param field: Field name.
+        :type field: string
+        :returns: Time and new value of every change, in time order. None
+            values mean the field was removed.
+        :rtype: list of tuples
+        """
+        with self.__lock:
+            if ticker not in self.__symbols or field not in self.__fields:
+                return []
+            return list(self.__connection.execute(
+                'SELECT ts, value FROM changes WHERE symbol = ? AND '
+                'field = ? ORDER BY ts',
+                (self.__symbols[ticker], self.__fields[field])))
+
+    def close(self):
+        """Close the file."""
+        with self.__lock:
+            self.__connection.close()
+
+    def __symbol(self, ticker):
+        """Get the id of a ticker, adding it if new."""
+        symbol = self.__symbols.get(ticker)
+        if symbol is None:
+            symbol = self.__connection.execute(
+                'INSERT INTO symbols (ticker) VALUES (?)', (ticker,)
+            ).lastrowid
+            self.__symbols[ticker] = symbol
+        return symbol
+
+    def __field(self, name):
+        """Get the id of a field, adding it if new."""
+        field = self.__fields.get(name)
+        if field is None:
+            field = self.__connection.execute(
+                'INSERT INTO fields (name) VALUES (?)', (name,)).lastrowid
+            self.__fields[name] = field
+            self.__field_names[field] = name
+        return field
+
+    def __load_latest(self, symbols):
+        """Load the last recorded time and values of some tickers."""
+        for symbol in symbols:
+            self.__latest[symbol] = (None, {})
+        if not symbols:
+            return
+        for symbol, field, value, ts in self.__as_of(symbols, None, None,
+                                                     with_ts=True):
+            updated, values = self.__latest[symbol]
+            if updated is None or ts > updated:
+                updated = ts
+            if value is not None:
+                values[field] = value
+            self.__latest[symbol] = (updated, values)
+
+    def __as_of(self, symbols, ts, field_ids, with_ts=False):
+        """Latest change of every field of some tickers not after ts."""
+        # SQLite takes the bare columns of a MAX() aggregate from the row
+        # holding the maximum, so a single grouped scan finds every change.
+        if field_ids is None:
+            field_chunks = [None]
+        elif not field_ids:
+            return []
+        else:
+            # Fields take at most half of the parameters, symbols the rest
+            size = _MAX_PARAMETERS // 2
+            field_chunks = [field_ids[i:i + size]
+                            for i in range(0, len(field_ids), size)]
+        rows = []
+        for fields in field_chunks:
+            conditions = []
+            parameters = []
+            if ts is not None:
+                conditions.append('ts <= ?')
+                parameters.append(ts)
+            if fields is not None:
+                conditions.append('field IN ({0})'.format(
+                    ', '.join('?' * len(fields))))
+                parameters.extend(fields)
+            step = _MAX_PARAMETERS - len(parameters)
+            for i in range(0, len(symbols), step):
+                chunk = symbols[i:i + step]
+                query = ('SELECT symbol, field, value, MAX(ts) FROM changes '
+                         'WHERE symbol IN ({0}){1} '
+                         'GROUP BY symbol, field').format(
+                    ', '.join('?' * len(chunk)),
+                    ''.join(' AND ' + c for c in conditions))
+                for symbol, field, value, latest in \
+                        self.__connection.execute(query, chunk + parameters):
+                    rows.append((symbol, field, value, latest) if with_ts
+                                else (symbol, field, value))
+        return rows
@@ -0,0 +1,398 @@
+"""
+Gateway module.
+
+This module contains the local quote gateway, a small HTTP service that polls
+Yahoo Finance once on behalf of many clients. It serves quote snapshots and
+streams quote changes as newline delimited JSON. Run it with::
+
+    $ python -m rtstock.gateway --port 8765 --interval 1
+
+and point clients at it with :func:`rtstock.utils.use_gateway`.
+"""
+
+from __future__ import unicode_literals
+import argparse
+import json
+import threading
+import time
+
+try:
+    # Python 3
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+    from socketserver import ThreadingMixIn
+    from urllib.parse import urlparse, parse_qs
+except ImportError:
+    # Python 2
+    from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+    from SocketServer import ThreadingMixIn
+    from urlparse import urlparse, parse_qs
+
+from .utils import is_ticker_error, request_quotes_batched, use_gateway
+
+
+class QuoteGateway(object):
+    """Class for handling the quote gateway.
+
+    Keeps the latest quote of every ticker requested from it and polls them
+    all, in batches, every interval seconds. Snapshots are answered from
+    memory, requesting upstream only the tickers seen for the first time, and
+    stream subscribers are woken after every poll to receive the changes.
+    Tickers no client asked for in idle seconds stop being polled, and so do
+    the least recently asked for ones beyond max_tickers.
+
+    >>> from rtstock.gateway import QuoteGateway
+    >>>
+    >>> gateway = QuoteGateway(interval=1)
+    >>> gateway.serve_forever('localhost', 8765)
+
+    :param interval: Seconds between polls, defaults to 1
+    :type interval: float, optional
+    :param fetch: Function called with the tickers and columns to poll the
+        quotes, defaults to request_quotes_batched
+    :type fetch: function, optional
+    :param idle: Seconds a ticker is polled after it was last asked for,
+        defaults to an hour
+    :type idle: float, optional
+    :param max_tickers: Most tickers polled, defaults to 10000
+    :type max_tickers: integer, optional
+    """
+
+    def __init__(self, interval=1.0, fetch=None, idle=3600,
+                 max_tickers=10000):
+        """Instantiate QuoteGateway class."""
+        self.interval = interval
+        self.idle = idle
+        self.max_tickers = max_tickers
+        self.__fetch = fetch or request_quotes_batched
+        self.__quotes = {}
+        self.__errors = {}
+        self.__invalid = set()
+        # Time each polled ticker was last asked for by a client
+        self.__requested = {}
+        # Event set once the first fetch of a ticker is done
+        self.__pending = {}
+        self.__version = 0
+        self.__lock = threading.Lock()
+        self.__changed = threading.Condition()
+        self.__stop = threading.Event()
+        self.__poller = None
+        self.server = None
+
+    def __repr__(self):
+        """An unambiguous representation of a QuoteGateway's instance."""
+        return '<QuoteGateway {n} tickers>'.format(n=len(self.__requested))
+
+    @property
+    def stopped(self):
+        """Whether the gateway has been stopped."""
+        return self.__stop.is_set()
+
+    def snapshot(self, tickers_list, selected_columns=['*']):
+        """Get the latest quotes of a list of tickers.
+
+        Tickers never requested before are fetched right away and polled
+        from then on.
+
+        :param tickers_list: List of tickers that will be returned.
+        :type tickers_list: list of strings
+        :param selected_columns: List of columns to be returned,
+            defaults to ['*']
+        :type selected_columns: list of strings, optional
+        :returns: Quotes, in the order of tickers_list, and a dictionary
+            mapping each failing ticker to its error message.
+        :rtype: tuple of (list of dictionaries, dictionary)
+        """
+        self.__track(tickers_list)
+        quotes = []
+        errors = {}
+        for ticker in tickers_list:
+            if ticker in self.__quotes:
+                quotes.append(_select(self.__quotes[ticker],
+                                      selected_columns))
+            else:
+                errors[ticker] = self.__errors.get(ticker, 'No quote.')
+        return quotes, errors
+
+    def is_invalid(self, ticker):
+        """Whether the latest request of a ticker failed because of it.
+
+        Tickers failing because of upstream outages are not invalid.
+        """
+        return ticker in self.__invalid
+
+    def changes(self, tickers_list, version, sent):
+        """Wait for a poll newer than version and get the changed fields.
+
+        :param tickers_list: List of tickers being followed.
+        :type tickers_list: list of strings
+        :param version: Last poll already seen.
+        :type version: integer
+        :param sent: Latest quote sent for each ticker, updated in place.
+        :type sent: dictionary
+        :returns: Current version and, for every changed ticker, its Symbol
+            along with the changed fields.
+        :rtype: tuple of (integer, list of dictionaries)
+        """
+        with self.__lock:
+            self.__touch(tickers_list)
+        with self.__changed:
+            while self.__version == version and not self.__stop.is_set():
+                self.__changed.wait(1.0)
+            version = self.__version
+        deltas = []
+        for ticker in tickers_list:
+            quote = self.__quotes.get(ticker)
+            if quote is None:
+                continue
+            previous = sent.get(ticker, {})
+            delta = dict((k, v) for k, v in quote.items()
+                         if previous.get(k) != v)
+            if delta:
+                delta['Symbol'] = ticker
+                deltas.append(delta)
+                sent[ticker] = quote
+        return version, deltas
+
+    def poll(self):
+        """Poll the quotes of every tracked ticker once."""
+        oldest = time.time() - self.idle
+        with self.__lock:
+            self.__forget([t for t, requested in self.__requested.items()
+                           if requested < oldest])
+            tickers_list = list(self.__requested)
+        if tickers_list:
+            self.__update(tickers_list)
+
+    def start(self):
+        """Start polling in a background thread."""
+        if self.__poller is None:
+            self.__poller = threading.Thread(target=self.__run)
+            self.__poller.daemon = True
+            self.__poller.start()
+
+    def serve_forever(self, host='localhost', port=8765):
+        """Start polling and serve clients until stopped.
+
+        :param host: Host to bind, defaults to 'localhost'
+        :type host: string, optional
+        :param port: Port to bind, 0 for any free port, defaults to 8765
+        :type port: integer, optional
+        """
+        self.bind(host, port)
+        self.start()
+        self.server.serve_forever()
+
+    def bind(self, host='localhost', port=8765):
+        """Create the HTTP server without serving yet.
+
+        :returns: Server.
+        :rtype: GatewayServer
+        """
+        self.server = GatewayServer((host, port), GatewayHandler)
+        self.server.gateway = self
+        return self.server
+
+    def stop(self):
+        """Stop polling and serving."""
+        self.__stop.set()
+        with self.__changed:
+            self.__changed.notify_all()
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+
+    def __track(self, tickers_list):
+        """Fetch the untracked tickers and add them to the polling."""
+        # The lock only guards the bookkeeping, never the upstream fetch, so
+        # snapshots of known tickers do not wait for the network.
+        with self.__lock:
+            self.__touch(tickers_list)
+            new = []
+            waiting = set()
+            for ticker in tickers_list:
+                if ticker in self.__quotes or ticker in self.__errors:
+                    continue
+                if ticker in self.__pending:
+                    waiting.add(self.__pending[ticker])
+                elif ticker not in new:
+                    new.append(ticker)
+            done = threading.Event()
+            for ticker in new:
+                self.__pending[ticker] = done
+        if new:
+            try:
+                self.__update(new)
+            finally:
+                with self.__lock:
+                    for ticker in new:
+                        self.__pending.pop(ticker, None)
+                done.set()
+        for event in waiting:
+            event.wait()
+
+    def __touch(self, tickers_list):
+        """Mark tickers as asked for now, capping how many are polled."""
+        now = time.time()
+        for ticker in tickers_list:
+            self.__requested[ticker] = now
+        excess = len(self.__requested) - self.max_tickers
+        if excess > 0:
+            self.__forget(sorted(self.__requested,
+                                 key=self.__requested.get)[:excess])
+
+    def __forget(self, tickers_list):
+        """Stop polling tickers and drop what is known of them."""
+        for ticker in tickers_list:
+            self.__requested.pop(ticker, None)
+            self.__quotes.pop(ticker, None)
+            self.__errors.pop(ticker, None)
+            self.__invalid.discard(ticker)
+
+    def __update(self, tickers_list):
+        """Fetch quotes and notify the subscribers."""
+        quotes, errors = self.__fetch(tickers_list, ['*'])
+        with self.__changed:
+            for quote in quotes:
+                if quote['Symbol'] not in self.__requested:
+                    # Forgotten while being fetched
+                    continue
+                self.__quotes[quote['Symbol']] = quote
+                self.__invalid.discard(quote['Symbol'])
+            for ticker, error in errors.items():
+                if ticker not in self.__requested:
+                    continue
+                self.__errors[ticker] = str(error)
+                if is_ticker_error(error):
+                    self.__invalid.add(ticker)
+                else:
+                    self.__invalid.discard(ticker)
+            self.__version += 1
+            self.__changed.notify_all()
+
+    def __run(self):
+        """Poll until stopped."""
+        while not self.__stop.is_set():
+            started = time.time()
+            try:
+                self.poll()
+            except Exception:
+                # Keep serving the last quotes through upstream outages
+                pass
+            self.__stop.wait(max(0.0, self.interval -
+                                 (time.time() - started)))
+
+
+class GatewayServer(ThreadingMixIn, HTTPServer):
+    """Class for handling the gateway's HTTP server."""
+
+    daemon_threads = True
+
+
+class GatewayHandler(BaseHTTPRequestHandler):
+    """Class for handling the gateway's HTTP requests.
+
+    - GET /quotes?tickers=AAPL,YHOO&columns=Name,PreviousClose answers a JSON
+      object with the quotes, the errors of the tickers without one and the
+      list of those that are invalid.
+    - GET /stream?tickers=AAPL,YHOO answers newline delimited JSON, first the
+      full quotes and then, after every poll, only the changed fields.
+    """
+
+    protocol_version = 'HTTP/1.0'
+
+    def do_GET(self):
+        """Handle a GET request."""
+        url = urlparse(self.path)
+        params = parse_qs(url.query)
+        tickers_list = _split(params.get('tickers'))
+        columns = _split(params.get('columns')) or ['*']
+        gateway = self.server.gateway
+        if url.path == '/quotes':
+            quotes, errors = gateway.snapshot(tickers_list, columns)
+            invalid = [t for t in errors if gateway.is_invalid(t)]
+            self.__send(200, {'quotes': quotes, 'errors': errors,
+                              'invalid': invalid})
+        elif url.path == '/stream':
+            self.__stream(gateway, tickers_list, columns)
+        else:
+            self.__send(404, {'error': 'Not found.'})
+
+    def log_message(self, format, *args):
+        """Keep the gateway quiet."""
+        pass
+
+    def __send(self, status, body):
+        """Send a JSON response."""
+        data = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def __stream(self, gateway, tickers_list, columns):
+        """Stream the changes of the tickers until the client leaves."""
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/x-ndjson')
+        self.end_headers()
+        gateway.snapshot(tickers_list)
+        sent = {}
+        version = -1
+        try:
+            while not gateway.stopped:
+                version, deltas = gateway.changes(tickers_list, version, sent)
+                lines = [json.dumps(_select(d, columns + ['Symbol']))
+                         for d in deltas]
+                if lines:
+                    self.wfile.write(('\n'.join(lines) + '\n')
+                                     .encode('utf-8'))
+                    self.wfile.flush()
+        except (IOError, OSError):
+            # Client disconnected
+            pass
+
+
+def _select(quote, selected_columns):
+    """Keep only the selected columns of a quote."""
+    if '*' in selected_columns:
+        return dict(quote)
+    return dict((k, quote[k]) for k in selected_columns if k in quote)
+
+
+def _split(values):
+    """Split comma separated query parameters."""
+    result = []
+    for value in values or []:
+        result.extend(v for v in value.split(',') if v)
+    return result
+
+
+def main(args=None):
+    """Run the gateway from the command line."""
+    parser = argparse.ArgumentParser(
+        prog='python -m rtstock.gateway',
+        description='Serve Yahoo Finance quotes to local clients.')
+    parser.add_argument('--host', default='localhost',
+                        help='host to bind (default: localhost)')
+    parser.add_argument('--port', type=int, default=8765,
+                        help='port to bind (default: 8765)')
+    parser.add_argument('--interval', type=float, default=1.0,
+                        help='seconds between polls (default: 1)')
+    parser.add_argument('--tickers', default='',
+                        help='comma separated tickers to poll from start')
+    options = parser.parse_args(args)
+    # The gateway itself must always reach upstream
+    use_gateway(None)
+
+    gateway = QuoteGateway(options.interval)
+    tickers_list = _split([options.tickers])
+    if tickers_list:
+        gateway.snapshot(tickers_list)
+    try:
+        gateway.serve_forever(options.host, options.port)
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,204 @@
+"""
+Ingest module.
+
+This module contains the ingestion of the historical data files saved by
+download_historical() into typed columnar arrays. Files are parsed by a
+parser specialised for their fixed layout and spread across worker
+processes, and the result can be written to a compact binary store.
+"""
+
+from __future__ import unicode_literals
+import array
+import datetime
+import multiprocessing
+import os
+import struct
+import sys
+
+HEADER = 'Date,Open,High,Low,Close,Volume,Adj Close'
+COLUMNS = ['Date', 'Open', 'High', 'Low', 'Close', 'Volume', 'Adj_Close']
+# Dates are days since the epoch, volumes 64 bits integers
+TYPECODES = {'Date': 'i', 'Open': 'd', 'High': 'd', 'Low': 'd',
+             'Close': 'd', 'Volume': 'q', 'Adj_Close': 'd'}
+MAGIC = b'RTSHIST1'
+
+_EPOCH = datetime.date(1970, 1, 1).toordinal()
+_dates = {}
+
+
+def parse_history(path):
+    """Parse a historical data CSV file into typed columns.
+
+    >>> columns = parse_history('AAPL.csv')
+    >>> columns['Close'][:2]
+    array('d', [100.75, 100.529999])
+
+    :param path: CSV file saved by download_historical().
+    :type path: string
+    :returns: Column arrays by column name. Date holds days since
+        1970-01-01, Volume 64 bits integers and the others floats.
+    :rtype: dictionary of array.array
+    :raises: ValueError, ImportError
+    """
+    _require_arrays()
+    with open(path, 'rb') as f:
+        lines = f.read().decode('ascii').splitlines()
+    if not lines or lines[0].strip() != HEADER:
+        raise ValueError(path + " is not a historical data file.")
+    rows = [line.split(',') for line in lines[1:] if line]
+    if any(len(row) != len(COLUMNS) for row in rows):
+        raise ValueError(path + " has rows with a wrong number of fields.")
+
+    columns = dict((c, array.array(TYPECODES[c])) for c in COLUMNS)
+    if not rows:
+        return columns
+    values = list(zip(*rows))
+    columns['Date'].extend(parse_date(d) for d in values[0])
+    for name, column in zip(COLUMNS[1:], values[1:]):
+        if TYPECODES[name] == 'q':
+            # Volumes may come as floats, e.g. '1.5e7'
+            columns[name].extend(int(float(v)) for v in column)
+        else:
+            columns[name].extend(float(v) for v in column)
+    return columns
+
+
+def ingest_folder(folder, workers=None, output=None):
+    """Parse every historical data file of a folder.
+
+    Files are named <ticker>.csv, as saved by download_historical(), and
+    parsed by a pool of worker processes.
+
+    >>> from rtstock.ingest import ingest_folder
+    >>>
+    >>> history = ingest_folder('history', workers=8, output='history.rth')
+    >>> history['AAPL']['Close'][:2]
+    array('d', [100.75, 100.529999])
+
+    :param folder: Folder with the CSV files.
+    :type folder: string
+    :param workers: Number of worker processes, defaults to the number of
+        CPUs. With 1 the files are parsed in the calling process.
+    :type workers: integer, optional
+    :param output: If given, path of a binary store where the result is
+        written, defaults to None
+    :type output: string, optional
+    :returns: Columns of every ticker.
+    :rtype: dictionary of dictionaries of array.array
+    :raises: ValueError, ImportError
+    """
+    _require_arrays()
+    names = sorted(n for n in os.listdir(folder) if n.endswith('.csv'))
+    paths = [os.path.join(folder, n) for n in names]
+    workers = workers or multiprocessing.cpu_count()
+    if workers == 1 or len(paths) < 2:
+        parsed = [parse_history(p) for p in paths]
+    else:
+        pool = multiprocessing.Pool(min(workers, len(paths)))
+        try:
+            chunksize = max(1, len(paths) // (workers * 4))
+            parsed = pool.map(parse_history, paths, chunksize)
+        finally:
+            pool.close()
+            pool.join()
+    history = dict((n[:-len('.csv')], c) for n, c in zip(names, parsed))
+    if output is not None:
+        write_store(output, history)
+    return history
+
+
+def write_store(path, history):
+    """Write columns of many tickers to a binary store.
+
+    The store starts with MAGIC and the number of tickers. Then, for each
+    ticker, come the length of its name, the name, the number of rows and
+    the raw little-endian bytes of every column in COLUMNS order.
+
+    :param path: Store path.
+    :type path: string
+    :param history: Columns of every ticker, as returned by ingest_folder().
+    :type history: dictionary of dictionaries of array.array
+    :raises: ImportError
+    """
+    _require_arrays()
+    with open(path, 'wb') as f:
+        f.write(MAGIC)
+        f.write(struct.pack('<I', len(history)))
+        for ticker in sorted(history):
+            columns = history[ticker]
+            name = ticker.encode('utf-8')
+            rows = len(columns['Date'])
+            f.write(struct.pack('<H', len(name)) + name)
+            f.write(struct.pack('<Q', rows))
+            for c in COLUMNS:
+                column = columns[c]
+                if sys.byteorder != 'little':
+                    column = array.array(column.typecode, column)
+                    column.byteswap()
+                f.write(column.tobytes())
+
+
+def read_store(path):
+    """Read a binary store written by write_store().
+
+    :param path: Store path.
+    :type path: string
+    :returns: Columns of every ticker.
+    :rtype: dictionary of dictionaries of array.array
+    :raises: ValueError, ImportError
+    """
+    _require_arrays()
+    with open(path, 'rb') as f:
+        data = f.read()
+    if data[:len(MAGIC)] != MAGIC:
+        raise ValueError(path + " is not a history store.")
+    offset = len(MAGIC)
+    count, = struct.unpack_from('<I', data, offset)
+    offset += 4
+    history = {}
+    for _ in range(count):
+        length, = struct.unpack_from('<H', data, offset)
+        offset += 2
+        ticker = data[offset:offset + length].decode('utf-8')
+        offset += length
+        rows, = struct.unpack_from('<Q', data, offset)
+        offset += 8
+        columns = {}
+        for c in COLUMNS:
+            column = array.array(TYPECODES[c])
+            size = rows * column.itemsize
+            column.frombytes(data[offset:offset + size])
+            if sys.byteorder != 'little':
+                column.byteswap()
+            columns[c] = column
+            offset += size
+        history[ticker] = columns
+    return history
+
+
+def parse_date(value):
+    """Convert a "yyyy-mm-dd" date to days since 1970-01-01.
+
+    Conversions are cached, as the same dates repeat across tickers.
+
+    >>> parse_date('2016-03-02')
+    16862
+
+    :param value: Date.
+    :type value: string on the format of "yyyy-mm-dd"
+    :returns: Days since the epoch.
+    :rtype: integer
+    """
+    days = _dates.get(value)
+    if days is None:
+        days = datetime.date(int(value[:4]), int(value[5:7]),
+                             int(value[8:10])).toordinal() - _EPOCH
+        _dates[value] = days
+    return days
+
+
+def _require_arrays():
+    """Raise an ImportError if arrays lack 64 bits integers or bytes."""
+    if 'q' not in getattr(array, 'typecodes', '') or \
+            not hasattr(array.array, 'frombytes'):
+        raise ImportError("History ingestion requires Python 3.3 or later.")
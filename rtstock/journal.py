@@ -0,0 +1,366 @@
+"""
+Journal module.
+
+This module contains the tick journal, an append-only binary record of the
+quote updates received from polls. Records have a fixed width, and both
+timestamps and prices are stored as deltas, so journals stay compact and can
+be replayed quickly.
+"""
+
+from __future__ import unicode_literals
+import bisect
+import datetime
+import os
+import struct
+import time
+
+from .utils import to_float
+
+MAGIC = b'RTSJRNL1'
+PRICE_SCALE = 10000
+
+# Record kinds
+TICK = 0
+SYMBOL = 1
+CLOCK = 2
+PRICE = 3
+
+# kind, symbol id, timestamp delta (us), price delta (1/PRICE_SCALE), volume
+RECORD = struct.Struct('<BxxxIIiq')
+_INT32 = 2 ** 31
+_UINT32 = 2 ** 32
+
+
+class TickJournal(object):
+    """Class for handling a tick journal writer.
+
+    Appends every quote update to binary files in a folder. Each record is
+    RECORD.size bytes long. A tick stores the time elapsed since the previous
+    record in microseconds and the price change since the previous tick of
+    the same ticker, in units of 1 / PRICE_SCALE. Whenever a delta does not
+    fit, an absolute CLOCK or PRICE record is written first. Tickers are
+    declared by SYMBOL records the first time they appear in a file, so every
+    file can be read on its own.
+
+    Files are named <yyyymmdd>-<sequence>.rtj and rotate when they reach
+    max_bytes or when the day changes (UTC).
+
+    >>> from rtstock.journal import TickJournal
+    >>>
+    >>> with TickJournal('ticks') as journal:
+    ...     journal.record_quotes(request_quotes(['AAPL', 'YHOO'],
+    ...                           ['Symbol', 'LastTradePriceOnly', 'Volume']))
+
+    :param folder: Folder where the journal files are written.
+    :type folder: string
+    :param max_bytes: File size that triggers a rotation, defaults to 64 MB
+    :type max_bytes: integer, optional
+    :param daily: Whether to rotate when the day changes, defaults to True
+    :type daily: boolean, optional
+    :param checkpoint: Records between checkpoints, where every delta is
+        reset so readers can start decoding there, defaults to 4096
+    :type checkpoint: integer, optional
+    :raises: ImportError, on Python versions before 3.4
+    """
+
+    def __init__(self, folder, max_bytes=64 * 1024 * 1024, daily=True,
+                 checkpoint=4096):
+        """Instantiate TickJournal class."""
+        _require_iter_unpack()
+        self.folder = folder
+        self.max_bytes = max_bytes
+        self.daily = daily
+        self.checkpoint = checkpoint
+        self.path = None
+        self.__file = None
+        self.__day = None
+        if not os.path.isdir(folder):
+            os.makedirs(folder)
+
+    def __repr__(self):
+        """An unambiguous representation of a TickJournal's instance."""
+        return '<TickJournal {folder}>'.format(folder=self.folder)
+
+    def __enter__(self):
+        """Enter the context."""
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        """Close the journal on leaving the context."""
+        self.close()
+
+    def record(self, ticker, price, volume=0, timestamp=None):
+        """Append a quote update.
+
+        :param ticker: Stock ticker in Yahoo Finances format.
+        :type ticker: string
+        :param price: Last trade price.
+        :type price: float
+        :param volume: Volume, defaults to 0
+        :type volume: integer, optional
+        :param timestamp: Seconds since the epoch, defaults to now
+        :type timestamp: float, optional
+        """
+        timestamp = time.time() if timestamp is None else timestamp
+        micros = int(round(timestamp * 1000000))
+        self.__prepare(micros)
+
+        records = []
+        symbol = self.__symbols.get(ticker)
+        if symbol is None:
+            symbol = self.__symbols[ticker] = len(self.__symbols)
+            records.append(_symbol_record(symbol, ticker))
+
+        delta = micros - self.__clock
+        if not 0 <= delta < _UINT32:
+            # Readers reset every price on a CLOCK record
+            self.__reset()
+            records.append(RECORD.pack(CLOCK, 0, 0, 0, micros))
+            delta = 0
+        self.__clock = micros
+
+        ticks = int(round(price * PRICE_SCALE))
+        previous = self.__prices.get(symbol)
+        if previous is None or not -_INT32 <= ticks - previous < _INT32:
+            records.append(RECORD.pack(PRICE, symbol, 0, 0, ticks))
+            previous = ticks
+        self.__prices[symbol] = ticks
+
+        records.append(RECORD.pack(TICK, symbol, delta, ticks - previous,
+                                   int(volume)))
+        self.__file.write(b''.join(records))
+        self.__count += len(records)
+
+    def record_quotes(self, quotes, timestamp=None):
+        """Append the quotes returned by request_quotes().
+
+        Quotes need the Symbol and LastTradePriceOnly fields, and may have a
+        Volume field. Quotes without a price are skipped.
+
+        :param quotes: Quotes.
+        :type quotes: list of dictionaries
+        :param timestamp: Seconds since the epoch, defaults to now
+        :type timestamp: float, optional
+        """
+        timestamp = time.time() if timestamp is None else timestamp
+        for quote in quotes:
+            price = to_float(quote.get('LastTradePriceOnly'))
+            if price != price:
+                continue
+            volume = to_float(quote.get('Volume'))
+            self.record(quote['Symbol'], price,
+                        0 if volume != volume else volume, timestamp)
+
+    def flush(self):
+        """Flush the current file."""
+        if self.__file is not None:
+            self.__file.flush()
+
+    def close(self):
+        """Close the current file."""
+        if self.__file is not None:
+            self.__file.close()
+            self.__file = None
+
+    def __prepare(self, micros):
+        """Rotate the file if needed and write checkpoints."""
+        day = datetime.date(*time.gmtime(micros // 1000000)[:3])
+        if (self.__file is None or
+                (self.daily and day != self.__day) or
+                self.__file.tell() >= self.max_bytes):
+            self.__open(day)
+        elif self.__count >= self.checkpoint:
+            self.__reset()
+            self.__file.write(RECORD.pack(CLOCK, 0, 0, 0, micros))
+            self.__clock = micros
+
+    def __open(self, day):
+        """Open the next journal file."""
+        self.close()
+        prefix = day.strftime('%Y%m%d')
+        sequence = 0
+        while True:
+            path = os.path.join(self.folder, '{0}-{1:04d}.rtj'.format(
+                prefix, sequence))
+            if not os.path.exists(path):
+                break
+            sequence += 1
+        self.path = path
+        self.__day = day
+        self.__file = open(path, 'wb')
+        self.__file.write(MAGIC)
+        self.__symbols = {}
+        self.__reset()
+        # Forces a CLOCK record as the first record of the file
+        self.__clock = -_UINT32
+
+    def __reset(self):
+        """Reset price deltas at a checkpoint."""
+        self.__prices = {}
+        self.__count = 0
+
+
+def read_journal(path):
+    """Read a journal file sequentially.
+
+    >>> for timestamp, ticker, price, volume in read_journal(path):
+    ...     print(ticker, price)
+
+    :param path: Journal file path.
+    :type path: string
+    :returns: Generator of (timestamp, ticker, price, volume) tuples, where
+        timestamp is in seconds since the epoch.
+    :rtype: generator
+    :raises: ValueError, ImportError
+    """
+    _require_iter_unpack()
+    with open(path, 'rb') as f:
+        data = f.read()
+    for tick in _decode(data, len(MAGIC), {}):
+        yield tick
+
+
+def read_journals(folder):
+    """Read every journal file of a folder in chronological order.
+
+    :param folder: Journal folder path.
+    :type folder: string
+    :returns: Generator of (timestamp, ticker, price, volume) tuples.
+    :rtype: generator
+    """
+    for name in sorted(os.listdir(folder)):
+        if name.endswith('.rtj'):
+            for tick in read_journal(os.path.join(folder, name)):
+                yield tick
+
+
+class JournalIndex(object):
+    """Class for handling time-indexed reads of a journal folder.
+
+    Scans the journal files once, keeping the first time of every file and
+    the time and offset of every checkpoint, along with the tickers declared
+    before it. Range reads then jump straight to the closest checkpoint.
+
+    >>> index = JournalIndex('ticks')
+    >>> for tick in index.read(start, end):
+    ...     print(tick)
+
+    :param folder: Journal folder path.
+    :type folder: string
+    """
+
+    def __init__(self, folder):
+        """Instantiate JournalIndex class."""
+        _require_iter_unpack()
+        self.folder = folder
+        self.__files = []
+        self.refresh()
+
+    def refresh(self):
+        """Rescan the folder, picking up new records."""
+        files = []
+        for name in sorted(os.listdir(self.folder)):
+            if not name.endswith('.rtj'):
+                continue
+            path = os.path.join(self.folder, name)
+            times, offsets, symbols = _checkpoints(path)
+            if times:
+                files.append((times[0], path, times, offsets, symbols))
+        self.__files = files
+
+    def read(self, start=None, end=None):
+        """Read the ticks between two times.
+
+        :param start: Seconds since the epoch, defaults to the beginning
+        :type start: float, optional
+        :param end: Seconds since the epoch (excluded), defaults to the end
+        :type end: float, optional
+        :returns: Generator of (timestamp, ticker, price, volume) tuples.
+        :rtype: generator
+        """
+        starts = [f[0] for f in self.__files]
+        first = 0
+        if start is not None:
+            first = max(0, bisect.bisect_right(starts, start) - 1)
+        for _, path, times, offsets, symbols in self.__files[first:]:
+            if end is not None and times[0] >= end:
+                return
+            i = 0
+            if start is not None:
+                i = max(0, bisect.bisect_right(times, start) - 1)
+            with open(path, 'rb') as f:
+                data = f.read()
+            for tick in _decode(data, offsets[i], dict(symbols[i])):
+                if end is not None and tick[0] >= end:
+                    return
+                if start is None or tick[0] >= start:
+                    yield tick
+
+
+def _decode(data, offset, names):
+    """Decode the records of a journal file from an offset."""
+    if data[:len(MAGIC)] != MAGIC:
+        raise ValueError("Not a tick journal file.")
+    end = len(data) - (len(data) - offset) % RECORD.size
+    clock = 0
+    prices = {}
+    for kind, symbol, delta, change, value in \
+            RECORD.iter_unpack(data[offset:end]):
+        if kind == TICK:
+            clock += delta
+            price = prices[symbol] + change
+            prices[symbol] = price
+            yield (clock / 1000000.0, names[symbol],
+                   price / float(PRICE_SCALE), value)
+        elif kind == CLOCK:
+            clock = value
+            prices = {}
+        elif kind == PRICE:
+            prices[symbol] = value
+        elif kind == SYMBOL:
+            names[symbol] = _symbol_name(delta, change, value)
+
+
+def _checkpoints(path):
+    """Times, offsets and declared tickers of a file's checkpoints."""
+    with open(path, 'rb') as f:
+        data = f.read()
+    if data[:len(MAGIC)] != MAGIC:
+        raise ValueError("Not a tick journal file.")
+    times = []
+    offsets = []
+    symbols = []
+    names = {}
+    offset = len(MAGIC)
+    end = len(data) - (len(data) - offset) % RECORD.size
+    for kind, symbol, delta, change, value in \
+            RECORD.iter_unpack(data[offset:end]):
+        if kind == CLOCK:
+            times.append(value / 1000000.0)
+            offsets.append(offset)
+            symbols.append(list(names.items()))
+        elif kind == SYMBOL:
+            names[symbol] = _symbol_name(delta, change, value)
+        offset += RECORD.size
+    return times, offsets, symbols
+
+
+def _symbol_record(symbol, ticker):
+    """Pack a SYMBOL record, the ticker filling the last 16 bytes."""
+    encoded = ticker.encode('ascii')
+    if len(encoded) > 16:
+        raise ValueError(ticker + " is longer than 16 bytes.")
+    return RECORD.pack(SYMBOL, symbol,
+                       *struct.unpack('<Iiq', encoded.ljust(16, b'\0')))
+
+
+def _symbol_name(delta, change, value):
+    """Unpack the ticker of a SYMBOL record."""
+    return struct.pack('<Iiq', delta, change, value).rstrip(b'\0') \
+        .decode('ascii')
+
+
+def _require_iter_unpack():
+    """Raise an ImportError if records cannot be unpacked in bulk."""
+    if not hasattr(RECORD, 'iter_unpack'):
+        raise ImportError("Tick journals require Python 3.4 or later.")
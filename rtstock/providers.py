@@ -0,0 +1,756 @@
+"""
+Providers module.
+
+This module contains the data providers, interchangeable backends that answer
+quote, historical data and download requests with the same field names, and
+the router that sends every request to the fastest healthy provider. Failed
+requests are retried on the next provider, so an outage of one backend only
+costs the time of the failed attempt.
+"""
+
+from __future__ import unicode_literals
+import datetime
+import threading
+import time
+
+try:
+    # Python 3
+    from urllib.request import quote
+    from urllib.error import HTTPError
+except ImportError:
+    # Python 2
+    from urllib2 import quote, HTTPError
+
+from .decoding import extract, Extractor, iter_items, loads
+from .error import DeadlineError, ProviderError, RequestError
+from .tracing import clock, record, span
+
+
+HISTORICAL_COLUMNS = ['Date', 'Open', 'High', 'Low', 'Close', 'Volume',
+                      'Adj_Close']
+# Header of the historical data CSV files, as Yahoo Finance used to serve
+HISTORICAL_HEADER = 'Date,Open,High,Low,Close,Volume,Adj Close'
+
+# Fields of the Yahoo Finance quote endpoint, by YQL field name. Names listed
+# later take precedence when a quote has more than one of them.
+YAHOO_FIELDS = [
+    ('symbol', 'Symbol'),
+    ('shortName', 'Name'),
+    ('longName', 'Name'),
+    ('currency', 'Currency'),
+    ('fullExchangeName', 'StockExchange'),
+    ('regularMarketPrice', 'LastTradePriceOnly'),
+    ('regularMarketTime', 'LastTradeTime'),
+    ('regularMarketChange', 'Change'),
+    ('regularMarketChangePercent', 'ChangeinPercent'),
+    ('regularMarketPreviousClose', 'PreviousClose'),
+    ('regularMarketOpen', 'Open'),
+    ('regularMarketDayHigh', 'DaysHigh'),
+    ('regularMarketDayLow', 'DaysLow'),
+    ('regularMarketVolume', 'Volume'),
+    ('averageDailyVolume3Month', 'AverageDailyVolume'),
+    ('fiftyTwoWeekHigh', 'YearHigh'),
+    ('fiftyTwoWeekLow', 'YearLow'),
+    ('bid', 'Bid'),
+    ('ask', 'Ask'),
+    ('marketCap', 'MarketCapitalization'),
+    ('trailingPE', 'PERatio'),
+    ('epsTrailingTwelveMonths', 'EarningsShare'),
+    ('trailingAnnualDividendRate', 'DividendShare'),
+    ('trailingAnnualDividendYield', 'DividendYield'),
+]
+
+
+def _as_list(value):
+    """Wrap a single YQL result into a list."""
+    if not value:
+        return []
+    if not type(value) is list:
+        return [value]
+    return value
+
+
+def _format(value):
+    """Format a number the way YQL does, as a string."""
+    if value is None or isinstance(value, type('')):
+        return value
+    if isinstance(value, float):
+        return repr(value)
+    return '{0}'.format(value)
+
+
+def _legacy_csv(data):
+    """Turn a Yahoo Finance CSV download into the legacy layout.
+
+    Columns are reordered as HISTORICAL_HEADER, rows of days without
+    prices, holding 'null' values, are dropped and rows are sorted newest
+    first.
+    """
+    lines = data.decode('ascii').splitlines()
+    if not lines:
+        return data
+    header = lines[0].strip().split(',')
+    indexes = [header.index(c) for c in HISTORICAL_HEADER.split(',')]
+    rows = []
+    for line in lines[1:]:
+        fields = line.strip().split(',')
+        if len(fields) != len(header) or 'null' in fields:
+            continue
+        rows.append(','.join(fields[i] for i in indexes))
+    rows.reverse()
+    return '\n'.join([HISTORICAL_HEADER] + rows + ['']).encode('ascii')
+
+
+def normalize_quote(quote, selected_columns=['*']):
+    """Rename the fields of a Yahoo Finance quote to their YQL names.
+
+    Numbers are formatted as strings and percentages get a sign and a
+    percent sign, as YQL did. Fields without a YQL name are dropped.
+
+    >>> normalize_quote({'symbol': 'AAPL', 'regularMarketPrice': 95.6})
+    {'Symbol': 'AAPL', 'LastTradePriceOnly': '95.6'}
+
+    :param quote: Quote from the Yahoo Finance quote endpoint.
+    :type quote: dictionary
+    :param selected_columns: YQL columns to keep, defaults to ['*']
+    :type selected_columns: list of strings, optional
+    :returns: Quote with YQL field names.
+    :rtype: dictionary
+    """
+    result = {}
+    for field, name in YAHOO_FIELDS:
+        if quote.get(field) is not None:
+            result[name] = _format(quote[field])
+    if quote.get('regularMarketChangePercent') is not None:
+        result['ChangeinPercent'] = '{0:+.2f}%'.format(
+            quote['regularMarketChangePercent'])
+    if quote.get('regularMarketTime') is not None:
+        result['LastTradeTime'] = datetime.datetime.utcfromtimestamp(
+            quote['regularMarketTime']).strftime('%H:%M')
+    if '*' in selected_columns:
+        return result
+    return dict((c, result.get(c)) for c in selected_columns)
+
+
+class Provider(object):
+    """Base class of the data providers.
+
+    Subclasses answer some or all of request_quotes(), request_historical()
+    and download_historical(), raising NotImplementedError for the others.
+    Requests the provider answered, even negatively, must return a result or
+    raise RequestError. Any other exception is taken as a provider failure.
+    Every method takes a timeout, in seconds, to be passed on to fetch.
+
+    :param fetch: Function called with an URL, and the timeout keyword, plus
+        the keep_body and modified_since keywords for downloads, returning
+        the response body.
+    :type fetch: function
+    :param stream: Function called with an URL and the timeout keyword,
+        returning the response as a generator of text blocks, defaults to
+        None
+    :type stream: function, optional
+    """
+
+    #: Provider name, used on statistics and errors.
+    name = None
+    #: Preferred providers are used before faster ones while healthy.
+    preferred = False
+
+    def __init__(self, fetch, stream=None):
+        """Instantiate Provider class."""
+        self.fetch = fetch
+        self.stream = stream
+
+    def __repr__(self):
+        """An unambiguous representation of a Provider's instance."""
+        return '<{cls} {name}>'.format(cls=type(self).__name__,
+                                       name=self.name)
+
+    def request_quotes(self, tickers_list, selected_columns, timeout=None):
+        """Request recent quotes.
+
+        :returns: One quote per ticker, or an empty list if the columns are
+            not valid.
+        :rtype: list of dictionaries
+        """
+        raise NotImplementedError
+
+    def quotes_url_length(self, selected_columns):
+        """Get the lengths of the URL of a quotes request.
+
+        :returns: Length of the URL without tickers, and function giving the
+            length each ticker adds.
+        :rtype: tuple of (integer, function)
+        """
+        raise NotImplementedError
+
+    def request_values(self, tickers_list, selected_columns, types=None,
+                       timeout=None):
+        """Request recent quotes as tuples of the selected columns.
+
+        :param types: Conversion function by column, defaults to None
+        :type types: dictionary, optional
+        :returns: One tuple per ticker, or an empty list if the columns are
+            not valid.
+        :rtype: list of tuples
+        """
+        quotes = self.request_quotes(tickers_list, selected_columns,
+                                     timeout=timeout)
+        return Extractor(selected_columns, types)(quotes)
+
+    def request_historical(self, ticker, start_date, end_date,
+                           timeout=None):
+        """Request daily historical information, newest first.
+
+        :returns: Rows with the HISTORICAL_COLUMNS keys, or an empty list if
+            the ticker is not valid.
+        :rtype: list of dictionaries
+        """
+        raise NotImplementedError
+
+    def iter_historical(self, ticker, start_date, end_date, timeout=None):
+        """Iterate over daily historical information, newest first.
+
+        Defaults to the rows of request_historical().
+
+        :returns: Rows with the HISTORICAL_COLUMNS keys, none if the ticker
+            is not valid.
+        :rtype: iterator of dictionaries
+        """
+        return iter(self.request_historical(ticker, start_date, end_date,
+                                            timeout=timeout))
+
+    def download_historical(self, ticker, modified_since=None,
+                            timeout=None):
+        """Download the full historical data as CSV.
+
+        :returns: CSV file contents, or None if not modified since
+            modified_since.
+        :rtype: bytes or None
+        :raises: RequestError
+        """
+        raise NotImplementedError
+
+    def _download(self, url, ticker, modified_since, timeout):
+        """Download a CSV file, turning a missing table into RequestError."""
+        try:
+            return self.fetch(url, keep_body=False,
+                              modified_since=modified_since, timeout=timeout)
+        except HTTPError as e:
+            if e.code == 404:
+                raise RequestError(ticker + ' is not a valid stock ticker.')
+            raise
+
+
+class YQLProvider(Provider):
+    """Class for handling the YQL provider.
+
+    Check `here <http://goo.gl/8AROUD>`_ for more information on YQL.
+    """
+
+    name = 'yql'
+    url = 'https://query.yahooapis.com/v1/public/yql?q={query}' + \
+        '&format=json&env=store://datatables.org/alltableswithkeys'
+    download_url = 'http://real-chart.finance.yahoo.com/table.csv?s={ticker}'
+
+    def query_url(self, query):
+        """Build the URL of a YQL query."""
+        return self.url.format(query=quote(query))
+
+    def quotes_query(self, tickers_list, selected_columns):
+        """Build the YQL query of a quotes request."""
+        query = 'select {cols} from yahoo.finance.quotes ' + \
+            'where symbol in ({vals})'
+        return query.format(
+            cols=', '.join(selected_columns),
+            vals=', '.join('"{0}"'.format(s) for s in tickers_list)
+        )
+
+    def historical_query(self, ticker, start_date, end_date):
+        """Build the YQL query of a historical data request."""
+        query = 'select {cols} from yahoo.finance.historicaldata ' + \
+            'where symbol in ("{ticker}") and startDate = "{start_date}" ' + \
+            'and endDate = "{end_date}"'
+        return query.format(
+            cols=', '.join(HISTORICAL_COLUMNS),
+            ticker=ticker,
+            start_date=start_date,
+            end_date=end_date
+        )
+
+    def quotes_url_length(self, selected_columns):
+        """Get the lengths of the URL of a quotes request."""
+        base = len(self.query_url(self.quotes_query([], selected_columns)))
+        separator = len(quote(', '))
+        return base, lambda t: len(quote('"{0}"'.format(t))) + separator
+
+    def __request(self, query, timeout):
+        """Run a YQL query."""
+        response = self.fetch(self.query_url(query), timeout=timeout)
+        results = loads(response)['query']['results']
+        return _as_list(results and results['quote'])
+
+    def request_quotes(self, tickers_list, selected_columns, timeout=None):
+        """Request recent quotes."""
+        return self.__request(self.quotes_query(tickers_list,
+                                                selected_columns), timeout)
+
+    def request_values(self, tickers_list, selected_columns, types=None,
+                       timeout=None):
+        """Request recent quotes as tuples of the selected columns."""
+        query = self.quotes_query(tickers_list, selected_columns)
+        body = self.fetch(self.query_url(query), timeout=timeout)
+        return extract(body, ['query', 'results', 'quote'], selected_columns,
+                       types)
+
+    def request_historical(self, ticker, start_date, end_date,
+                           timeout=None):
+        """Request daily historical information, newest first."""
+        return self.__request(self.historical_query(ticker, start_date,
+                                                    end_date), timeout)
+
+    def iter_historical(self, ticker, start_date, end_date, timeout=None):
+        """Iterate over daily historical information, newest first.
+
+        Rows are decoded as the response arrives when the provider has a
+        stream function.
+        """
+        if self.stream is None:
+            return super(YQLProvider, self).iter_historical(
+                ticker, start_date, end_date, timeout=timeout)
+        url = self.query_url(self.historical_query(ticker, start_date,
+                                                   end_date))
+        return iter_items(self.stream(url, timeout=timeout), 'quote')
+
+    def download_historical(self, ticker, modified_since=None,
+                            timeout=None):
+        """Download the full historical data as CSV."""
+        return self._download(self.download_url.format(ticker=ticker),
+                              ticker, modified_since, timeout)
+
+
+class YahooProvider(Provider):
+    """Class for handling the Yahoo Finance quote and chart endpoints.
+
+    Field names are converted to their YQL equivalents with
+    normalize_quote().
+    """
+
+    name = 'yahoo'
+    quotes_url = 'https://query1.finance.yahoo.com/v7/finance/quote' + \
+        '?symbols={tickers}'
+    chart_url = 'https://query1.finance.yahoo.com/v8/finance/chart/' + \
+        '{ticker}?period1={start}&period2={end}&interval=1d' + \
+        '&events=history'
+    download_url = 'https://query1.finance.yahoo.com/v7/finance/download/' + \
+        '{ticker}?period1=0&period2=9999999999&interval=1d&events=history'
+
+    def quotes_url_length(self, selected_columns):
+        """Get the lengths of the URL of a quotes request."""
+        separator = len(quote(','))
+        return len(self.quotes_url.format(tickers='')), \
+            lambda t: len(quote(t)) + separator
+
+    def request_quotes(self, tickers_list, selected_columns, timeout=None):
+        """Request recent quotes."""
+        url = self.quotes_url.format(tickers=quote(','.join(tickers_list)))
+        response = loads(self.fetch(url, timeout=timeout))
+        # Yahoo Finance answers symbols in upper case whatever was asked
+        found = dict((q['symbol'].upper(), q)
+                     for q in response['quoteResponse']['result'])
+        quotes = []
+        for ticker in tickers_list:
+            # Unknown tickers are answered with empty quotes, as YQL did
+            normalized = normalize_quote(found.get(ticker.upper(), {}),
+                                         selected_columns)
+            if 'Symbol' in normalized or '*' in selected_columns:
+                normalized['Symbol'] = ticker
+            quotes.append(normalized)
+        return quotes
+
+    def request_historical(self, ticker, start_date, end_date,
+                           timeout=None):
+        """Request daily historical information, newest first."""
+        epoch = datetime.date(1970, 1, 1)
+        start = datetime.datetime.strptime(start_date, '%Y-%m-%d').date()
+        end = datetime.datetime.strptime(end_date, '%Y-%m-%d').date()
+        url = self.chart_url.format(
+            ticker=quote(ticker),
+            start=(start - epoch).days * 86400,
+            end=((end - epoch).days + 1) * 86400
+        )
+        try:
+            response = loads(self.fetch(url, timeout=timeout))
+        except HTTPError as e:
+            if e.code == 404:
+                return []
+            raise
+        result = (response['chart']['result'] or [{}])[0]
+        timestamps = result.get('timestamp') or []
+        indicators = result.get('indicators', {})
+        prices = (indicators.get('quote') or [{}])[0]
+        adjusted = (indicators.get('adjclose') or [{}])[0].get('adjclose',
+                                                                [])
+        series = [prices.get(c.lower()) or []
+                  for c in HISTORICAL_COLUMNS[1:-1]]
+        series.append(adjusted)
+        rows = []
+        for i, timestamp in enumerate(timestamps):
+            values = [v[i] if i < len(v) else None for v in series]
+            if None in values:
+                # Days without prices, such as trading halts
+                continue
+            row = dict(zip(HISTORICAL_COLUMNS[1:], map(_format, values)))
+            row['Date'] = datetime.datetime.utcfromtimestamp(
+                timestamp).strftime('%Y-%m-%d')
+            rows.append(row)
+        rows.reverse()
+        return rows
+
+    def download_historical(self, ticker, modified_since=None,
+                            timeout=None):
+        """Download the full historical data as CSV.
+
+        The file is converted to the layout of the YQL provider downloads.
+        """
+        data = self._download(self.download_url.format(ticker=quote(ticker)),
+                              ticker, modified_since, timeout)
+        if data is None:
+            return None
+        return _legacy_csv(data)
+
+
+class GatewayProvider(Provider):
+    """Class for handling a quote gateway as provider.
+
+    Check :mod:`rtstock.gateway` for how to run one. The gateway only answers
+    quote requests and is preferred over the other providers while healthy.
+
+    Tickers the gateway has no quote of fail the request, with RequestError
+    when the gateway found them invalid, so other providers answer for the
+    ones it could not request.
+
+    :param fetch: Function called with an URL returning the response body.
+    :type fetch: function
+    :param url: Gateway base URL.
+    :type url: string
+    """
+
+    name = 'gateway'
+    preferred = True
+
+    def __init__(self, fetch, url):
+        """Instantiate GatewayProvider class."""
+        super(GatewayProvider, self).__init__(fetch)
+        self.url = url
+
+    def __repr__(self):
+        """An unambiguous representation of a GatewayProvider's instance."""
+        return '<GatewayProvider {url}>'.format(url=self.url)
+
+    def quotes_url_length(self, selected_columns):
+        """Get the lengths of the URL of a quotes request."""
+        separator = len(quote(','))
+        return len(self.__quotes_url([], selected_columns)), \
+            lambda t: len(quote(t)) + separator
+
+    def request_quotes(self, tickers_list, selected_columns, timeout=None):
+        """Request recent quotes."""
+        url = self.__quotes_url(tickers_list, selected_columns)
+        response = loads(self.fetch(url, timeout=timeout))
+        errors = response.get('errors') or {}
+        if errors:
+            invalid = set(response.get('invalid') or [])
+            message = '; '.join('{0}: {1}'.format(t, errors[t])
+                                for t in sorted(errors))
+            if all(t in invalid for t in errors):
+                raise RequestError('Unable to process the request. ' +
+                                   message)
+            raise IOError('The gateway has no quote of ' + message)
+        quotes = response['quotes']
+        if len(quotes) != len(tickers_list):
+            raise IOError('The gateway answered {0} quotes for {1} '
+                          'tickers.'.format(len(quotes), len(tickers_list)))
+        return quotes
+
+    def __quotes_url(self, tickers_list, selected_columns):
+        """Build the URL of a quotes request."""
+        return '{base}/quotes?tickers={tickers}&columns={cols}'.format(
+            base=self.url.rstrip('/'),
+            tickers=quote(','.join(tickers_list)),
+            cols=quote(','.join(selected_columns))
+        )
+
+
+class ProviderStats(object):
+    """Class for handling the health and latency of a provider.
+
+    Latency is an exponential moving average of successful requests. After
+    a failure the provider is unhealthy for cooldown seconds, doubled on
+    every consecutive failure up to max_cooldown.
+
+    :param smoothing: Weight of the latest latency, defaults to 0.3
+    :type smoothing: float, optional
+    :param cooldown: Seconds unhealthy after a failure, defaults to 30
+    :type cooldown: float, optional
+    :param max_cooldown: Longest time unhealthy, defaults to 600
+    :type max_cooldown: float, optional
+    """
+
+    def __init__(self, smoothing=0.3, cooldown=30.0, max_cooldown=600.0):
+        """Instantiate ProviderStats class."""
+        self.smoothing = smoothing
+        self.cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self.latency = None
+        self.successes = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.down_until = 0.0
+        self.last_error = None
+
+    def is_healthy(self, now=None):
+        """Whether the provider is out of its cooldown."""
+        return (now or time.time()) >= self.down_until
+
+    def observe(self, latency):
+        """Record a successful request."""
+        if self.latency is None:
+            self.latency = latency
+        else:
+            self.latency += self.smoothing * (latency - self.latency)
+        self.successes += 1
+        self.consecutive_failures = 0
+        self.down_until = 0.0
+
+    def observe_failure(self, error, now=None):
+        """Record a failed request."""
+        self.failures += 1
+        self.consecutive_failures += 1
+        self.last_error = error
+        cooldown = min(self.max_cooldown,
+                       self.cooldown * 2 ** (self.consecutive_failures - 1))
+        self.down_until = (now or time.time()) + cooldown
+
+    def as_dict(self, now=None):
+        """Statistics as a dictionary."""
+        return {
+            'healthy': self.is_healthy(now),
+            'latency': self.latency,
+            'successes': self.successes,
+            'failures': self.failures,
+            'last_error': None if self.last_error is None else
+            '{0}'.format(self.last_error),
+        }
+
+
+class ProviderRouter(object):
+    """Class for handling the routing of requests to providers.
+
+    Every request goes to the healthy providers in order of preference and
+    then of latency, providers never measured first, and fails over to the
+    next one when a provider fails. Unhealthy providers are only tried, in
+    the given order, once the healthy ones have failed. Batched requests
+    are routed one batch at a time, so a failure halfway through a batched
+    request moves the remaining batches to the next provider.
+
+    >>> from rtstock.providers import ProviderRouter
+    >>>
+    >>> router = ProviderRouter([YQLProvider(fetch), YahooProvider(fetch)])
+    >>> router.call('request_quotes', ['AAPL'], ['Name'])
+    [{'Name': 'Apple Inc.'}]
+    >>> router.stats()['yql']['latency']
+    0.42
+
+    :param providers: Providers, in order of preference.
+    :type providers: list of rtstock.providers.Provider
+    :param cooldown: Seconds a provider is unhealthy after a failure,
+        doubled on consecutive failures, defaults to 30
+    :type cooldown: float, optional
+    :param smoothing: Weight of the latest latency, defaults to 0.3
+    :type smoothing: float, optional
+    """
+
+    def __init__(self, providers, cooldown=30.0, smoothing=0.3):
+        """Instantiate ProviderRouter class."""
+        self.cooldown = cooldown
+        self.smoothing = smoothing
+        self.__providers = []
+        self.__stats = {}
+        self.__lock = threading.Lock()
+        self.providers = providers
+
+    def __repr__(self):
+        """An unambiguous representation of a ProviderRouter's instance."""
+        return '<ProviderRouter {names}>'.format(
+            names=', '.join(p.name for p in self.__providers))
+
+    @property
+    def providers(self):
+        """Providers, in order of preference."""
+        return list(self.__providers)
+
+    @providers.setter
+    def providers(self, providers):
+        """Replace the providers, keeping the statistics of known ones."""
+        with self.__lock:
+            self.__providers = list(providers)
+            self.__stats = dict(
+                (p.name, self.__stats.get(p.name) or
+                 ProviderStats(self.smoothing, self.cooldown))
+                for p in self.__providers)
+
+    def stats(self):
+        """Health and latency statistics of every provider.
+
+        :returns: Statistics by provider name.
+        :rtype: dictionary
+        """
+        now = time.time()
+        with self.__lock:
+            return dict((name, s.as_dict(now))
+                        for name, s in self.__stats.items())
+
+    def ranked(self):
+        """Providers in the order they would be tried.
+
+        :rtype: list of rtstock.providers.Provider
+        """
+        now = time.time()
+        with self.__lock:
+            healthy = []
+            unhealthy = []
+            for i, provider in enumerate(self.__providers):
+                stats = self.__stats[provider.name]
+                if stats.is_healthy(now):
+                    healthy.append((not provider.preferred,
+                                    stats.latency or 0.0, i, provider))
+                else:
+                    unhealthy.append(provider)
+        return [p[-1] for p in sorted(healthy)] + unhealthy
+
+    def call(self, method, *args, **kwargs):
+        """Call a provider method, failing over to the next providers.
+
+        Providers without the method are skipped. RequestError raised by a
+        provider is a valid answer and is raised without failover. With a
+        deadline keyword, in seconds since the epoch, every provider gets the
+        time left as its timeout keyword, and no provider is tried once the
+        deadline has passed.
+
+        :param method: Provider method name.
+        :type method: string
+        :returns: Result of the first provider that succeeds.
+        :raises: RequestError, ProviderError, DeadlineError
+        """
+        deadline = kwargs.pop('deadline', None)
+        errors = {}
+        for provider in self.ranked():
+            start = time.time()
+            if deadline is not None:
+                if start >= deadline:
+                    break
+                kwargs['timeout'] = deadline - start
+            try:
+                with span('provider', provider=provider.name, method=method):
+                    result = getattr(provider, method)(*args, **kwargs)
+            except NotImplementedError:
+                continue
+            except RequestError:
+                self.__observe(provider, time.time() - start)
+                raise
+            except Exception as e:
+                errors[provider.name] = e
+                self.__observe_failure(provider, e)
+                continue
+            self.__observe(provider, time.time() - start)
+            return result
+        self.__fail(deadline, errors)
+
+    def iterate(self, method, *args, **kwargs):
+        """Iterate over a provider method, failing over to the next providers.
+
+        Works as call() for methods returning iterators, with failover while
+        iterating too. A provider failing after some items were yielded is
+        replaced by the next one when a resume keyword is given, a function
+        called with the arguments and the last item yielded that returns the
+        arguments for the items left, or None if there are none. Without it
+        the failure is raised. Latency is measured until the first item.
+
+        >>> rows = router.iterate('iter_historical', 'AAPL', '2016-03-01',
+        ...                       '2016-03-02')
+        >>> next(rows)['Date']
+        '2016-03-02'
+
+        :param method: Provider method name.
+        :type method: string
+        :returns: Generator of the items of the providers that succeed.
+        :raises: RequestError, ProviderError, DeadlineError
+        """
+        deadline = kwargs.pop('deadline', None)
+        resume = kwargs.pop('resume', None)
+        errors = {}
+        missing = object()
+        for provider in self.ranked():
+            start = time.time()
+            if deadline is not None:
+                if start >= deadline:
+                    break
+                kwargs['timeout'] = deadline - start
+            started = clock()
+            last = missing
+            latency = None
+            try:
+                for item in getattr(provider, method)(*args, **kwargs):
+                    if latency is None:
+                        latency = time.time() - start
+                    last = item
+                    yield item
+            except NotImplementedError:
+                continue
+            except RequestError:
+                self.__observe(provider, time.time() - start)
+                raise
+            except Exception as e:
+                errors[provider.name] = e
+                self.__observe_failure(provider, e)
+                record('provider', started, clock(), provider=provider.name,
+                       method=method, error=type(e).__name__)
+                if last is missing:
+                    continue
+                if resume is None:
+                    raise
+                args = resume(args, last)
+                if args is None:
+                    return
+                continue
+            record('provider', started, clock(), provider=provider.name,
+                   method=method)
+            self.__observe(provider, time.time() - start
+                           if latency is None else latency)
+            return
+        self.__fail(deadline, errors)
+
+    def __fail(self, deadline, errors):
+        """Raise the error of a request no provider could answer."""
+        if deadline is not None and time.time() >= deadline:
+            raise DeadlineError('Unable to process the request before its ' +
+                                'deadline.')
+        raise ProviderError('Unable to process the request. No provider ' +
+                            'could answer it: ' +
+                            '; '.join('{0}: {1}'.format(n, errors[n])
+                                      for n in sorted(errors)), errors)
+
+    def __observe(self, provider, latency):
+        """Record a successful request of a provider."""
+        with self.__lock:
+            stats = self.__stats.get(provider.name)
+            if stats is not None:
+                stats.observe(latency)
+
+    def __observe_failure(self, provider, error):
+        """Record a failed request of a provider."""
+        with self.__lock:
+            stats = self.__stats.get(provider.name)
+            if stats is not None:
+                stats.observe_failure(error)
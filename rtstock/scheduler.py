@@ -0,0 +1,292 @@
+"""
+Scheduler module.
+
+This module contains the polling scheduler, which keeps tickers with very
+different freshness needs up to date under a fixed request budget. Every
+cycle, the tickers closest to going stale are packed into batched requests.
+"""
+
+from __future__ import unicode_literals
+import heapq
+import time
+
+from .error import RequestError
+from .utils import is_ticker_error, request_quotes
+
+
+class PollingScheduler(object):
+    """Class for handling priority-based polling.
+
+    Each ticker has a freshness target, the maximum age its quote should
+    reach, and belongs to a priority class. Requests are paid from a token
+    bucket refilled at budget requests per second. Every cycle, due tickers
+    are taken by priority class, in the order of priorities, then by
+    earliest deadline, and packed into batches of up to batch_size tickers,
+    as many batches as the tokens allow. Without priorities, classes with
+    tighter freshness targets go first. Spare room in the last batch is
+    filled with the tickers due next, which improves freshness at no extra
+    cost. A batch failing because of some of its tickers is split in half
+    and each half requested again, every request paid with its own token,
+    so halves the tokens do not cover wait for the next cycle.
+
+    >>> from rtstock.scheduler import PollingScheduler
+    >>>
+    >>> scheduler = PollingScheduler(budget=2, on_quotes=print,
+    ...                              priorities=['hot', 'cold'])
+    >>> scheduler.add_many(['AAPL', 'YHOO'], freshness=1, priority='hot')
+    >>> scheduler.add_many(universe, freshness=300, priority='cold')
+    >>> scheduler.run()
+
+    :param budget: Requests per second, defaults to 1
+    :type budget: float, optional
+    :param batch_size: Maximum tickers per request, defaults to 200
+    :type batch_size: integer, optional
+    :param burst: Maximum requests in a single cycle, defaults to the
+        budget of one second
+    :type burst: integer, optional
+    :param selected_columns: List of columns to be requested, defaults to
+        ['Symbol', 'LastTradePriceOnly', 'LastTradeTime']
+    :type selected_columns: list of strings, optional
+    :param fetch: Function called with a batch of tickers and the columns,
+        returning their quotes with a single request or raising
+        RequestError, defaults to request_quotes
+    :type fetch: function, optional
+    :param on_quotes: Function called with the quotes of every batch,
+        defaults to None
+    :type on_quotes: function, optional
+    :param priorities: Priority classes, most important first, defaults to
+        None. Classes not listed go after the listed ones.
+    :type priorities: list of strings, optional
+    """
+
+    def __init__(self, budget=1.0, batch_size=200, burst=None,
+                 selected_columns=['Symbol', 'LastTradePriceOnly',
+                                   'LastTradeTime'],
+                 fetch=None, on_quotes=None, priorities=None):
+        """Instantiate PollingScheduler class."""
+        if budget <= 0 or batch_size < 1:
+            raise ValueError("Budget and batch size should be positive.")
+        self.budget = budget
+        self.batch_size = batch_size
+        self.burst = burst or max(1, int(budget))
+        self.selected_columns = list(selected_columns)
+        self.on_quotes = on_quotes
+        self.priorities = list(priorities or [])
+        self.__fetch = fetch or request_quotes
+        self.__tickers = {}
+        self.__heap = []
+        self.__tokens = float(self.burst)
+        self.__refilled = None
+        self.__started = None
+        self.__requests = 0
+        self.__errors = 0
+
+    def __repr__(self):
+        """An unambiguous representation of a PollingScheduler's instance."""
+        return '<PollingScheduler {n} tickers {budget}/s>'.format(
+            n=len(self.__tickers), budget=self.budget)
+
+    def __len__(self):
+        """Number of scheduled tickers."""
+        return len(self.__tickers)
+
+    def add(self, ticker, freshness, priority=None):
+        """Schedule a ticker.
+
+        A ticker added again gets the new freshness target and priority.
+
+        :param ticker: Stock ticker in Yahoo Finances format.
+        :type ticker: string
+        :param freshness: Maximum age of the quote in seconds.
+        :type freshness: float
+        :param priority: Priority class, defaults to the freshness target
+        :type priority: string, optional
+        """
+        if freshness <= 0:
+            raise ValueError("Freshness should be positive.")
+        priority = priority or '{0}s'.format(freshness)
+        previous = self.__tickers.get(ticker)
+        updated = previous[2] if previous else None
+        # Never polled tickers are due right away
+        deadline = updated + freshness if updated is not None else 0
+        self.__tickers[ticker] = [freshness, priority, updated, deadline]
+        heapq.heappush(self.__heap, (deadline, ticker))
+
+    def add_many(self, tickers_list, freshness, priority=None):
+        """Schedule a list of tickers with the same target.
+
+        :param tickers_list: List of tickers.
+        :type tickers_list: list of strings
+        :param freshness: Maximum age of the quotes in seconds.
+        :type freshness: float
+        :param priority: Priority class, defaults to the freshness target
+        :type priority: string, optional
+        """
+        for ticker in tickers_list:
+            self.add(ticker, freshness, priority)
+
+    def remove(self, ticker):
+        """Stop polling a ticker.
+
+        :param ticker: Stock ticker in Yahoo Finances format.
+        :type ticker: string
+        """
+        self.__tickers.pop(ticker, None)
+
+    def plan(self, now=None):
+        """Get the batches the next cycle would request.
+
+        :param now: Current time, defaults to now
+        :type now: float, optional
+        :returns: Batches of tickers.
+        :rtype: list of lists of strings
+        """
+        now = time.time() if now is None else now
+        self.__refill(now)
+        taken = set()
+        popped = []
+        due = []
+        while self.__heap and self.__heap[0][0] <= now:
+            deadline, ticker = heapq.heappop(self.__heap)
+            if not self.__is_current(deadline, ticker) or ticker in taken:
+                continue
+            popped.append((deadline, ticker))
+            taken.add(ticker)
+            due.append((self.__rank(ticker), deadline, ticker))
+        due.sort()
+        capacity = int(self.__tokens) * self.batch_size
+        chosen = [ticker for _, _, ticker in due[:capacity]]
+        room = -len(chosen) % self.batch_size
+        while self.__heap and room:
+            deadline, ticker = heapq.heappop(self.__heap)
+            if not self.__is_current(deadline, ticker) or ticker in taken:
+                continue
+            popped.append((deadline, ticker))
+            taken.add(ticker)
+            chosen.append(ticker)
+            room -= 1
+        # Planning does not consume anything
+        for entry in popped:
+            heapq.heappush(self.__heap, entry)
+        return [chosen[i:i + self.batch_size]
+                for i in range(0, len(chosen), self.batch_size)]
+
+    def run_cycle(self, now=None):
+        """Request the due tickers once.
+
+        :param now: Current time, defaults to now
+        :type now: float, optional
+        :returns: Quotes received.
+        :rtype: list of dictionaries
+        """
+        now = time.time() if now is None else now
+        # Depth-first, so split batches are finished before the next ones
+        pending = list(reversed(self.plan(now)))
+        quotes = []
+        while pending and self.__tokens >= 1:
+            batch = pending.pop()
+            self.__tokens -= 1
+            self.__requests += 1
+            errors = {}
+            try:
+                batch_quotes = self.__fetch(batch, self.selected_columns)
+            except RequestError as e:
+                if len(batch) > 1 and is_ticker_error(e):
+                    middle = len(batch) // 2
+                    pending.append(batch[middle:])
+                    pending.append(batch[:middle])
+                    continue
+                batch_quotes = []
+                errors = dict((t, e) for t in batch)
+            except Exception as e:
+                batch_quotes = []
+                errors = dict((t, e) for t in batch)
+            self.__errors += len(errors)
+            for ticker in batch:
+                entry = self.__tickers.get(ticker)
+                if entry is None:
+                    continue
+                if ticker not in errors:
+                    entry[2] = now
+                # Failures are retried after one freshness period
+                entry[3] = now + entry[0]
+                heapq.heappush(self.__heap, (entry[3], ticker))
+            quotes.extend(batch_quotes)
+            if self.on_quotes is not None and batch_quotes:
+                self.on_quotes(batch_quotes)
+        return quotes
+
+    def run(self, stop=None, tick=0.05):
+        """Run cycles until stop is set.
+
+        :param stop: Event that stops the scheduler when set, defaults to None
+        :type stop: threading.Event, optional
+        :param tick: Seconds to wait when nothing is due, defaults to 0.05
+        :type tick: float, optional
+        """
+        while stop is None or not stop.is_set():
+            if not self.run_cycle():
+                if stop is not None:
+                    stop.wait(tick)
+                else:
+                    time.sleep(tick)
+
+    def metrics(self, now=None):
+        """Get scheduler's metrics.
+
+        For every priority class: number of tickers, freshness target,
+        maximum and mean staleness (age of the quotes, never polled tickers
+        counting from the scheduler start) and tickers over their target.
+        Budget utilisation is the share of the budget spent since the first
+        cycle.
+
+        :param now: Current time, defaults to now
+        :type now: float, optional
+        :returns: Metrics.
+        :rtype: dictionary
+        """
+        now = time.time() if now is None else now
+        start = self.__started if self.__started is not None else now
+        classes = {}
+        for freshness, priority, updated, _ in self.__tickers.values():
+            staleness = now - (updated if updated is not None else start)
+            stats = classes.setdefault(priority, {
+                'tickers': 0, 'target': freshness, 'max_staleness': 0.0,
+                'mean_staleness': 0.0, 'violations': 0})
+            stats['tickers'] += 1
+            stats['target'] = max(stats['target'], freshness)
+            stats['max_staleness'] = max(stats['max_staleness'], staleness)
+            stats['mean_staleness'] += staleness
+            if staleness > freshness:
+                stats['violations'] += 1
+        for stats in classes.values():
+            stats['mean_staleness'] /= stats['tickers']
+        elapsed = now - start
+        allowed = self.burst + self.budget * elapsed
+        return {
+            'classes': classes,
+            'requests': self.__requests,
+            'errors': self.__errors,
+            'budget_utilisation': self.__requests / allowed,
+        }
+
+    def __refill(self, now):
+        """Refill the token bucket."""
+        if self.__refilled is None:
+            self.__refilled = self.__started = now
+        elapsed = max(0.0, now - self.__refilled)
+        self.__tokens = min(float(self.burst),
+                            self.__tokens + elapsed * self.budget)
+        self.__refilled = now
+
+    def __rank(self, ticker):
+        """Order of a ticker's priority class."""
+        freshness, priority = self.__tickers[ticker][:2]
+        if priority in self.priorities:
+            return self.priorities.index(priority), freshness
+        return len(self.priorities), freshness
+
+    def __is_current(self, deadline, ticker):
+        """Whether a heap entry matches the ticker's schedule."""
+        entry = self.__tickers.get(ticker)
+        return entry is not None and entry[3] == deadline
@@ -0,0 +1,183 @@
+"""
+Snapshot module.
+
+This module contains the cross-sectional snapshot of quotes, a tickers by
+fields numeric matrix meant for screening large universes with vectorized
+operations. It requires NumPy.
+"""
+
+from __future__ import unicode_literals
+import time
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from .decoding import Extractor
+from .error import RequestError
+from .symbols import position_index
+from .utils import (is_ticker_error, request_quote_values,
+                    request_quotes_batched, request_quotes_isolated,
+                    to_float)
+
+
+class Snapshot(object):
+    """Class for handling a quotes snapshot.
+
+    Holds a dense float64 matrix with one row per ticker and one column per
+    field, where missing or non numeric values are NaN.
+
+    >>> from rtstock.snapshot import snapshot
+    >>>
+    >>> snap = snapshot(['AAPL', 'YHOO'], ['LastTradePriceOnly', 'PERatio'])
+    >>> snap.values
+    array([[ 95.89,  10.82],
+           [ 36.35,    nan]])
+    >>> snap.row_index['YHOO']
+    1
+    >>> snap.column('PERatio')
+    array([ 10.82,    nan])
+
+    :param tickers: Tickers of the rows.
+    :type tickers: list of strings
+    :param fields: Fields of the columns.
+    :type fields: list of strings
+    :param values: Matrix of values, defaults to a NaN filled one
+    :type values: numpy.ndarray, optional
+    """
+
+    def __init__(self, tickers, fields, values=None):
+        """Instantiate Snapshot class."""
+        _require_numpy()
+        self.tickers = list(tickers)
+        self.fields = list(fields)
+        self.row_index = position_index(self.tickers)
+        self.col_index = dict((f, j) for j, f in enumerate(self.fields))
+        if values is None:
+            values = np.full((len(self.tickers), len(self.fields)), np.nan)
+        self.values = values
+
+    def __repr__(self):
+        """An unambiguous representation of a Snapshot's instance."""
+        return '<Snapshot {rows}x{cols}>'.format(rows=len(self.tickers),
+                                                 cols=len(self.fields))
+
+    def row(self, ticker):
+        """Get the values of a ticker.
+
+        :param ticker: Stock ticker in Yahoo Finances format, or its symbol id.
+        :type ticker: string or integer
+        :returns: View of the ticker's row.
+        :rtype: numpy.ndarray
+        """
+        return self.values[self.row_index[ticker]]
+
+    def column(self, field):
+        """Get the values of a field.
+
+        :param field: Field name.
+        :type field: string
+        :returns: View of the field's column.
+        :rtype: numpy.ndarray
+        """
+        return self.values[:, self.col_index[field]]
+
+    def fill(self, quotes):
+        """Fill the matrix with quotes.
+
+        Quotes are matched to rows by their Symbol field. Quotes of unknown
+        tickers are ignored.
+
+        :param quotes: Quotes as returned by request_quotes().
+        :type quotes: list of dictionaries
+        """
+        self.fill_values(_extractor(self.fields)(quotes))
+
+    def fill_values(self, rows):
+        """Fill the matrix with tuples of a symbol and the field values.
+
+        Rows are matched by their symbol, those of unknown tickers are
+        ignored, and copied into the matrix in a single assignment.
+
+        >>> snap.fill_values([('AAPL', 95.89, 10.82)])
+
+        :param rows: Tuples of the symbol and one float per field, as
+            returned by request_quote_values() with the Symbol column first
+            and to_float() for the fields.
+        :type rows: list of tuples
+        """
+        row_index = self.row_index
+        positions = []
+        known = []
+        for row in rows:
+            i = row_index.get(row[0])
+            if i is not None:
+                positions.append(i)
+                known.append(row[1:])
+        if positions:
+            self.values[positions] = np.array(known, dtype=np.float64)
+
+
+def snapshot(tickers_list, fields, batcher=None, symbol_index=None):
+    """Request a snapshot of quotes.
+
+    Quotes are requested through request_quotes_batched(), so invalid tickers
+    do not discard the rest of the universe. Their rows are left as NaN.
+    Every batch is decoded straight into tuples of the fields with
+    request_quote_values(), and batches failing because of some of their
+    tickers are requested again through request_quotes_isolated().
+
+    :param tickers_list: Tickers of the rows.
+    :type tickers_list: list of strings
+    :param fields: Numeric fields of the columns.
+    :type fields: list of strings
+    :param batcher: Batcher choosing the batch sizes, defaults to None
+    :type batcher: rtstock.batching.AdaptiveBatcher, optional
+    :param symbol_index: Index used to skip tickers known to be invalid,
+        defaults to None
+    :type symbol_index: rtstock.validation.SymbolIndex, optional
+    :returns: Snapshot and a dictionary mapping each failing ticker to its
+        error.
+    :rtype: tuple of (Snapshot, dictionary)
+    :raises: ImportError, TypeError
+    """
+    _require_numpy()
+    fields = list(fields)
+    extractor = _extractor(fields)
+    types = dict((f, to_float) for f in fields)
+
+    def fetch(batch, selected_columns, timeout=None):
+        started = time.time()
+        try:
+            return request_quote_values(batch, selected_columns, types,
+                                        timeout=timeout), {}
+        except RequestError as e:
+            if not is_ticker_error(e):
+                return [], dict((ticker, e) for ticker in batch)
+        if timeout is not None:
+            timeout = max(0.0, timeout - (time.time() - started))
+        quotes, errors = request_quotes_isolated(batch, selected_columns,
+                                                 timeout=timeout)
+        return extractor(quotes), errors
+
+    rows, errors = request_quotes_batched(tickers_list, extractor.columns,
+                                          batcher=batcher,
+                                          symbol_index=symbol_index,
+                                          fetch=fetch)
+    snap = Snapshot(tickers_list, fields)
+    snap.fill_values(rows)
+    return snap, errors
+
+
+def _extractor(fields):
+    """Extractor of the symbol and the fields, as floats, of quotes."""
+    return Extractor(['Symbol'] + list(fields),
+                     dict((f, to_float) for f in fields))
+
+
+def _require_numpy():
+    """Raise an ImportError if NumPy is missing."""
+    if np is None:
+        raise ImportError("NumPy is required for quote snapshots. " +
+                          "Install it with 'pip install numpy'.")
@@ -9,6 +9,8 @@ quotes information as well as historical data.
 from __future__ import unicode_literals
 from .utils import request_quotes, request_historical, download_historical
 from .error import RequestError
+from .symbols import intern_symbol
+from .tracing import span
 
 
 class Stock(object):
@@ -24,13 +26,20 @@ class Stock(object):
     >>> print(stock)
     <Stock AAPL>
 
+    Stocks are equal when their tickers are, and hash by the ticker's id on
+    the global symbol table, so sets and dictionaries of stocks never format
+    or hash strings.
+
     :param ticker: Stock ticker in Yahoo Finances format.
     :type ticker: string
     """
 
+    __slots__ = ('__ticker', '__symbol_id')
+
     def __init__(self, ticker):
         """Instantiate Stock class."""
         self.__ticker = ticker
+        self.__symbol_id = intern_symbol(ticker)
 
     def __repr__(self):
         """An unambiguous representation of a Stock's instance."""
@@ -39,16 +48,20 @@ class Stock(object):
     def __eq__(self, other):
         """Equality comparison operator."""
         if isinstance(other, Stock):
-            return self.__repr__() == other.__repr__()
+            return self.__symbol_id == other.__symbol_id
         return False
 
     def __ne__(self, other):
-        """Inquality comparison operator."""
-        return not self.__eq__() == other.__repr__()
+        """Inequality comparison operator."""
+        return not self.__eq__(other)
 
     def __hash__(self):
         """Hash representation of a Stock's instance."""
-        return hash(self.__repr__())
+        return self.__symbol_id
+
+    def __reduce__(self):
+        """Pickle by ticker, as symbol ids are only valid in a process."""
+        return (Stock, (self.__ticker,))
 
     def get_ticker(self):
         """Get stock's ticker.
@@ -61,6 +74,17 @@ class Stock(object):
         """
         return self.__ticker
 
+    def get_symbol_id(self):
+        """Get the id of stock's ticker on the global symbol table.
+
+        >>> stock.get_symbol_id()
+        0
+
+        :returns: Symbol id.
+        :rtype: integer
+        """
+        return self.__symbol_id
+
     def set_ticker(self, ticker):
         """Set stock's ticker.
 
@@ -72,8 +96,9 @@ class Stock(object):
         :type ticker: string
         """
         self.__ticker = ticker
+        self.__symbol_id = intern_symbol(ticker)
 
-    def get_latest_price(self):
+    def get_latest_price(self, cache=None, timeout=None):
         """Get stock's latest price.
 
         Get the latest available quote from Yahoo Finance along with its
@@ -85,13 +110,23 @@ class Stock(object):
             'LastTradeTime': '4:00pm'
         }
 
+        :param cache: Cache serving the quote when recent enough,
+            defaults to None
+        :type cache: rtstock.cache.QuoteCache, optional
+        :param timeout: Seconds to wait for Yahoo Finance, defaults to None,
+            waiting indefinitely
+        :type timeout: float, optional
         :returns: Dictionary with latest price and trade time.
         :rtype: dictionary
         """
-        return request_quotes([self.__ticker],
-                              ['LastTradePriceOnly', 'LastTradeTime'])
-
-    def get_info(self):
+        keys = ['LastTradePriceOnly', 'LastTradeTime']
+        with span('Stock.get_latest_price', ticker=self.__ticker):
+            if cache is not None:
+                return cache.request_quotes([self.__ticker], keys,
+                                            timeout=timeout)
+            return request_quotes([self.__ticker], keys, timeout=timeout)
+
+    def get_info(self, cache=None, timeout=None):
         """Get all stock's information provided by Yahoo Finance.
 
         There is no guarantee that all the fields will be available for all
@@ -154,6 +189,12 @@ class Stock(object):
 
         Check `here <http://goo.gl/8AROUD>`_ for more information on YQL.
 
+        :param cache: Cache serving the information when recent enough,
+            defaults to None
+        :type cache: rtstock.cache.QuoteCache, optional
+        :param timeout: Seconds to wait for Yahoo Finance, defaults to None,
+            waiting indefinitely
+        :type timeout: float, optional
         :returns: Dictionary with all the available information.
         :rtype: dictionary
         """
@@ -178,14 +219,19 @@ class Stock(object):
                 'TwoHundreddayMovingAverage', 'Volume', 'YearHigh',
                 'YearLow', 'YearRange']
 
-        response = request_quotes([self.__ticker], keys)
+        with span('Stock.get_info', ticker=self.__ticker):
+            if cache is not None:
+                return cache.request_quotes([self.__ticker], keys,
+                                            timeout=timeout)
+            response = request_quotes([self.__ticker], keys, timeout=timeout)
         # if not response['Name']:
         #     raise RequestError(
         #         self.__ticker + ' returns no results from Yahoo Finance.'
         #     )
         return response
 
-    def get_historical(self, start_date, end_date):
+    def get_historical(self, start_date, end_date, calendar=None,
+                       timeout=None):
         """Get stock's daily historical information.
 
         Returns a dictionary with Adj Close, Close, High, Low, Open and
@@ -224,12 +270,20 @@ class Stock(object):
         :type start_date: string on the format of "yyyy-mm-dd"
         :param end_date: End date
         :type end_date: string on the format of "yyyy-mm-dd"
+        :param calendar: Trading calendar, or the name of a registered one,
+            used to skip periods without trading sessions, defaults to None
+        :type calendar: rtstock.calendars.TradingCalendar or string, optional
+        :param timeout: Seconds to wait for Yahoo Finance, defaults to None,
+            waiting indefinitely
+        :type timeout: float, optional
         :returns: Daily historical information.
         :rtype: list of dictionaries
         """
-        return request_historical(self.__ticker, start_date, end_date)
+        with span('Stock.get_historical', ticker=self.__ticker):
+            return request_historical(self.__ticker, start_date, end_date,
+                                      calendar=calendar, timeout=timeout)
 
-    def save_historical(self, output_folder):
+    def save_historical(self, output_folder, timeout=None):
         """Download historical data from Yahoo Finance.
 
         Downloads full historical data from Yahoo Finance as CSV. The following
@@ -238,5 +292,10 @@ class Stock(object):
 
         :param output_folder: Output folder path
         :type output_folder: string
+        :param timeout: Seconds to wait for Yahoo Finance, defaults to None,
+            waiting indefinitely
+        :type timeout: float, optional
         """
-        download_historical([self.__ticker], output_folder)
+        with span('Stock.save_historical', ticker=self.__ticker):
+            download_historical([self.__ticker], output_folder,
+                                timeout=timeout)
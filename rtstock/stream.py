@@ -0,0 +1,245 @@
+"""
+Stream module.
+
+This module contains the asynchronous quotes subscription. Quotes are polled
+in the background and handed to the consumer through a bounded buffer, whose
+overflow policy decides what happens when the consumer falls behind. It
+requires Python 3.5 or later.
+"""
+
+from __future__ import unicode_literals
+import asyncio
+import collections
+import time
+
+from .utils import request_quotes_batched
+
+OVERFLOW_POLICIES = ('block', 'drop_oldest', 'conflate')
+
+
+class Subscription(object):
+    """Class for handling a quotes subscription.
+
+    Polls the quotes of a list of tickers every interval seconds and yields
+    them one by one. At most maxsize quotes are buffered. When the buffer is
+    full, the overflow policy decides what happens:
+
+    - block: polling waits for the consumer, so quotes are never lost but
+      may get older.
+    - drop_oldest: the oldest buffered quote is discarded.
+    - conflate: only the latest quote of each ticker is buffered, replacing
+      the pending one. The buffer never holds more than one quote per ticker
+      and, if there are more tickers than maxsize, the oldest is discarded.
+
+    Symbol is always polled, to tell the quotes of each ticker apart, and
+    left out of the quotes when it is not among the selected columns.
+
+    >>> import rtstock
+    >>>
+    >>> async def main():
+    ...     async with rtstock.subscribe(['AAPL'], interval=5) as quotes:
+    ...         async for quote in quotes:
+    ...             print(quote['LastTradePriceOnly'])
+    ...             print(quotes.metrics()['lag'])
+
+    :param tickers_list: List of tickers to be polled.
+    :type tickers_list: list of strings
+    :param interval: Seconds between polls, defaults to 1
+    :type interval: float, optional
+    :param selected_columns: List of columns to be returned, defaults to
+        ['Symbol', 'LastTradePriceOnly', 'LastTradeTime']
+    :type selected_columns: list of strings, optional
+    :param maxsize: Maximum number of buffered quotes, defaults to 1000
+    :type maxsize: integer, optional
+    :param overflow: Overflow policy, defaults to 'block'
+    :type overflow: string, optional
+    :param fetch: Function called with the tickers and columns to poll the
+        quotes, defaults to request_quotes_batched
+    :type fetch: function, optional
+    """
+
+    def __init__(self, tickers_list, interval=1.0,
+                 selected_columns=['Symbol', 'LastTradePriceOnly',
+                                   'LastTradeTime'],
+                 maxsize=1000, overflow='block', fetch=None):
+        """Instantiate Subscription class."""
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError("Overflow policy should be one of " +
+                             ', '.join(OVERFLOW_POLICIES) + ".")
+        if maxsize < 1:
+            raise ValueError("Maxsize should be positive.")
+        self.tickers_list = list(tickers_list)
+        self.interval = interval
+        self.selected_columns = list(selected_columns)
+        self.__columns = list(selected_columns)
+        self.__extra = '*' not in self.__columns and \
+            'Symbol' not in self.__columns
+        if self.__extra:
+            self.__columns.append('Symbol')
+        self.maxsize = maxsize
+        self.overflow = overflow
+        self.__fetch = fetch or request_quotes_batched
+        self.__buffer = collections.OrderedDict()
+        self.__key = 0
+        self.__not_empty = None
+        self.__not_full = None
+        self.__task = None
+        self.__error = None
+        self.__closed = False
+        self.__stats = {'polls': 0, 'received': 0, 'delivered': 0,
+                        'dropped': 0, 'conflated': 0, 'errors': 0,
+                        'lag': 0.0, 'max_lag': 0.0}
+
+    def __repr__(self):
+        """An unambiguous representation of a Subscription's instance."""
+        return '<Subscription {n} tickers {policy}>'.format(
+            n=len(self.tickers_list), policy=self.overflow)
+
+    def metrics(self):
+        """Get subscription's metrics.
+
+        - polls: number of polls performed.
+        - received: quotes received from the polls.
+        - delivered: quotes handed to the consumer.
+        - dropped: quotes discarded by the drop_oldest policy.
+        - conflated: quotes replaced by a newer one of the same ticker.
+        - errors: tickers that failed to be polled.
+        - queued: quotes waiting in the buffer.
+        - lag: seconds the last delivered quote spent in the buffer.
+        - max_lag: greatest lag so far.
+        - oldest: seconds the oldest buffered quote has been waiting.
+
+        :returns: Metrics.
+        :rtype: dictionary
+        """
+        metrics = dict(self.__stats)
+        metrics['queued'] = len(self.__buffer)
+        if self.__buffer:
+            oldest = next(iter(self.__buffer.values()))[1]
+            metrics['oldest'] = time.time() - oldest
+        else:
+            metrics['oldest'] = 0.0
+        return metrics
+
+    def start(self):
+        """Start polling.
+
+        Called automatically on the first iteration.
+        """
+        if self.__task is None:
+            self.__not_empty = asyncio.Event()
+            self.__not_full = asyncio.Event()
+            self.__not_full.set()
+            self.__task = asyncio.ensure_future(self.__poll())
+
+    async def close(self):
+        """Stop polling and discard the buffered quotes."""
+        self.__closed = True
+        if self.__task is not None:
+            self.__not_empty.set()
+            self.__task.cancel()
+            try:
+                await self.__task
+            except asyncio.CancelledError:
+                pass
+        self.__buffer.clear()
+
+    async def __aenter__(self):
+        """Start polling on entering the context."""
+        self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        """Close the subscription on leaving the context."""
+        await self.close()
+
+    def __aiter__(self):
+        """Asynchronous iterator over the quotes."""
+        return self
+
+    async def __anext__(self):
+        """Wait for the next quote."""
+        self.start()
+        while not self.__buffer:
+            if self.__error is not None:
+                raise self.__error
+            if self.__closed:
+                raise StopAsyncIteration
+            self.__not_empty.clear()
+            await self.__not_empty.wait()
+        _, (quote, received) = self.__buffer.popitem(last=False)
+        self.__not_full.set()
+        lag = time.time() - received
+        self.__stats['delivered'] += 1
+        self.__stats['lag'] = lag
+        self.__stats['max_lag'] = max(self.__stats['max_lag'], lag)
+        return quote
+
+    async def __poll(self):
+        """Poll the quotes until closed."""
+        loop = asyncio.get_event_loop()
+        try:
+            while True:
+                started = time.time()
+                quotes, errors = await loop.run_in_executor(
+                    None, self.__fetch, self.tickers_list, self.__columns)
+                self.__stats['polls'] += 1
+                self.__stats['errors'] += len(errors)
+                for quote in quotes:
+                    ticker = quote.get('Symbol')
+                    if self.__extra:
+                        quote = dict((k, v) for k, v in quote.items()
+                                     if k != 'Symbol')
+                    await self.__put(ticker, quote)
+                await asyncio.sleep(
+                    max(0.0, self.interval - (time.time() - started)))
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self.__error = e
+            self.__not_empty.set()
+
+    async def __put(self, ticker, quote):
+        """Buffer a quote according to the overflow policy."""
+        self.__stats['received'] += 1
+        now = time.time()
+        if self.overflow == 'conflate':
+            key = ticker
+            if key in self.__buffer:
+                # Keep the position in the buffer, so fast tickers do not
+                # starve the others
+                self.__buffer[key] = (quote, self.__buffer[key][1])
+                self.__stats['conflated'] += 1
+                return
+        else:
+            key = self.__key
+            self.__key += 1
+
+        while len(self.__buffer) >= self.maxsize:
+            if self.overflow == 'block':
+                self.__not_full.clear()
+                await self.__not_full.wait()
+            else:
+                self.__buffer.popitem(last=False)
+                self.__stats['dropped'] += 1
+        self.__buffer[key] = (quote, now)
+        self.__not_empty.set()
+
+
+def subscribe(tickers_list, interval=1.0, **kwargs):
+    """Subscribe to the quotes of a list of tickers.
+
+    Shortcut to Subscription. Takes the same arguments.
+
+    >>> async for quote in subscribe(['AAPL', 'YHOO'], interval=5,
+    ...                              overflow='conflate'):
+    ...     print(quote)
+
+    :param tickers_list: List of tickers to be polled.
+    :type tickers_list: list of strings
+    :param interval: Seconds between polls, defaults to 1
+    :type interval: float, optional
+    :returns: Subscription.
+    :rtype: Subscription
+    """
+    return Subscription(tickers_list, interval, **kwargs)
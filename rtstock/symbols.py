@@ -0,0 +1,166 @@
+"""
+Symbols module.
+
+This module contains the interned symbol table, which gives every ticker a
+small integer id, stable for the life of the process. Ids are cheap to hash
+and compare, and are accepted wherever tickers index rows or slots, such as
+snapshots, quote boards and bar aggregators.
+"""
+
+from __future__ import unicode_literals
+import threading
+
+
+class SymbolTable(object):
+    """Class for handling an interned symbol table.
+
+    Ids are given in order of first appearance, starting at 0, and are never
+    reused. Every ticker is kept as a single string object, so equal tickers
+    coming from different responses share their memory.
+
+    >>> from rtstock.symbols import SymbolTable
+    >>>
+    >>> table = SymbolTable()
+    >>> table.intern('AAPL')
+    0
+    >>> table.intern('YHOO')
+    1
+    >>> table.name(0)
+    'AAPL'
+    """
+
+    def __init__(self):
+        """Instantiate SymbolTable class."""
+        self.__ids = {}
+        self.__names = []
+        self.__lock = threading.Lock()
+
+    def __repr__(self):
+        """An unambiguous representation of a SymbolTable's instance."""
+        return '<SymbolTable {n} symbols>'.format(n=len(self.__names))
+
+    def __len__(self):
+        """Number of interned symbols."""
+        return len(self.__names)
+
+    def __contains__(self, ticker):
+        """Whether a ticker has been interned."""
+        return ticker in self.__ids
+
+    def intern(self, ticker):
+        """Get the id of a ticker, interning it if needed.
+
+        :param ticker: Stock ticker in Yahoo Finances format.
+        :type ticker: string
+        :returns: Symbol id.
+        :rtype: integer
+        """
+        symbol_id = self.__ids.get(ticker)
+        if symbol_id is not None:
+            return symbol_id
+        with self.__lock:
+            symbol_id = self.__ids.get(ticker)
+            if symbol_id is None:
+                symbol_id = self.__ids[ticker] = len(self.__names)
+                self.__names.append(ticker)
+        return symbol_id
+
+    def get(self, ticker):
+        """Get the id of a ticker without interning it.
+
+        :returns: Symbol id, None if the ticker was never interned.
+        :rtype: integer or None
+        """
+        return self.__ids.get(ticker)
+
+    def name(self, symbol_id):
+        """Get the interned ticker of a symbol id.
+
+        :param symbol_id: Symbol id.
+        :type symbol_id: integer
+        :returns: Ticker.
+        :rtype: string
+        :raises: IndexError
+        """
+        if symbol_id < 0:
+            raise IndexError('Unknown symbol id: {0}'.format(symbol_id))
+        return self.__names[symbol_id]
+
+    def names(self):
+        """Interned tickers, in order of id.
+
+        :rtype: list of strings
+        """
+        return list(self.__names)
+
+
+_table = SymbolTable()
+
+
+def intern_symbol(ticker):
+    """Get the id of a ticker on the global symbol table.
+
+    >>> intern_symbol('AAPL')
+    0
+
+    :param ticker: Stock ticker in Yahoo Finances format.
+    :type ticker: string
+    :returns: Symbol id.
+    :rtype: integer
+    """
+    return _table.intern(ticker)
+
+
+def symbol_name(symbol_id):
+    """Get the ticker of an id of the global symbol table.
+
+    >>> symbol_name(0)
+    'AAPL'
+
+    :param symbol_id: Symbol id.
+    :type symbol_id: integer
+    :returns: Ticker.
+    :rtype: string
+    :raises: IndexError
+    """
+    return _table.name(symbol_id)
+
+
+def symbol_table():
+    """Get the global symbol table.
+
+    :rtype: rtstock.symbols.SymbolTable
+    """
+    return _table
+
+
+def ticker_of(symbol):
+    """Get the ticker of a ticker or symbol id.
+
+    :param symbol: Ticker or symbol id.
+    :type symbol: string or integer
+    :returns: Ticker.
+    :rtype: string
+    """
+    if isinstance(symbol, int):
+        return _table.name(symbol)
+    return symbol
+
+
+def position_index(tickers_list):
+    """Map tickers, and their symbol ids, to their positions.
+
+    >>> index = position_index(['AAPL', 'YHOO'])
+    >>> index['YHOO'], index[intern_symbol('YHOO')]
+    (1, 1)
+
+    :param tickers_list: List of tickers.
+    :type tickers_list: list of strings
+    :returns: Position by ticker and by symbol id.
+    :rtype: dictionary
+    """
+    index = {}
+    for i, ticker in enumerate(tickers_list):
+        index[ticker] = i
+        index[_table.intern(ticker)] = i
+    return index
@@ -0,0 +1,303 @@
+"""
+Tracing module.
+
+This module contains the opt-in tracing of requests. Once enabled, requests,
+providers, transfers, decoding, cache lookups and Stock methods record nested
+spans, with ticker counts attached, which can be exported to the Chrome trace
+event format (chrome://tracing or https://ui.perfetto.dev) or sent to any
+other sink. While disabled, span() returns a shared no-op span::
+
+    >>> from rtstock import tracing
+    >>>
+    >>> recorder = tracing.enable()
+    >>> request_quotes_batched(tickers, ['Bid'])
+    >>> tracing.disable()
+    >>> recorder.export_chrome('trace.json')
+"""
+
+from __future__ import unicode_literals
+import collections
+import itertools
+import json
+import os
+import threading
+import time
+
+_clock = getattr(time, 'perf_counter', time.time)
+_ids = itertools.count(1)
+_local = threading.local()
+_enabled = False
+_sink = None
+
+
+class Span(object):
+    """Class for handling a span.
+
+    A timed operation, with its name, category and arguments, nested in the
+    span open on the same thread when it started. Spans are sent to the sink
+    when they end.
+
+    :param name: Span name.
+    :type name: string
+    :param category: Span category, defaults to 'rtstock'
+    :type category: string, optional
+    :param args: Arguments attached to the span, defaults to None
+    :type args: dictionary, optional
+    """
+
+    __slots__ = ('name', 'category', 'args', 'start', 'end', 'span_id',
+                 'parent_id', 'thread_id')
+
+    def __init__(self, name, category='rtstock', args=None):
+        """Instantiate Span class."""
+        self.name = name
+        self.category = category
+        self.args = args or {}
+        self.start = None
+        self.end = None
+        self.span_id = next(_ids)
+        self.parent_id = None
+        self.thread_id = threading.current_thread().ident
+
+    def __repr__(self):
+        """An unambiguous representation of a Span's instance."""
+        return '<Span {name} {duration}>'.format(name=self.name,
+                                                 duration=self.duration)
+
+    def __enter__(self):
+        """Start the span."""
+        stack = getattr(_local, 'stack', None)
+        if stack is None:
+            stack = _local.stack = []
+        if stack:
+            self.parent_id = stack[-1].span_id
+        stack.append(self)
+        self.start = _clock()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        """End the span and send it to the sink."""
+        self.end = _clock()
+        stack = _local.stack
+        if stack and stack[-1] is self:
+            stack.pop()
+        if exc_type is not None:
+            self.args['error'] = exc_type.__name__
+        sink = _sink
+        if sink is not None:
+            sink(self)
+
+    @property
+    def duration(self):
+        """Span duration in seconds, None while open."""
+        if self.start is None or self.end is None:
+            return None
+        return self.end - self.start
+
+    def set(self, **args):
+        """Attach arguments to the span."""
+        self.args.update(args)
+
+
+class _NullSpan(object):
+    """Span used while tracing is disabled, doing nothing."""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        """Start nothing."""
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        """End nothing."""
+        pass
+
+    def set(self, **args):
+        """Ignore the arguments."""
+        pass
+
+
+_null_span = _NullSpan()
+
+
+class TraceRecorder(object):
+    """Class for handling a sink keeping spans in memory.
+
+    >>> from rtstock.tracing import TraceRecorder
+    >>>
+    >>> recorder = TraceRecorder()
+    >>> tracing.enable(recorder)
+    >>> recorder.spans()
+    [<Span request_quotes 0.4120>, ...]
+
+    :param max_spans: Spans kept, older ones are dropped, defaults to
+        1000000
+    :type max_spans: integer, optional
+    """
+
+    def __init__(self, max_spans=1000000):
+        """Instantiate TraceRecorder class."""
+        self.dropped = 0
+        self.__spans = collections.deque(maxlen=max_spans)
+        self.__lock = threading.Lock()
+
+    def __repr__(self):
+        """An unambiguous representation of a TraceRecorder's instance."""
+        return '<TraceRecorder {n} spans>'.format(n=len(self.__spans))
+
+    @property
+    def max_spans(self):
+        """Spans kept."""
+        return self.__spans.maxlen
+
+    def __call__(self, span):
+        """Record a span."""
+        with self.__lock:
+            if len(self.__spans) == self.__spans.maxlen:
+                self.dropped += 1
+            self.__spans.append(span)
+
+    def spans(self):
+        """Recorded spans, in order of ending.
+
+        :rtype: list of rtstock.tracing.Span
+        """
+        with self.__lock:
+            return list(self.__spans)
+
+    def clear(self):
+        """Forget the recorded spans."""
+        with self.__lock:
+            self.__spans.clear()
+
+    def to_chrome(self):
+        """Recorded spans in the Chrome trace event format.
+
+        :rtype: dictionary
+        """
+        return chrome_trace(self.spans())
+
+    def export_chrome(self, path):
+        """Write the recorded spans to a Chrome trace event JSON file.
+
+        :param path: Output file path.
+        :type path: string
+        """
+        with open(path, 'w') as f:
+            json.dump(self.to_chrome(), f)
+
+
+def chrome_trace(spans):
+    """Convert spans to the Chrome trace event format.
+
+    Every span is a complete ('X') event, with timestamps in microseconds
+    from the earliest span.
+
+    :param spans: Ended spans.
+    :type spans: list of rtstock.tracing.Span
+    :returns: Trace with a traceEvents list.
+    :rtype: dictionary
+    """
+    spans = [s for s in spans if s.end is not None]
+    origin = min(s.start for s in spans) if spans else 0.0
+    pid = os.getpid()
+    events = []
+    for span in spans:
+        args = dict(span.args)
+        args['span_id'] = span.span_id
+        if span.parent_id is not None:
+            args['parent_id'] = span.parent_id
+        events.append({
+            'name': span.name,
+            'cat': span.category,
+            'ph': 'X',
+            'ts': (span.start - origin) * 1e6,
+            'dur': (span.end - span.start) * 1e6,
+            'pid': pid,
+            'tid': span.thread_id,
+            'args': args,
+        })
+    events.sort(key=lambda e: (e['tid'], e['ts']))
+    return {'traceEvents': events, 'displayTimeUnit': 'ms'}
+
+
+def enable(sink=None):
+    """Start tracing.
+
+    :param sink: Function called with every span when it ends, defaults to
+        a new TraceRecorder
+    :type sink: function, optional
+    :returns: The sink.
+    :rtype: function
+    """
+    global _enabled, _sink
+    if sink is None:
+        sink = TraceRecorder()
+    _sink = sink
+    _enabled = True
+    return sink
+
+
+def disable():
+    """Stop tracing."""
+    global _enabled, _sink
+    _enabled = False
+    _sink = None
+
+
+def is_enabled():
+    """Whether tracing is enabled.
+
+    :rtype: boolean
+    """
+    return _enabled
+
+
+def span(name, category='rtstock', **args):
+    """Open a span, to be used as a context manager.
+
+    >>> with span('request_quotes', tickers=200) as s:
+    ...     s.set(quotes=198)
+
+    :param name: Span name.
+    :type name: string
+    :param category: Span category, defaults to 'rtstock'
+    :type category: string, optional
+    :returns: The span, or a no-op span while tracing is disabled.
+    :rtype: rtstock.tracing.Span
+    """
+    if not _enabled:
+        return _null_span
+    return Span(name, category, args)
+
+
+def record(name, start, end, category='rtstock', **args):
+    """Record a span measured by the caller, such as time spent queued.
+
+    :param name: Span name.
+    :type name: string
+    :param start: Start, from clock().
+    :type start: float
+    :param end: End, from clock().
+    :type end: float
+    :param category: Span category, defaults to 'rtstock'
+    :type category: string, optional
+    """
+    sink = _sink
+    if not _enabled or sink is None:
+        return
+    new = Span(name, category, args)
+    new.start = start
+    new.end = end
+    stack = getattr(_local, 'stack', None)
+    if stack:
+        new.parent_id = stack[-1].span_id
+    sink(new)
+
+
+def clock():
+    """Clock used by the span timestamps, in seconds.
+
+    :rtype: float
+    """
+    return _clock()
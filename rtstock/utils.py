@@ -6,19 +6,33 @@ from Yahoo Finance.
 """
 
 from __future__ import unicode_literals
+import codecs
+import collections
+import csv
 import datetime
-import json
+import io
 import os
+import socket
+import time
+import zlib
+from email.utils import formatdate
+from multiprocessing import TimeoutError
+from multiprocessing.pool import ThreadPool
 
 try:
     # Python 3
-    from urllib.request import urlopen, quote, urlretrieve
+    from urllib.request import urlopen, Request
+    from urllib.error import HTTPError
 except ImportError:
     # Python 2
-    from urllib2 import urlopen, quote
-    from urllib import urlretrieve
+    from urllib2 import urlopen, Request, HTTPError
 
-from .error import RequestError
+from .batching import AdaptiveBatcher
+from .calendars import get_calendar
+from .error import ColumnError, DeadlineError, ProviderError, RequestError
+from .providers import (HISTORICAL_COLUMNS, GatewayProvider, ProviderRouter,
+                        YahooProvider, YQLProvider)
+from .tracing import clock, record, span
 
 
 def __validate_list(list_to_validate):
@@ -30,45 +44,379 @@ def __validate_list(list_to_validate):
         )
 
 
-def __validate_dates(start_date, end_date):
+def __validate_dates(start_date, end_date, max_days=366):
     """Validate if a date string.
 
     Validate if a string is a date on yyyy-mm-dd format and it the
-    period between them is less than a year.
+    period between them is less than a year, or max_days if given.
     """
     try:
         start_date = datetime.datetime.strptime(start_date, '%Y-%m-%d')
         end_date = datetime.datetime.strptime(end_date, '%Y-%m-%d')
     except ValueError:
         raise ValueError("Incorrect data format, should be yyyy-mm-dd")
-    if (end_date - start_date).days > 366:
+    if max_days is not None and (end_date - start_date).days > max_days:
         raise ValueError("The difference between start and end date " +
                          "should be less than or equal to 366 days.")
     if (end_date - start_date).days < 0:
         raise ValueError("End date cannot be before start date.")
 
 
-def __yahoo_request(query):
-    """Request Yahoo Finance information.
+def __index_quotes(symbol_index, tickers_list, quotes):
+    """Mark the tickers of a quotes response as valid or invalid.
 
-    Request information from YQL.
-    `Check <http://goo.gl/8AROUD>`_ for more information on YQL.
+    YQL answers unknown tickers with a quote where every field is empty.
+    Quotes are matched to tickers by Symbol when they have it, and tickers
+    without a quote, or whose quote has no field besides the symbol to tell,
+    are left as they were.
     """
-    query = quote(query)
-    url = 'https://query.yahooapis.com/v1/public/yql?q=' + query + \
-        '&format=json&env=store://datatables.org/alltableswithkeys'
+    if all(q.get('Symbol') for q in quotes):
+        by_symbol = dict((q['Symbol'], q) for q in quotes)
+        pairs = [(t, by_symbol.get(t)) for t in tickers_list]
+    elif len(quotes) == len(tickers_list):
+        pairs = zip(tickers_list, quotes)
+    else:
+        return
+    for ticker, quote in pairs:
+        fields = [v for k, v in (quote or {}).items() if k != 'Symbol']
+        if not fields:
+            continue
+        if any(fields):
+            symbol_index.mark_valid(ticker)
+        else:
+            symbol_index.mark_invalid(ticker)
+
+
+# URL -> (ETag, Last-Modified, body) of the latest responses
+__validators = collections.OrderedDict()
+__MAX_VALIDATORS = 1024
+
+__SUFFIXES = {'K': 1e3, 'M': 1e6, 'B': 1e9, 'T': 1e12}
+
+
+def is_ticker_error(error):
+    """Whether an error says something about the ticker that raised it.
+
+    Provider outages, missed deadlines and invalid columns do not, so
+    tickers failing with them must not be taken as invalid.
+
+    :param error: Error of a ticker.
+    :type error: Exception
+    :rtype: boolean
+    """
+    return not isinstance(error, (ColumnError, DeadlineError, ProviderError))
+
+
+def to_float(value):
+    """Convert a YQL field to a float.
+
+    YQL returns numbers as strings, possibly with a sign, a percent sign or a
+    magnitude suffix (K, M, B or T). Missing or non numeric values, such as
+    'N/A' or ranges, are converted to NaN.
+
+    >>> to_float('+1.25%')
+    1.25
+    >>> to_float('1.5M')
+    1500000.0
+    >>> to_float('N/A')
+    nan
+
+    :param value: Field value.
+    :type value: string, number or None
+    :returns: Numeric value.
+    :rtype: float
+    """
+    if value is None:
+        return float('nan')
+    if isinstance(value, (int, float)):
+        return float(value)
+    value = value.strip().rstrip('%').replace(',', '')
+    scale = __SUFFIXES.get(value[-1:], 1.0)
+    if scale != 1.0:
+        value = value[:-1]
+    try:
+        return float(value) * scale
+    except ValueError:
+        return float('nan')
+
+
+def __session_window(start_date, end_date, calendar):
+    """Shrink a period to its trading sessions."""
+    if not hasattr(calendar, 'session_window'):
+        calendar = get_calendar(calendar)
+    return calendar.session_window(start_date, end_date)
+
+
+def __decode_body(body, encoding):
+    """Decode a gzip or deflate compressed response body."""
+    if encoding == 'gzip':
+        return zlib.decompress(body, 16 + zlib.MAX_WBITS)
+    if encoding == 'deflate':
+        try:
+            return zlib.decompress(body)
+        except zlib.error:
+            # Some servers send raw deflate streams without zlib header
+            return zlib.decompress(body, -zlib.MAX_WBITS)
+    return body
+
+
+def __urlopen(request, timeout):
+    """Open a request, waiting at most timeout seconds if given."""
+    if timeout is None:
+        return urlopen(request)
+    return urlopen(request, timeout=timeout)
+
+
+def __read(response, deadline, block_size=65536):
+    """Read a response body, failing once the deadline has passed.
+
+    The socket timeout is lowered to the time left before every block, so
+    a slow response cannot outlast the deadline.
+    """
+    if deadline is None:
+        return response.read()
+    read = getattr(response, 'read1', response.read)
+    blocks = []
+    while True:
+        __settimeout(response, deadline)
+        block = read(block_size)
+        if not block:
+            return b''.join(blocks)
+        blocks.append(block)
+
+
+def __settimeout(response, deadline):
+    """Set the socket timeout of a response to the time left."""
+    remaining = __remaining(deadline)
+    if remaining == 0:
+        raise socket.timeout('The response did not arrive before its ' +
+                             'deadline.')
+    fp = getattr(response, 'fp', None)
+    sock = getattr(getattr(fp, 'raw', None), '_sock', None)
+    if sock is not None:
+        sock.settimeout(remaining)
+
+
+def __deadline(timeout):
+    """Turn a timeout into a deadline, in seconds since the epoch."""
+    if timeout is None:
+        return None
+    return time.time() + timeout
+
+
+def __remaining(deadline):
+    """Seconds left until a deadline."""
+    if deadline is None:
+        return None
+    return max(0.0, deadline - time.time())
+
+
+def __gather(function, items, workers, deadline):
+    """Call function on every item, returning None for late ones.
+
+    With more than one worker, items are processed on a pool of threads and
+    the results that have not arrived by the deadline are given up on.
+    """
+    if workers <= 1 or len(items) <= 1:
+        return [function(item) for item in items]
+    pool = ThreadPool(min(workers, len(items)))
+    try:
+        pending = [pool.apply_async(__queued, (function, item, clock()))
+                   for item in items]
+        pool.close()
+        results = []
+        for result in pending:
+            try:
+                results.append(result.get(__remaining(deadline)))
+            except TimeoutError:
+                results.append(None)
+    finally:
+        # Late items are dropped from the queue, those being requested end
+        # with their socket timeout
+        pool.terminate()
+    return results
+
+
+def __queued(function, item, queued):
+    """Call function on a pooled item, tracing the time it spent queued."""
+    record('queue', queued, clock())
+    return function(item)
+
+
+def __fetch(url, keep_body=True, modified_since=None, timeout=None):
+    """Fetch an URL with compression and conditional revalidation.
+
+    The ETag and Last-Modified validators of every response are kept, and
+    sent back on the next request to the same URL. If the server answers
+    304 Not Modified, the body kept from the previous response is returned,
+    or None when keep_body is False. modified_since, in seconds since the
+    epoch, is used when no Last-Modified validator is known. Without
+    modified_since, a caller that keeps no body is taken not to have a copy
+    of the previous response either, so its validators are not sent.
+    timeout is the number of seconds to wait for the server, or None to wait
+    indefinitely.
+    """
+    if not keep_body and modified_since is None:
+        # Validators are worthless without the copy they validate
+        __validators.pop(url, None)
+    request = Request(url, headers={'Accept-Encoding': 'gzip, deflate'})
+    etag, last_modified, body = __validators.get(url, (None, None, None))
+    if etag:
+        request.add_header('If-None-Match', etag)
+    if last_modified:
+        request.add_header('If-Modified-Since', last_modified)
+    elif modified_since is not None:
+        request.add_header('If-Modified-Since',
+                           formatdate(modified_since, usegmt=True))
+    deadline = __deadline(timeout)
+    try:
+        with span('connect', url=url):
+            response = __urlopen(request, timeout)
+    except HTTPError as e:
+        if e.code == 304 and (body is not None or not keep_body):
+            __validators[url] = __validators.pop(url, (etag, last_modified,
+                                                       body))
+            return body
+        raise
+
+    headers = response.info()
+    with span('transfer') as transfer:
+        body = __read(response, deadline)
+        transfer.set(bytes=len(body))
+    with span('decompress'):
+        body = __decode_body(body, headers.get('Content-Encoding'))
+    etag = headers.get('ETag')
+    last_modified = headers.get('Last-Modified')
+    __validators.pop(url, None)
+    if etag or last_modified:
+        __validators[url] = (etag, last_modified, body if keep_body else None)
+        while len(__validators) > __MAX_VALIDATORS:
+            __validators.popitem(last=False)
+    return body
+
+
+def __stream(url, block_size=65536, timeout=None):
+    """Fetch an URL as a generator of decoded text blocks."""
+    deadline = __deadline(timeout)
+    request = Request(url, headers={'Accept-Encoding': 'gzip, deflate'})
+    response = __urlopen(request, timeout)
+    encoding = response.info().get('Content-Encoding')
+    if encoding == 'gzip':
+        decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+    elif encoding == 'deflate':
+        decompressor = zlib.decompressobj()
+    else:
+        decompressor = None
+    decoder = codecs.getincrementaldecoder('utf-8')()
+    while True:
+        if deadline is not None:
+            __settimeout(response, deadline)
+        block = response.read(block_size)
+        if not block:
+            break
+        if decompressor is not None:
+            block = decompressor.decompress(block)
+        yield decoder.decode(block)
+    if decompressor is not None:
+        yield decoder.decode(decompressor.flush(), final=True)
+
+
+def __chunked(rows, chunk_size, columns):
+    """Group rows into dictionaries of column lists."""
+    chunk = dict((c, []) for c in columns)
+    size = 0
+    for row in rows:
+        for c in columns:
+            chunk[c].append(row.get(c))
+        size += 1
+        if size == chunk_size:
+            yield chunk
+            chunk = dict((c, []) for c in columns)
+            size = 0
+    if size:
+        yield chunk
+
+
+__router = ProviderRouter([YQLProvider(__fetch, __stream),
+                           YahooProvider(__fetch, __stream)])
+# Batcher of the request_quotes_batched() calls without their own
+__batcher = AdaptiveBatcher()
+
+
+def use_providers(providers):
+    """Choose the data providers of every request.
+
+    Requests go to the fastest healthy provider, and fail over to the next
+    ones when it fails. Check :mod:`rtstock.providers` for the available
+    providers.
+
+    >>> from rtstock.providers import YahooProvider
+    >>> use_providers([YahooProvider(fetch)])
+
+    :param providers: Providers, in order of preference.
+    :type providers: list of rtstock.providers.Provider
+    """
+    __router.providers = providers
+
+
+def provider_stats():
+    """Get the health and latency statistics of the data providers.
+
+    >>> provider_stats()
+    {
+        'yql': {
+            'healthy': True,
+            'latency': 0.42,
+            'successes': 12,
+            'failures': 0,
+            'last_error': None
+        },
+        ...
+    }
+
+    :returns: Statistics by provider name.
+    :rtype: dictionary
+    """
+    return __router.stats()
+
+
+def use_gateway(url):
+    """Send quote requests to a quote gateway instead of Yahoo Finance.
+
+    Affects request_quotes() and every function or Stock method built on it.
+    The gateway is preferred over the other providers while it is healthy.
+    It can also be set with the RTSTOCK_GATEWAY environment variable. Check
+    :mod:`rtstock.gateway` for how to run one.
 
-    response = urlopen(url).read()
+    >>> use_gateway('http://localhost:8765')
+    >>> request_quotes(['AAPL'], ['Name'])
+    [
+        {
+            'Name': 'Apple Inc.'
+        }
+    ]
+
+    :param url: Gateway base URL, None to request Yahoo Finance directly.
+    :type url: string or None
+    """
+    providers = [p for p in __router.providers
+                 if not isinstance(p, GatewayProvider)]
+    if url is not None:
+        providers.insert(0, GatewayProvider(__fetch, url))
+    __router.providers = providers
 
-    return json.loads(response.decode('utf-8'))['query']['results']
 
+if os.environ.get('RTSTOCK_GATEWAY'):
+    use_gateway(os.environ['RTSTOCK_GATEWAY'])
 
-def request_quotes(tickers_list, selected_columns=['*']):
+
+def request_quotes(tickers_list, selected_columns=['*'], symbol_index=None,
+                   timeout=None):
     """Request Yahoo Finance recent quotes.
 
-    Returns quotes information from YQL. The columns to be requested are
-    listed at selected_columns. Check `here <http://goo.gl/8AROUD>`_ for more
-    information on YQL.
+    Returns quotes information from the fastest healthy provider, with YQL
+    field names. The columns to be requested are listed at selected_columns.
+    Check `here <http://goo.gl/8AROUD>`_ for more information on YQL.
 
     >>> request_quotes(['AAPL'], ['Name', 'PreviousClose'])
     {
@@ -82,36 +430,288 @@ def request_quotes(tickers_list, selected_columns=['*']):
     :type tickers_list: list of strings
     :param selected_columns: List of columns to be returned, defaults to ['*']
     :type selected_columns: list of strings, optional
+    :param symbol_index: Index used to skip tickers known to be invalid and
+        updated with the validity of the requested ones, defaults to None
+    :type symbol_index: rtstock.validation.SymbolIndex, optional
+    :param timeout: Seconds to wait for the response, defaults to None,
+        waiting indefinitely
+    :type timeout: float, optional
     :returns: Requested quotes.
     :rtype: json
-    :raises: TypeError, TypeError
+    :raises: TypeError, RequestError, DeadlineError
     """
     __validate_list(tickers_list)
     __validate_list(selected_columns)
-    query = 'select {cols} from yahoo.finance.quotes where symbol in ({vals})'
-    query = query.format(
-        cols=', '.join(selected_columns),
-        vals=', '.join('"{0}"'.format(s) for s in tickers_list)
-    )
-
-    response = __yahoo_request(query)
+    if symbol_index is not None:
+        tickers_list, _ = symbol_index.filter(tickers_list)
+        if not tickers_list:
+            return []
+    with span('request_quotes', tickers=len(tickers_list)):
+        quotes = __router.call('request_quotes', tickers_list,
+                               selected_columns, deadline=__deadline(timeout))
+    if not quotes:
+        raise ColumnError('Unable to process the request. Check if the ' +
+                          'columns selected are valid.')
+
+    if symbol_index is not None:
+        __index_quotes(symbol_index, tickers_list, quotes)
+        symbol_index.save()
+    return quotes
+
+
+def request_quote_values(tickers_list, selected_columns, types=None,
+                         timeout=None):
+    """Request recent quotes as tuples of the selected columns.
+
+    Works like request_quotes(), but each quote is reduced, right after the
+    response is decoded, to a tuple of the selected columns in order, whose
+    values are converted by the functions on types. Cheaper than
+    request_quotes() when polling many tickers.
+
+    >>> request_quote_values(['AAPL', 'YHOO'], ['Symbol', 'Bid'],
+    ...                      {'Bid': to_float})
+    [('AAPL', 95.6), ('YHOO', 36.49)]
 
-    if not response:
-        raise RequestError('Unable to process the request. Check if the ' +
-                           'columns selected are valid.')
+    :param tickers_list: List of tickers that will be returned.
+    :type tickers_list: list of strings
+    :param selected_columns: List of columns to be returned.
+    :type selected_columns: list of strings
+    :param types: Conversion function by column, defaults to None
+    :type types: dictionary, optional
+    :param timeout: Seconds to wait for the response, defaults to None,
+        waiting indefinitely
+    :type timeout: float, optional
+    :returns: One tuple per quote.
+    :rtype: list of tuples
+    :raises: TypeError, RequestError, DeadlineError
+    """
+    __validate_list(tickers_list)
+    __validate_list(selected_columns)
+    with span('request_quote_values', tickers=len(tickers_list)):
+        values = __router.call('request_values', tickers_list,
+                               selected_columns, types,
+                               deadline=__deadline(timeout))
+    if not values:
+        raise ColumnError('Unable to process the request. Check if the ' +
+                          'columns selected are valid.')
+    return values
+
+
+def request_quotes_isolated(tickers_list, selected_columns=['*'],
+                            timeout=None):
+    """Request Yahoo Finance recent quotes isolating invalid tickers.
+
+    Works like request_quotes(), but a failure on part of the batch does not
+    discard the whole request. Whenever a batch fails it is split in half and
+    each half is requested again, so the tickers responsible for the failure
+    are found with a logarithmic number of extra requests. The quotes of the
+    valid tickers are returned along with the errors of the failing ones.
+    Tickers not requested by the timeout get a DeadlineError, and when every
+    provider fails the tickers left get the ProviderError, without splitting.
+    An empty answer, the ColumnError of request_quotes(), is split like any
+    other failure, since a single invalid ticker empties the whole batch.
+    Tickers still failing alone with it are invalid once any other ticker
+    has been answered with the same columns, and otherwise the columns are
+    the ones taken as invalid.
+
+    >>> quotes, errors = request_quotes_isolated(['AAPL', 'fake'], ['Name'])
+    >>> quotes
+    [
+        {
+            'Name': 'Apple Inc.'
+        }
+    ]
+    >>> errors
+    {
+        'fake': RequestError('fake is not a valid stock ticker.')
+    }
 
-    if not type(response['quote']) is list:
-        return [response['quote']]
-    return response['quote']
+    :param tickers_list: List of tickers that will be returned.
+    :type tickers_list: list of strings
+    :param selected_columns: List of columns to be returned, defaults to ['*']
+    :type selected_columns: list of strings, optional
+    :param timeout: Seconds to wait for all the responses, defaults to None,
+        waiting indefinitely
+    :type timeout: float, optional
+    :returns: Requested quotes, in the order of tickers_list, and a dictionary
+        mapping each failing ticker to its error.
+    :rtype: tuple of (list of dictionaries, dictionary)
+    :raises: TypeError
+    """
+    __validate_list(tickers_list)
+    __validate_list(selected_columns)
 
+    deadline = __deadline(timeout)
+    quotes = []
+    errors = {}
+    # Tickers failing alone with a ColumnError before any quote was answered
+    empty = {}
+    # Depth-first over the pending batches, so results keep the input order.
+    pending = [tickers_list] if tickers_list else []
+    while pending:
+        batch = pending.pop()
+        try:
+            quotes.extend(request_quotes(batch, selected_columns,
+                                         timeout=__remaining(deadline)))
+        except (DeadlineError, ProviderError) as e:
+            # Not the tickers' fault, so splitting the batch would not help
+            for late in [batch] + pending:
+                errors.update((ticker, e) for ticker in late)
+            break
+        except RequestError as e:
+            if len(batch) == 1:
+                if isinstance(e, ColumnError):
+                    empty[batch[0]] = e
+                else:
+                    errors[batch[0]] = e
+                continue
+            middle = len(batch) // 2
+            pending.append(batch[middle:])
+            pending.append(batch[:middle])
+    for ticker, e in empty.items():
+        # The columns were answered for other tickers, so the ticker is bad
+        errors[ticker] = RequestError(ticker + ' is not a valid stock ' +
+                                      'ticker.') if quotes else e
+    return quotes, errors
+
+
+def __quotes_url_length(selected_columns):
+    """Longest URL lengths of a quotes request among the providers."""
+    lengths = []
+    for provider in __router.providers:
+        try:
+            lengths.append(provider.quotes_url_length(selected_columns))
+        except NotImplementedError:
+            continue
+    if not lengths:
+        return 0, len
+    item_lengths = [length for _, length in lengths]
+    return max(base for base, _ in lengths), \
+        lambda t: max(length(t) for length in item_lengths)
+
+
+def __is_size_error(error):
+    """Whether a batch failed for being too big.
+
+    Every provider must have rejected its URL as too long or timed out.
+    """
+    if not isinstance(error, ProviderError) or not error.errors:
+        return False
+    for e in error.errors.values():
+        if isinstance(e, HTTPError):
+            if e.code not in (413, 414):
+                return False
+        elif not isinstance(getattr(e, 'reason', e), socket.timeout):
+            return False
+    return True
+
+
+def request_quotes_batched(tickers_list, selected_columns=['*'],
+                           batcher=None, symbol_index=None, timeout=None,
+                           workers=1, fetch=None):
+    """Request Yahoo Finance recent quotes in automatically sized batches.
+
+    Splits tickers_list into batches chosen by an AdaptiveBatcher, which keeps
+    every request URL under its maximum length and tunes the batch size from
+    the latency of the responses. Each batch is requested through
+    request_quotes_isolated(), so invalid tickers do not discard the rest of
+    the batch. Calls share the same batcher, unless given their own, so what
+    it learns is kept, and batches every provider rejected for being too
+    long or too slow lower its maximum batch size. URL lengths are those of
+    the provider with the longest URLs, so batches fit whichever provider
+    answers them.
+
+    With a timeout, whatever has arrived when it expires is returned, and
+    the tickers still missing get a DeadlineError. Batches are requested by
+    up to workers threads at a time.
+
+    >>> quotes, errors = request_quotes_batched(tickers, ['Bid'], timeout=0.5,
+    ...                                         workers=8)
+    >>> [t for t, e in errors.items() if isinstance(e, DeadlineError)]
+    ['GOOGL', 'MSFT']
 
-def request_historical(ticker, start_date, end_date):
+    :param tickers_list: List of tickers that will be returned.
+    :type tickers_list: list of strings
+    :param selected_columns: List of columns to be returned, defaults to ['*']
+    :type selected_columns: list of strings, optional
+    :param batcher: Batcher choosing the batch sizes, defaults to a batcher
+        shared by every call
+    :type batcher: rtstock.batching.AdaptiveBatcher, optional
+    :param symbol_index: Index used to skip tickers known to be invalid,
+        defaults to None
+    :type symbol_index: rtstock.validation.SymbolIndex, optional
+    :param timeout: Seconds to wait for all the responses, defaults to None,
+        waiting indefinitely
+    :type timeout: float, optional
+    :param workers: Batches requested at the same time, defaults to 1
+    :type workers: integer, optional
+    :param fetch: Function called with a batch, the columns and the timeout
+        keyword, returning quotes and errors, defaults to
+        request_quotes_isolated
+    :type fetch: function, optional
+    :returns: Requested quotes, in the order of tickers_list, and a dictionary
+        mapping each failing ticker to its error.
+    :rtype: tuple of (list of dictionaries, dictionary)
+    :raises: TypeError
+    """
+    __validate_list(tickers_list)
+    __validate_list(selected_columns)
+    deadline = __deadline(timeout)
+    fetch = fetch or request_quotes_isolated
+    if batcher is None:
+        batcher = __batcher
+    if symbol_index is not None:
+        tickers_list, _ = symbol_index.filter(tickers_list)
+
+    with span('chunking', tickers=len(tickers_list)) as chunking:
+        base_length, item_length = __quotes_url_length(selected_columns)
+        batches = batcher.split(tickers_list, base_length, item_length)
+        chunking.set(batches=len(batches))
+
+    def request(batch):
+        start = time.time()
+        with span('batch', tickers=len(batch)) as batch_span:
+            batch_quotes, batch_errors = fetch(
+                batch, selected_columns, timeout=__remaining(deadline))
+            batch_span.set(errors=len(batch_errors))
+        return batch_quotes, batch_errors, time.time() - start
+
+    quotes = []
+    errors = {}
+    with span('request_quotes_batched', tickers=len(tickers_list),
+              workers=workers):
+        results = __gather(request, batches, workers, deadline)
+    for batch, result in zip(batches, results):
+        if result is None:
+            late = DeadlineError('Unable to process the request before its ' +
+                                 'deadline.')
+            errors.update((ticker, late) for ticker in batch)
+            continue
+        batch_quotes, batch_errors, latency = result
+        # Only clean batches say something about latency against size
+        if not batch_errors:
+            batcher.observe(len(batch), latency)
+        elif any(__is_size_error(e) for e in batch_errors.values()):
+            batcher.observe_failure(len(batch))
+        quotes.extend(batch_quotes)
+        errors.update(batch_errors)
+
+    if symbol_index is not None:
+        for ticker, e in errors.items():
+            if is_ticker_error(e):
+                symbol_index.mark_invalid(ticker)
+        symbol_index.save()
+    return quotes, errors
+
+
+def request_historical(ticker, start_date, end_date, symbol_index=None,
+                       calendar=None, timeout=None):
     """Get stock's daily historical information.
 
     Returns a dictionary with Adj Close, Close, High, Low, Open and
     Volume, between the start_date and the end_date. Is start_date and
     end_date were not provided all the available information will be
-    retrieved. Information provided by YQL platform.
+    retrieved. Information provided by the fastest healthy provider.
     Check `here <http://goo.gl/8AROUD>`_ for more information on YQL.
 
     .. warning:: Request limited to a period not greater than 366 days.
@@ -144,54 +744,215 @@ def request_historical(ticker, start_date, end_date):
     :type start_date: string on the format of "yyyy-mm-dd"
     :param end_date: End date
     :type end_date: string on the format of "yyyy-mm-dd"
+    :param symbol_index: Index used to skip tickers known to be invalid,
+        defaults to None
+    :type symbol_index: rtstock.validation.SymbolIndex, optional
+    :param calendar: Trading calendar, or the name of a registered one, used
+        to shrink the period to its trading sessions. A period without
+        sessions returns an empty list without any request. Defaults to None
+    :type calendar: rtstock.calendars.TradingCalendar or string, optional
+    :param timeout: Seconds to wait for the response, defaults to None,
+        waiting indefinitely
+    :type timeout: float, optional
     :returns: Daily historical information.
     :rtype: list of dictionaries
+    :raises: RequestError, DeadlineError, ValueError
     """
     __validate_dates(start_date, end_date)
+    if symbol_index is not None and symbol_index.is_invalid(ticker):
+        raise RequestError(ticker + ' is known not to be a valid ' +
+                           'stock ticker.')
+    if calendar is not None:
+        window = __session_window(start_date, end_date, calendar)
+        if window is None:
+            return []
+        start_date, end_date = window
+
+    with span('request_historical', ticker=ticker) as historical:
+        rows = __router.call('request_historical', ticker, start_date,
+                             end_date, deadline=__deadline(timeout))
+        historical.set(rows=len(rows))
+    if not rows:
+        raise RequestError('Unable to process the request. Check if the ' +
+                           'stock ticker used is a valid one.')
+
+    if symbol_index is not None:
+        symbol_index.mark_valid(ticker)
+        symbol_index.save()
+    return rows
+
+
+def iter_historical(ticker, start_date, end_date, chunk_size=None,
+                    symbol_index=None, calendar=None, timeout=None):
+    """Iterate over stock's daily historical information.
+
+    Works like request_historical(), but rows are yielded as they are parsed
+    from the response, so memory use does not grow with the period and
+    processing starts before the download finishes. Periods longer than 366
+    days are requested one year at a time, newest first, so rows keep the
+    descending date order of request_historical(). A provider failing
+    halfway through a year is replaced by the next one from the day before
+    the last row yielded.
 
-    cols = ['Date', 'Open', 'High', 'Low', 'Close', 'Volume', 'Adj_Close']
-    query = 'select {cols} from yahoo.finance.historicaldata ' + \
-        'where symbol in ("{ticker}") and startDate = "{start_date}" ' + \
-        'and endDate = "{end_date}"'
-    query = query.format(
-        cols=', '.join(cols),
-        ticker=ticker,
-        start_date=start_date,
-        end_date=end_date
-    )
-
-    response = __yahoo_request(query)
-    if not response:
+    >>> for row in iter_historical('AAPL', '1990-01-01', '2016-03-02'):
+    ...     print(row['Date'], row['Close'])
+    2016-03-02 100.75
+    2016-03-01 100.529999
+    ...
+
+    :param ticker: Stock ticker in Yahoo Finances format.
+    :type ticker: string
+    :param start_date: Start date
+    :type start_date: string on the format of "yyyy-mm-dd"
+    :param end_date: End date
+    :type end_date: string on the format of "yyyy-mm-dd"
+    :param chunk_size: If given, rows are grouped into dictionaries of
+        column lists of up to chunk_size rows, defaults to None
+    :type chunk_size: integer, optional
+    :param symbol_index: Index used to skip tickers known to be invalid,
+        defaults to None
+    :type symbol_index: rtstock.validation.SymbolIndex, optional
+    :param calendar: Trading calendar, or the name of a registered one, used
+        to skip years without trading sessions, defaults to None
+    :type calendar: rtstock.calendars.TradingCalendar or string, optional
+    :param timeout: Seconds to wait for all the responses, from the first
+        request on, defaults to None, waiting indefinitely
+    :type timeout: float, optional
+    :returns: Daily historical information.
+    :rtype: generator of dictionaries
+    :raises: RequestError, DeadlineError, ValueError
+    """
+    __validate_dates(start_date, end_date, max_days=None)
+    if symbol_index is not None and symbol_index.is_invalid(ticker):
+        raise RequestError(ticker + ' is known not to be a valid ' +
+                           'stock ticker.')
+    rows = __iter_historical(ticker, start_date, end_date, calendar, timeout)
+    if chunk_size is None:
+        return rows
+    return __chunked(rows, chunk_size, HISTORICAL_COLUMNS)
+
+
+def __resume_historical(args, row):
+    """Arguments of the historical request of the days before a row."""
+    ticker, start_date, end_date = args
+    end = datetime.datetime.strptime(row['Date'], '%Y-%m-%d').date() - \
+        datetime.timedelta(days=1)
+    if end.isoformat() < start_date:
+        return None
+    return ticker, start_date, end.isoformat()
+
+
+def __iter_historical(ticker, start_date, end_date, calendar, timeout):
+    """Yield the rows of a period, one year at a time."""
+    deadline = __deadline(timeout)
+    first = datetime.datetime.strptime(start_date, '%Y-%m-%d').date()
+    end = datetime.datetime.strptime(end_date, '%Y-%m-%d').date()
+    found = False
+    while end >= first:
+        start = max(first, end - datetime.timedelta(days=365))
+        window = (start.isoformat(), end.isoformat())
+        if calendar is not None:
+            window = __session_window(window[0], window[1], calendar)
+        if window is not None:
+            rows = __router.iterate('iter_historical', ticker, *window,
+                                    deadline=deadline,
+                                    resume=__resume_historical)
+            for row in rows:
+                found = True
+                yield row
+        end = start - datetime.timedelta(days=1)
+    if not found and calendar is None:
         raise RequestError('Unable to process the request. Check if the ' +
                            'stock ticker used is a valid one.')
 
-    if not type(response['quote']) is list:
-        return [response['quote']]
-    return response['quote']
 
+def iter_historical_csv(path, chunk_size=None):
+    """Iterate over the historical data of a downloaded CSV file.
+
+    Reads files saved by download_historical() line by line. Rows have the
+    same keys as the ones from request_historical().
+
+    >>> for row in iter_historical_csv('AAPL.csv'):
+    ...     print(row['Date'], row['Adj_Close'])
+
+    :param path: CSV file path.
+    :type path: string
+    :param chunk_size: If given, rows are grouped into dictionaries of
+        column lists of up to chunk_size rows, defaults to None
+    :type chunk_size: integer, optional
+    :returns: Daily historical information.
+    :rtype: generator of dictionaries
+    """
+    rows = __iter_csv(path)
+    if chunk_size is None:
+        return rows
+    return __chunked(rows, chunk_size, HISTORICAL_COLUMNS)
 
-def download_historical(tickers_list, output_folder):
+
+def __iter_csv(path):
+    """Yield the rows of a historical data CSV file."""
+    with io.open(path, 'r', newline='') as f:
+        reader = csv.reader(f)
+        header = [c.replace(' ', '_') for c in next(reader)]
+        for values in reader:
+            if values:
+                yield dict(zip(header, values))
+
+
+def download_historical(tickers_list, output_folder, symbol_index=None,
+                        timeout=None):
     """Download historical data from Yahoo Finance.
 
     Downloads full historical data from Yahoo Finance as CSV. The following
     fields are available: Adj Close, Close, High, Low, Open and Volume. Files
-    will be saved to output_folder as <ticker>.csv.
+    will be saved to output_folder as <ticker>.csv. Files are only created
+    once the download succeeds. Existing files are revalidated, so they are
+    only downloaded again if the data changed since they were written.
 
     :param tickers_list: List of tickers that will be returned.
     :type tickers_list: list of strings
     :param output_folder: Output folder path
     :type output_folder: string
+    :param symbol_index: Index used to skip tickers known to be invalid and
+        updated with the validity of the downloaded ones, defaults to None
+    :type symbol_index: rtstock.validation.SymbolIndex, optional
+    :param timeout: Seconds to wait for all the downloads, defaults to None,
+        waiting indefinitely
+    :type timeout: float, optional
+    :raises: RequestError, DeadlineError
     """
     __validate_list(tickers_list)
-    for ticker in tickers_list:
-        file_name = os.path.join(output_folder, ticker + '.csv')
-        with open(file_name, 'wb') as f:
-            base_url = 'http://real-chart.finance.yahoo.com/table.csv?s='
+    deadline = __deadline(timeout)
+    if symbol_index is not None:
+        tickers_list, _ = symbol_index.filter(tickers_list)
+    try:
+        for ticker in tickers_list:
+            file_name = os.path.join(output_folder, ticker + '.csv')
+            modified_since = None
+            if os.path.exists(file_name):
+                modified_since = os.path.getmtime(file_name)
             try:
-                urlopen(base_url + ticker)
-                urlretrieve(base_url + ticker, f.name)
-            except:
-                os.remove(file_name)
-                raise RequestError('Unable to process the request. Check if ' +
-                                   ticker + ' is a valid stock ticker')
-
+                with span('download_historical', ticker=ticker):
+                    data = __router.call('download_historical', ticker,
+                                         modified_since=modified_since,
+                                         deadline=deadline)
+            except DeadlineError:
+                raise
+            except ProviderError:
+                # Provider failures say nothing about the ticker, they may
+                # just be a network outage.
+                raise RequestError('Unable to process the request. Check ' +
+                                   'if ' + ticker + ' is a valid stock ticker')
+            except RequestError:
+                if symbol_index is not None:
+                    symbol_index.mark_invalid(ticker)
+                raise RequestError('Unable to process the request. Check ' +
+                                   'if ' + ticker + ' is a valid stock ticker')
+            if data is not None:
+                with open(file_name, 'wb') as f:
+                    f.write(data)
+            if symbol_index is not None:
+                symbol_index.mark_valid(ticker)
+    finally:
+        if symbol_index is not None:
+            symbol_index.save()
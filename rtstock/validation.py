@@ -0,0 +1,202 @@
+"""
+Validation module.
+
+This module contains the symbol validation index, a persisted record of
+tickers known to be valid or invalid on Yahoo Finance. It allows requests for
+dead tickers to be skipped up front instead of failing on every retry.
+"""
+
+from __future__ import unicode_literals
+import json
+import os
+import time
+
+from .utils import is_ticker_error, request_quotes_isolated
+
+
+class SymbolIndex(object):
+    """Class for handling the symbol validation index.
+
+    Keeps the validity of each ticker along with the time it was checked.
+    Entries expire after ttl seconds (invalid tickers) or valid_ttl seconds
+    (valid tickers), after which the ticker is considered unknown again. If a
+    path is given, the index is loaded from and saved to that JSON file.
+
+    >>> from rtstock.validation import SymbolIndex
+    >>>
+    >>> index = SymbolIndex('symbols.json')
+    >>> index.validate(['AAPL', 'fake_ticker'])
+    {
+        'AAPL': True,
+        'fake_ticker': False
+    }
+    >>> index.is_invalid('fake_ticker')
+    True
+
+    :param path: JSON file where the index is persisted, defaults to None
+    :type path: string, optional
+    :param ttl: Seconds an invalid ticker is remembered, defaults to a day
+    :type ttl: number, optional
+    :param valid_ttl: Seconds a valid ticker is remembered, defaults to a week
+    :type valid_ttl: number, optional
+    """
+
+    def __init__(self, path=None, ttl=86400, valid_ttl=604800):
+        """Instantiate SymbolIndex class."""
+        self.path = path
+        self.ttl = ttl
+        self.valid_ttl = valid_ttl
+        self.__entries = {}
+        self.__dirty = False
+        if path is not None and os.path.exists(path):
+            self.load()
+
+    def __len__(self):
+        """Number of tickers in the index."""
+        return len(self.__entries)
+
+    def __contains__(self, ticker):
+        """Whether the ticker has a non expired entry."""
+        return self.status(ticker) is not None
+
+    def load(self):
+        """Load the index from its JSON file.
+
+        Expired entries are dropped while loading.
+        """
+        with open(self.path, 'r') as f:
+            entries = json.load(f)
+        now = time.time()
+        self.__entries = dict(
+            (ticker, (bool(valid), checked))
+            for ticker, (valid, checked) in entries.items()
+            if not self.__expired(valid, checked, now)
+        )
+        self.__dirty = False
+
+    def save(self):
+        """Save the index to its JSON file.
+
+        Nothing is written if the index has no path or has not changed since
+        it was last loaded or saved.
+        """
+        if self.path is None or not self.__dirty:
+            return
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(self.__entries, f)
+        # os.replace is atomic on every platform, but Python 2 lacks it
+        getattr(os, 'replace', os.rename)(tmp_path, self.path)
+        self.__dirty = False
+
+    def mark_valid(self, ticker):
+        """Record a ticker as valid.
+
+        :param ticker: Stock ticker in Yahoo Finances format.
+        :type ticker: string
+        """
+        self.__set(ticker, True)
+
+    def mark_invalid(self, ticker):
+        """Record a ticker as invalid.
+
+        :param ticker: Stock ticker in Yahoo Finances format.
+        :type ticker: string
+        """
+        self.__set(ticker, False)
+
+    def status(self, ticker):
+        """Get ticker's validity.
+
+        :param ticker: Stock ticker in Yahoo Finances format.
+        :type ticker: string
+        :returns: True or False if the ticker is known to be valid or
+            invalid, None if it is unknown or its entry has expired.
+        :rtype: boolean or None
+        """
+        entry = self.__entries.get(ticker)
+        if entry is None:
+            return None
+        valid, checked = entry
+        if self.__expired(valid, checked, time.time()):
+            del self.__entries[ticker]
+            self.__dirty = True
+            return None
+        return valid
+
+    def is_valid(self, ticker):
+        """Whether the ticker is known to be valid."""
+        return self.status(ticker) is True
+
+    def is_invalid(self, ticker):
+        """Whether the ticker is known to be invalid."""
+        return self.status(ticker) is False
+
+    def filter(self, tickers_list):
+        """Split tickers into the ones worth requesting and the known-bad.
+
+        :param tickers_list: List of tickers.
+        :type tickers_list: list of strings
+        :returns: Tickers not known to be invalid and known invalid tickers,
+            both in their original order.
+        :rtype: tuple of (list of strings, list of strings)
+        """
+        keep = []
+        skipped = []
+        for ticker in tickers_list:
+            if self.is_invalid(ticker):
+                skipped.append(ticker)
+            else:
+                keep.append(ticker)
+        return keep, skipped
+
+    def validate(self, tickers_list, chunk_size=200):
+        """Validate a list of tickers.
+
+        Only tickers without a valid entry in the index are requested, with
+        the two cheapest columns (Symbol and Name) and in chunks of chunk_size
+        tickers. A ticker is invalid when Yahoo Finance returns no name for
+        it or fails to process it. The index is saved afterwards.
+
+        :param tickers_list: List of tickers to be validated.
+        :type tickers_list: list of strings
+        :param chunk_size: Tickers per request, defaults to 200
+        :type chunk_size: integer, optional
+        :returns: Validity of every ticker in tickers_list, None for the ones
+            that could not be requested.
+        :rtype: dictionary
+        """
+        result = {}
+        unknown = []
+        for ticker in tickers_list:
+            status = self.status(ticker)
+            if status is None:
+                unknown.append(ticker)
+            else:
+                result[ticker] = status
+
+        for i in range(0, len(unknown), chunk_size):
+            chunk = unknown[i:i + chunk_size]
+            quotes, errors = request_quotes_isolated(chunk, ['Symbol', 'Name'])
+            named = set(q.get('Symbol') for q in quotes if q.get('Name'))
+            for ticker in chunk:
+                if ticker in errors and not is_ticker_error(errors[ticker]):
+                    # Unknown until Yahoo Finance can be reached
+                    result[ticker] = None
+                    continue
+                valid = ticker in named and ticker not in errors
+                self.__set(ticker, valid)
+                result[ticker] = valid
+
+        self.save()
+        return result
+
+    def __set(self, ticker, valid):
+        """Set ticker's entry."""
+        self.__entries[ticker] = (valid, time.time())
+        self.__dirty = True
+
+    def __expired(self, valid, checked, now):
+        """Whether an entry has expired."""
+        ttl = self.valid_ttl if valid else self.ttl
+        return ttl is not None and now - checked > ttl
@@ -13,6 +13,13 @@ requirements = [
 
 ]
 
+extras_requirements = {
+    'numpy': ['numpy'],
+    'pandas': ['pandas'],
+    'arrow': ['pyarrow'],
+    'json': ['orjson'],
+}
+
 test_requirements = [
     # TODO: put package test requirements here
 ]
@@ -34,7 +41,13 @@ setup(
     package_dir={'rtstock':
                  'rtstock'},
     include_package_data=True,
+    entry_points={
+        'console_scripts': [
+            'rtstock=rtstock.cli:main',
+        ],
+    },
     install_requires=requirements,
+    extras_require=extras_requirements,
     license="MIT license",
     zip_safe=False,
     keywords='rtstock',
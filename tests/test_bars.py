@@ -0,0 +1,72 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+test_bars
+----------------------------------
+
+Tests for `bars` module.
+"""
+
+import sys
+import unittest
+
+from rtstock.bars import BarAggregator
+
+
+class TestBarAggregator(unittest.TestCase):
+    """Tests for BarAggregator class."""
+
+    def setUp(self):
+        """SetUp."""
+        # 2016-03-01 14:30 UTC
+        self.start = 1456842600
+        self.emitted = []
+        self.bars = BarAggregator('1m', on_bar=lambda t, b:
+                                  self.emitted.append((t, b)))
+
+    def test_ohlcv(self):
+        """Test building a bar from several updates."""
+        for offset, price, volume in [(1, 10.0, 1000), (15, 12.0, 1500),
+                                      (30, 9.0, 1700), (59, 11.0, 2000)]:
+            self.assertEqual(self.bars.update('AAPL', price, volume,
+                                              self.start + offset), [])
+        self.assertEqual(self.bars.current('AAPL'),
+                         (10.0, 12.0, 9.0, 11.0, 1000.0))
+        closed = self.bars.update('AAPL', 11.5, 2100, self.start + 60)
+        self.assertEqual(closed, [('AAPL', {
+            'Date': '2016-03-01 14:30:00', 'Open': '10.0', 'High': '12.0',
+            'Low': '9.0', 'Close': '11.0', 'Adj_Close': '11.0',
+            'Volume': '1000'})])
+        self.assertEqual(self.emitted, closed)
+        self.assertEqual(self.bars.current('AAPL'),
+                         (11.5, 11.5, 11.5, 11.5, 100.0))
+
+    def test_boundary_closes_every_ticker(self):
+        """Test a new interval closing the bars of every ticker."""
+        self.bars.update_quotes([
+            {'Symbol': 'AAPL', 'LastTradePriceOnly': '95.89',
+             'Volume': '100'},
+            {'Symbol': 'YHOO', 'LastTradePriceOnly': '36.35'},
+            {'Symbol': 'fake_ticker', 'LastTradePriceOnly': None},
+        ], self.start)
+        closed = self.bars.advance(self.start + 120)
+        self.assertEqual(sorted(t for t, _ in closed), ['AAPL', 'YHOO'])
+        self.assertEqual(self.bars.current('AAPL'), None)
+        self.assertEqual(self.bars.advance(self.start + 130), [])
+
+    def test_late_updates(self):
+        """Test updates older than the current interval being dropped."""
+        self.bars.update('AAPL', 10.0, timestamp=self.start + 60)
+        self.bars.update('AAPL', 99.0, timestamp=self.start)
+        self.assertEqual(self.bars.late, 1)
+        self.assertEqual(self.bars.current('AAPL')[1], 10.0)
+
+    def test_invalid_interval(self):
+        """Test an unknown interval."""
+        with self.assertRaises(ValueError):
+            BarAggregator('2d')
+
+
+if __name__ == '__main__':
+    sys.exit(unittest.main())
@@ -0,0 +1,67 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+test_batching
+----------------------------------
+
+Tests for `batching` module.
+"""
+
+import sys
+import unittest
+
+from rtstock.batching import AdaptiveBatcher
+
+
+class TestAdaptiveBatcher(unittest.TestCase):
+    """Tests for AdaptiveBatcher class."""
+
+    def setUp(self):
+        """SetUp."""
+        self.batcher = AdaptiveBatcher(max_url_length=100, initial_size=10,
+                                       max_size=100)
+
+    def test_split_by_size(self):
+        """Test split respecting the batch size."""
+        batches = self.batcher.split(list(range(25)), item_length=lambda i: 1)
+        self.assertEqual([len(b) for b in batches], [10, 10, 5])
+        self.assertEqual(sum(batches, []), list(range(25)))
+
+    def test_split_by_url_length(self):
+        """Test split respecting the maximum URL length."""
+        batches = self.batcher.split(['ABCDEFGHIJ'] * 10, base_length=50)
+        self.assertEqual([len(b) for b in batches], [5, 5])
+
+    def test_converges(self):
+        """Test batch size climbing to the best throughput."""
+        # Latency grows quadratically, so throughput peaks at size 40
+        def latency(size):
+            return 1.6 + 0.001 * size ** 2
+
+        for _ in range(20):
+            size = self.batcher.batch_size()
+            self.batcher.observe(size, latency(size))
+        self.assertTrue(30 <= self.batcher.batch_size() <= 50)
+
+    def test_leftover_batches(self):
+        """Test batches smaller than their grid size counting as such."""
+        self.batcher.observe(10, 1.0)
+        self.batcher.observe(14, 1.4)
+        self.assertAlmostEqual(self.batcher.throughput(10), 10.0)
+        self.batcher.observe(3, 1.0)
+        self.assertAlmostEqual(self.batcher.throughput(2), 3.0)
+
+    def test_failure(self):
+        """Test sizes above a failing one being dropped."""
+        self.batcher.observe_failure(10)
+        self.assertTrue(self.batcher.batch_size() < 10)
+
+    def test_invalid_sizes(self):
+        """Test instantiating with inconsistent sizes."""
+        with self.assertRaises(ValueError):
+            AdaptiveBatcher(min_size=10, initial_size=5)
+
+
+if __name__ == '__main__':
+    sys.exit(unittest.main())
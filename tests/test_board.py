@@ -0,0 +1,72 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+test_board
+----------------------------------
+
+Tests for `board` module.
+"""
+
+import math
+import sys
+import unittest
+
+from rtstock.board import QuoteBoard, shared_memory
+
+
+@unittest.skipIf(shared_memory is None, 'Shared memory is not available')
+class TestQuoteBoard(unittest.TestCase):
+    """Tests for QuoteBoard class."""
+
+    def setUp(self):
+        """SetUp."""
+        self.fields = ['LastTradePriceOnly', 'Volume']
+        self.board = QuoteBoard.create(None, ['AAPL', 'YHOO'], self.fields)
+
+    def test_write_read(self):
+        """Test writing and reading a slot."""
+        row, updated = self.board.read('AAPL')
+        self.assertTrue(all(math.isnan(v) for v in row))
+        self.assertTrue(math.isnan(updated))
+        self.board.write('AAPL', [95.89, 33169600], updated=10.0)
+        self.assertEqual(self.board.read('AAPL'), ((95.89, 33169600.0), 10.0))
+        self.assertEqual(self.board.version('AAPL'), 2)
+        with self.assertRaises(KeyError):
+            self.board.read('fake_ticker')
+
+    def test_write_errors(self):
+        """Test writes with the wrong number of values."""
+        with self.assertRaises(ValueError):
+            self.board.write('AAPL', [95.89])
+        self.assertEqual(self.board.version('AAPL'), 0)
+
+    def test_dead_writer(self):
+        """Test reads giving up on a slot left locked by its writer."""
+        # A writer dying halfway through an update leaves the version odd
+        self.board._QuoteBoard__words[0] += 1
+        with self.assertRaises(TimeoutError):
+            self.board.read('AAPL', timeout=0.01)
+        # Other slots are still readable
+        self.assertTrue(math.isnan(self.board.read('YHOO')[1]))
+
+    def test_attach(self):
+        """Test a reader attached to the board seeing the updates."""
+        reader = QuoteBoard.attach(self.board.name)
+        self.assertEqual(reader.tickers, ['AAPL', 'YHOO'])
+        self.assertEqual(reader.fields, self.fields)
+        self.board.publish([{'Symbol': 'YHOO', 'LastTradePriceOnly': '36.35',
+                             'Volume': '1.5M'},
+                            {'Symbol': 'fake_ticker', 'Volume': '1'}])
+        self.assertEqual(reader.read_dict('YHOO'),
+                         {'LastTradePriceOnly': 36.35, 'Volume': 1.5e6})
+        reader.close()
+
+    def tearDown(self):
+        """Cleaning up."""
+        self.board.close()
+        self.board.unlink()
+
+
+if __name__ == '__main__':
+    sys.exit(unittest.main())
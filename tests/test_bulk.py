@@ -0,0 +1,84 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+test_bulk
+----------------------------------
+
+Tests for `bulk` module.
+"""
+
+import sys
+import threading
+import time
+import unittest
+
+try:
+    from unittest import mock
+except ImportError:
+    import mock
+
+import rtstock.error as error
+import rtstock.stock
+from rtstock import bulk
+from rtstock.stock import Stock
+
+
+class TestBulk(unittest.TestCase):
+    """Tests for bulk module."""
+
+    def setUp(self):
+        """SetUp."""
+        self.release = threading.Event()
+        self.addCleanup(self.release.set)
+
+        def fake_historical(ticker, start_date, end_date, calendar=None,
+                            timeout=None):
+            if ticker == 'fake_ticker':
+                raise error.RequestError('Unable to process the request.')
+            if ticker == 'HANG':
+                self.release.wait(5)
+            # Later tickers finish first
+            time.sleep(0.01 * (5 - len(ticker)))
+            return [{'Date': start_date, 'Close': ticker}]
+
+        patcher = mock.patch.object(rtstock.stock, 'request_historical',
+                                    side_effect=fake_historical)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_order_and_errors(self):
+        """Test keeping the order and collecting errors."""
+        stocks = [Stock('A'), Stock('fake_ticker'), 'GOOGL', Stock('YHOO')]
+        rows, errors = bulk.get_historical(stocks, '2016-03-01',
+                                           '2016-03-02', workers=4)
+        self.assertEqual([r and r[0]['Close'] for r in rows],
+                         ['A', None, 'GOOGL', 'YHOO'])
+        self.assertEqual(list(errors), [Stock('fake_ticker')])
+        self.assertTrue(isinstance(errors[Stock('fake_ticker')],
+                                   error.RequestError))
+
+    def test_timeout(self):
+        """Test giving up on the stocks late for the timeout."""
+        rows, errors = bulk.get_historical(['AAPL', 'HANG'], '2016-03-01',
+                                           '2016-03-02', timeout=0.2)
+        self.assertEqual(rows[0][0]['Close'], 'AAPL')
+        self.assertTrue(isinstance(errors['HANG'], error.DeadlineError))
+
+    def test_cancel(self):
+        """Test cancelling the stocks not finished yet."""
+        cancel = threading.Event()
+        with bulk.BulkExecutor(workers=1) as executor:
+            timer = threading.Timer(0.1, cancel.set)
+            timer.start()
+            rows, errors = bulk.get_historical(
+                ['HANG', 'AAPL'], '2016-03-01', '2016-03-02', cancel=cancel,
+                executor=executor)
+            timer.join()
+        self.assertEqual(rows, [None, None])
+        for e in errors.values():
+            self.assertTrue(isinstance(e, error.CancelledError))
+
+
+if __name__ == '__main__':
+    sys.exit(unittest.main())
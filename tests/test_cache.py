@@ -0,0 +1,138 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+test_cache
+----------------------------------
+
+Tests for `cache` module.
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+import time
+import threading
+import unittest
+
+import rtstock.error as error
+from rtstock.cache import QuoteCache
+from rtstock.stock import Stock
+
+
+class TestQuoteCache(unittest.TestCase):
+    """Tests for QuoteCache class."""
+
+    def setUp(self):
+        """SetUp."""
+        self.folder = tempfile.mkdtemp()
+        self.path = os.path.join(self.folder, 'quotes.db')
+        self.requests = []
+        self.price = '95.89'
+
+    def fetch(self, tickers_list, selected_columns, timeout=None):
+        """Fake quotes source."""
+        self.requests.append(list(tickers_list))
+        self.timeout = timeout
+        quotes = [{'Symbol': t, 'LastTradePriceOnly': self.price,
+                   'LastTradeTime': '4:00pm'}
+                  for t in tickers_list if t != 'fake_ticker']
+        errors = {}
+        if 'fake_ticker' in tickers_list:
+            errors['fake_ticker'] = error.RequestError('Invalid ticker')
+        return [dict((k, v) for k, v in q.items() if k in selected_columns)
+                for q in quotes], errors
+
+    def test_fresh(self):
+        """Test fresh quotes being served from memory."""
+        with QuoteCache(self.path, fetch=self.fetch) as cache:
+            quotes = cache.request_quotes(['AAPL', 'YHOO'],
+                                          ['LastTradePriceOnly'], timeout=5)
+            self.assertEqual(quotes, [{'LastTradePriceOnly': '95.89'},
+                                      {'LastTradePriceOnly': '95.89'}])
+            self.assertEqual(self.timeout, 5)
+            cache.request_quotes(['AAPL'], ['LastTradePriceOnly'])
+        self.assertEqual(self.requests, [['AAPL', 'YHOO']])
+
+    def test_errors(self):
+        """Test tickers that cannot be served raising their error."""
+        with QuoteCache(self.path, fetch=self.fetch) as cache:
+            with self.assertRaises(error.RequestError) as context:
+                cache.request_quotes(['AAPL', 'fake_ticker'],
+                                     ['LastTradePriceOnly'])
+            self.assertEqual(str(context.exception), 'Invalid ticker')
+            with self.assertRaises(error.RequestError):
+                Stock('fake_ticker').get_latest_price(cache=cache)
+            # The valid ticker was cached anyway
+            self.assertNotEqual(cache.get('AAPL', ['LastTradePriceOnly']),
+                                None)
+
+    def test_warm_start(self):
+        """Test a new cache serving the quotes saved by a previous one."""
+        with QuoteCache(self.path, fetch=self.fetch) as cache:
+            Stock('AAPL').get_latest_price(cache=cache)
+        with QuoteCache(self.path, fetch=self.fetch) as cache:
+            self.assertEqual(len(cache), 1)
+            self.assertEqual(Stock('AAPL').get_latest_price(cache=cache),
+                             [{'LastTradePriceOnly': '95.89',
+                               'LastTradeTime': '4:00pm'}])
+        self.assertEqual(len(self.requests), 1)
+
+    def test_expired_not_loaded(self):
+        """Test entries older than max_stale being ignored on load."""
+        with QuoteCache(self.path, fetch=self.fetch,
+                        write_behind=False) as cache:
+            cache.put(['AAPL'], [{'Name': 'Apple Inc.'}], ['Name'],
+                      updated=time.time() - 100)
+        with QuoteCache(self.path, max_stale=10, fetch=self.fetch) as cache:
+            self.assertEqual(cache.get('AAPL', ['Name']), None)
+
+    def test_stale_refresh(self):
+        """Test stale quotes being served and refreshed lazily."""
+        with QuoteCache(self.path, ttl=10, fetch=self.fetch) as cache:
+            cache.put(['AAPL'], [{'LastTradePriceOnly': '90.00'}],
+                      ['LastTradePriceOnly'], updated=time.time() - 60)
+            self.price = '96.00'
+            quotes = cache.request_quotes(['AAPL'], ['LastTradePriceOnly'])
+            self.assertEqual(quotes, [{'LastTradePriceOnly': '90.00'}])
+            for _ in range(100):
+                quote, age = cache.get('AAPL', ['LastTradePriceOnly'])
+                if age < 10:
+                    break
+                time.sleep(0.01)
+            self.assertEqual(quote, {'LastTradePriceOnly': '96.00'})
+
+    def test_close_joins_refresh(self):
+        """Test closing waiting for the running refreshes."""
+        started = threading.Event()
+        release = threading.Event()
+
+        def slow_fetch(tickers_list, selected_columns, timeout=None):
+            started.set()
+            release.wait(5)
+            return self.fetch(tickers_list, selected_columns, timeout)
+
+        cache = QuoteCache(self.path, ttl=10, fetch=slow_fetch)
+        cache.put(['AAPL'], [{'LastTradePriceOnly': '90.00'}],
+                  ['LastTradePriceOnly'], updated=time.time() - 60)
+        cache.request_quotes(['AAPL'], ['LastTradePriceOnly'])
+        self.assertTrue(started.wait(5))
+        closing = threading.Thread(target=cache.close)
+        closing.start()
+        closing.join(0.05)
+        self.assertTrue(closing.is_alive())
+        release.set()
+        closing.join(5)
+        self.assertFalse(closing.is_alive())
+        with QuoteCache(self.path, fetch=self.fetch) as cache:
+            quote, age = cache.get('AAPL', ['LastTradePriceOnly'])
+            self.assertTrue(age < 10)
+
+    def tearDown(self):
+        """Cleaning up."""
+        shutil.rmtree(self.folder)
+
+
+if __name__ == '__main__':
+    sys.exit(unittest.main())
@@ -0,0 +1,94 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+test_calendars
+----------------------------------
+
+Tests for `calendars` module.
+"""
+
+import datetime
+import sys
+import threading
+import unittest
+
+try:
+    from unittest import mock
+except ImportError:
+    import mock
+
+import rtstock.utils as utils
+from rtstock.calendars import TradingCalendar, get_calendar
+
+
+class TestNYSECalendar(unittest.TestCase):
+    """Tests for NYSECalendar class."""
+
+    def setUp(self):
+        """SetUp."""
+        self.calendar = get_calendar('NYSE')
+
+    def test_holidays(self):
+        """Test NYSE holidays of 2016."""
+        holidays = ['2016-01-01', '2016-01-18', '2016-02-15', '2016-03-25',
+                    '2016-05-30', '2016-07-04', '2016-09-05', '2016-11-24',
+                    '2016-12-26']
+        self.assertEqual(sorted(d.isoformat()
+                                for d in self.calendar.holidays(2016)),
+                         holidays)
+        self.assertEqual(len(self.calendar.sessions('2016-01-01',
+                                                    '2016-12-31')), 252)
+
+    def test_session_window(self):
+        """Test shrinking periods to their sessions."""
+        self.assertEqual(self.calendar.session_window('2016-03-25',
+                                                      '2016-03-27'), None)
+        self.assertEqual(self.calendar.session_window('2016-03-24',
+                                                      '2016-03-28'),
+                         ('2016-03-24', '2016-03-28'))
+        today = datetime.date(2016, 3, 2)
+        self.assertEqual(self.calendar.session_window('2016-03-01',
+                                                      '2016-03-10', today),
+                         ('2016-03-01', '2016-03-02'))
+
+    def test_custom_calendar(self):
+        """Test a calendar with custom holidays."""
+        calendar = TradingCalendar(holidays=['2016-03-01'])
+        self.assertFalse(calendar.is_session('2016-03-01'))
+        self.assertTrue(calendar.is_session('2016-03-02'))
+        self.assertFalse(calendar.is_session('2016-03-05'))
+
+    def test_concurrent_cover(self):
+        """Test threads extending the session index at the same time."""
+        calendar = TradingCalendar()
+        years = list(range(2000, 2020))
+        threads = [threading.Thread(target=calendar.sessions,
+                                    args=('{0}-01-01'.format(y),
+                                          '{0}-12-31'.format(y)))
+                   for y in years + years[::-1]]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        sessions = calendar.sessions('2000-01-01', '2019-12-31')
+        self.assertEqual(sessions, sorted(set(sessions)))
+        self.assertEqual(len(sessions), sum(
+            len(calendar.sessions('{0}-01-01'.format(y),
+                                  '{0}-12-31'.format(y))) for y in years))
+
+
+class TestRequestHistoricalCalendar(unittest.TestCase):
+    """Tests for request_historical using a calendar."""
+
+    def test_no_sessions(self):
+        """Test a period without sessions not reaching the network."""
+        with mock.patch.object(utils, 'urlopen') as urlopen:
+            response = utils.request_historical('AAPL', '2016-03-25',
+                                                '2016-03-27', calendar='NYSE')
+        self.assertEqual(response, [])
+        self.assertFalse(urlopen.called)
+
+
+if __name__ == '__main__':
+    sys.exit(unittest.main())
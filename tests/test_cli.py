@@ -0,0 +1,97 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+test_cli
+----------------------------------
+
+Tests for `cli` module.
+"""
+
+import io
+import json
+import sys
+import unittest
+
+try:
+    from unittest import mock
+except ImportError:
+    import mock
+
+import rtstock.cli as cli
+import rtstock.error as error
+
+
+def fake_isolated(tickers_list, selected_columns):
+    """Return one quote per ticker, failing for fake_ticker."""
+    quotes = [{'Symbol': t, 'Name': t + ' Inc.'}
+              for t in tickers_list if t != 'fake_ticker']
+    errors = {}
+    if 'fake_ticker' in tickers_list:
+        errors['fake_ticker'] = error.RequestError('Invalid ticker')
+    return quotes, errors
+
+
+class TestCli(unittest.TestCase):
+    """Tests for the command line interface."""
+
+    def test_read_tickers(self):
+        """Test reading and deduplicating tickers."""
+        stdin = io.StringIO('AAPL, YHOO\nGOOGL AAPL\n')
+        self.assertEqual(cli.read_tickers([], [], stdin),
+                         ['AAPL', 'YHOO', 'GOOGL'])
+        self.assertEqual(cli.read_tickers(['MSFT'], [], stdin), ['MSFT'])
+
+    def test_quotes_ndjson(self):
+        """Test quotes in fixed size batches as newline delimited JSON."""
+        stdout, stderr = io.StringIO(), io.StringIO()
+        with mock.patch.object(cli, 'request_quotes_isolated',
+                               side_effect=fake_isolated) as request:
+            status = cli.main(['quotes', 'AAPL', 'YHOO', 'fake_ticker',
+                               '-b', '2', '--columns', 'Name'],
+                              stdout=stdout, stderr=stderr)
+        self.assertEqual(status, 1)
+        self.assertEqual(request.call_count, 2)
+        self.assertEqual(request.call_args[0][1], ['Symbol', 'Name'])
+        lines = [json.loads(l) for l in stdout.getvalue().splitlines()]
+        self.assertEqual(sorted(q['Symbol'] for q in lines),
+                         ['AAPL', 'YHOO'])
+        self.assertIn('fake_ticker', stderr.getvalue())
+
+    def test_quotes_adaptive(self):
+        """Test quotes in batches chosen by request_quotes_batched."""
+        stdout, stderr = io.StringIO(), io.StringIO()
+        tickers_list = ['T{0}'.format(i) for i in range(5)]
+        with mock.patch.object(cli, 'request_quotes_isolated',
+                               side_effect=fake_isolated) as request, \
+                mock.patch.object(cli, 'request_quotes_batched',
+                                  wraps=cli.request_quotes_batched) as batched:
+            status = cli.main(['quotes'] + tickers_list, stdout=stdout,
+                              stderr=stderr)
+        self.assertEqual(status, 0)
+        self.assertEqual(batched.call_count, 1)
+        self.assertEqual(request.call_count, 1)
+        lines = [json.loads(l) for l in stdout.getvalue().splitlines()]
+        self.assertEqual([q['Symbol'] for q in lines], tickers_list)
+
+    def test_history_csv(self):
+        """Test historical data as CSV."""
+        def fake_iter(ticker, start, end):
+            return iter([{'Date': '2016-01-04', 'Open': '1', 'High': '2',
+                          'Low': '1', 'Close': '2', 'Volume': '10',
+                          'Adj_Close': '2'}])
+
+        stdout = io.StringIO()
+        with mock.patch.object(cli, 'iter_historical', side_effect=fake_iter):
+            status = cli.main(['history', 'AAPL', '--format', 'csv',
+                               '--start', '2016-01-01',
+                               '--end', '2016-01-05'], stdout=stdout)
+        self.assertEqual(status, 0)
+        lines = stdout.getvalue().splitlines()
+        self.assertEqual(lines[0], 'Symbol,Date,Open,High,Low,Close,Volume,'
+                                   'Adj_Close')
+        self.assertEqual(lines[1], 'AAPL,2016-01-04,1,2,1,2,10,2')
+
+
+if __name__ == '__main__':
+    sys.exit(unittest.main())
@@ -0,0 +1,82 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+test_decoding
+----------------------------------
+
+Tests for `decoding` module.
+"""
+
+import json
+import math
+import sys
+import unittest
+
+from rtstock import decoding
+from rtstock.providers import YQLProvider
+from rtstock.utils import to_float
+
+
+class TestDecoding(unittest.TestCase):
+    """Tests for decoding module."""
+
+    def setUp(self):
+        """SetUp."""
+        self.name = decoding.decoder_name()
+        self.quotes = [{'Symbol': 'AAPL', 'Bid': '95.60', 'Ask': '95.70'},
+                       {'Symbol': 'YHOO', 'Bid': None, 'Ask': '36.50'}]
+        self.body = json.dumps({'query': {'results': {
+            'quote': self.quotes}}}).encode('utf-8')
+
+    def test_decoders(self):
+        """Test every installed decoder giving the same result."""
+        self.assertIn(self.name, decoding.DECODERS)
+        for name in decoding.DECODERS:
+            try:
+                decoding.use_decoder(name)
+            except ImportError:
+                continue
+            self.assertEqual(decoding.decoder_name(), name)
+            self.assertEqual(decoding.loads(self.body)['query']['results'],
+                             {'quote': self.quotes})
+        with self.assertRaises(ValueError):
+            decoding.use_decoder('fake_decoder')
+
+    def test_extractor(self):
+        """Test extracting and converting columns."""
+        extract = decoding.Extractor(['Symbol', 'Bid'], {'Bid': to_float})
+        rows = extract(self.quotes)
+        self.assertEqual(rows[0], ('AAPL', 95.6))
+        self.assertTrue(math.isnan(rows[1][1]))
+        # Missing fields
+        self.assertEqual(decoding.Extractor(['Name'])(self.quotes),
+                         [(None,), (None,)])
+
+    def test_extract(self):
+        """Test extracting the items of a path."""
+        path = ['query', 'results', 'quote']
+        self.assertEqual(decoding.extract(self.body, path, ['Ask']),
+                         [('95.70',), ('36.50',)])
+        single = json.dumps({'query': {'results': {
+            'quote': self.quotes[0]}}})
+        self.assertEqual(decoding.extract(single, path, ['Symbol']),
+                         [('AAPL',)])
+        empty = '{"query": {"count": 0, "results": null}}'
+        self.assertEqual(decoding.extract(empty, path, ['Symbol']), [])
+
+    def test_provider(self):
+        """Test requesting values from a provider."""
+        provider = YQLProvider(lambda url, **kwargs: self.body)
+        self.assertEqual(provider.request_values(['AAPL', 'YHOO'],
+                                                 ['Symbol', 'Ask'],
+                                                 {'Ask': to_float}),
+                         [('AAPL', 95.7), ('YHOO', 36.5)])
+
+    def tearDown(self):
+        """Cleaning up."""
+        decoding.use_decoder(self.name)
+
+
+if __name__ == '__main__':
+    sys.exit(unittest.main())
@@ -0,0 +1,110 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+test_export
+----------------------------------
+
+Tests for `export` module.
+"""
+
+import math
+import sys
+import unittest
+
+from rtstock import export
+
+try:
+    import pandas
+except ImportError:
+    pandas = None
+
+try:
+    import pyarrow
+except ImportError:
+    pyarrow = None
+
+
+class TestExport(unittest.TestCase):
+    """Tests for export functions."""
+
+    def setUp(self):
+        """SetUp."""
+        self.rows = [
+            {'Date': '2016-03-02', 'Open': '100.510002', 'High': '100.889999',
+             'Low': '99.639999', 'Close': '100.75', 'Volume': '33169600',
+             'Adj_Close': '100.140301'},
+            {'Date': '2016-03-01', 'Open': '97.650002', 'High': '100.769997',
+             'Low': '97.419998', 'Close': '100.529999', 'Volume': '50407100',
+             'Adj_Close': '99.921631'},
+        ]
+        self.quotes = [
+            {'Symbol': 'AAPL', 'LastTradePriceOnly': '95.89', 'PERatio': '10'},
+            {'Symbol': 'YHOO', 'LastTradePriceOnly': '36.35',
+             'PERatio': None},
+        ]
+
+    def test_historical_columns(self):
+        """Test laying out rows and chunks in the same columns."""
+        columns = export.historical_columns(self.rows)
+        self.assertEqual(list(columns['Date']), [16862, 16861])
+        self.assertEqual(list(columns['Volume']), [33169600, 50407100])
+        chunk = dict((c, [r[c] for r in self.rows]) for c in self.rows[0])
+        self.assertEqual(export.historical_columns([chunk]), columns)
+        self.assertTrue(export.historical_columns(columns) is columns)
+
+    @unittest.skipIf(pandas is None, 'pandas is not installed')
+    def test_historical_to_pandas(self):
+        """Test converting rows to a DataFrame."""
+        frame = export.historical_to_pandas(self.rows)
+        self.assertTrue(str(frame['Date'].dtype).startswith('datetime64'))
+        self.assertEqual(str(frame['Date'][0].date()), '2016-03-02')
+        self.assertEqual(frame['Volume'].dtype, 'int64')
+        self.assertEqual(frame['Close'][1], 100.529999)
+
+    @unittest.skipIf(pyarrow is None, 'pyarrow is not installed')
+    def test_historical_to_arrow(self):
+        """Test converting rows to an Arrow table."""
+        table = export.historical_to_arrow(self.rows)
+        self.assertEqual(str(table.schema.field('Date').type), 'date32[day]')
+        self.assertEqual(table.column('Date')[0].as_py().isoformat(),
+                         '2016-03-02')
+        self.assertEqual(table.column('Volume').to_pylist(),
+                         [33169600, 50407100])
+
+    def test_missing_volumes(self):
+        """Test laying out rows without volumes."""
+        self.rows[1]['Volume'] = 'null'
+        columns = export.historical_columns(self.rows)
+        self.assertEqual(list(columns['Volume']),
+                         [33169600, export.MISSING_VOLUME])
+        if pandas is not None:
+            frame = export.historical_to_pandas(self.rows)
+            self.assertEqual(str(frame['Volume'].dtype), 'Int64')
+            self.assertEqual(frame['Volume'][0], 33169600)
+            self.assertTrue(frame['Volume'].isna()[1])
+        if pyarrow is not None:
+            table = export.historical_to_arrow(self.rows)
+            self.assertEqual(table.column('Volume').to_pylist(),
+                             [33169600, None])
+
+    @unittest.skipIf(pandas is None, 'pandas is not installed')
+    def test_quotes_to_pandas(self):
+        """Test converting quotes to a DataFrame."""
+        frame = export.quotes_to_pandas(self.quotes)
+        self.assertEqual(list(frame.columns), ['LastTradePriceOnly',
+                                               'PERatio'])
+        self.assertEqual(frame.loc['AAPL', 'LastTradePriceOnly'], 95.89)
+        self.assertTrue(math.isnan(frame.loc['YHOO', 'PERatio']))
+
+    @unittest.skipIf(pyarrow is None, 'pyarrow is not installed')
+    def test_quotes_to_arrow(self):
+        """Test converting quotes to an Arrow table."""
+        table = export.quotes_to_arrow(self.quotes, ['LastTradePriceOnly'])
+        self.assertEqual(table.column('Symbol').to_pylist(), ['AAPL', 'YHOO'])
+        self.assertEqual(table.column('LastTradePriceOnly').to_pylist(),
+                         [95.89, 36.35])
+
+
+if __name__ == '__main__':
+    sys.exit(unittest.main())
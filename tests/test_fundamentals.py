@@ -0,0 +1,98 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+test_fundamentals
+----------------------------------
+
+Tests for `fundamentals` module.
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+from rtstock.fundamentals import FundamentalsStore
+
+
+class TestFundamentalsStore(unittest.TestCase):
+    """Tests for FundamentalsStore class."""
+
+    def setUp(self):
+        """SetUp."""
+        self.output_folder = tempfile.mkdtemp()
+        self.path = os.path.join(self.output_folder, 'fundamentals.db')
+        self.store = FundamentalsStore(self.path)
+        self.store.record_many({
+            'AAPL': {'Symbol': 'AAPL', 'PERatio': '10.82', 'Bid': '95.60'},
+            'YHOO': {'Symbol': 'YHOO', 'PERatio': None, 'Bid': '36.49'},
+        }, ts=100)
+
+    def test_deltas(self):
+        """Test writing only the changed fields."""
+        changes = self.store.record('AAPL', {'Symbol': 'AAPL',
+                                             'PERatio': '10.82',
+                                             'Bid': '95.70'}, ts=200)
+        self.assertEqual(changes, 1)
+        # Removed fields are recorded too
+        self.assertEqual(self.store.record('AAPL', {'Symbol': 'AAPL',
+                                                    'Bid': '95.70'}, ts=300),
+                         1)
+        self.assertEqual(self.store.history('AAPL', 'PERatio'),
+                         [(100, '10.82'), (300, None)])
+        self.assertEqual(self.store.history('AAPL', 'Unknown'), [])
+
+    def test_as_of(self):
+        """Test rebuilding the information as of a time."""
+        self.store.record('AAPL', {'Symbol': 'AAPL', 'Bid': '95.70'}, ts=200)
+        self.assertEqual(self.store.as_of('AAPL', 50), {})
+        self.assertEqual(self.store.as_of('AAPL', 150),
+                         {'Symbol': 'AAPL', 'PERatio': '10.82',
+                          'Bid': '95.60'})
+        self.assertEqual(self.store.as_of('AAPL', 200),
+                         {'Symbol': 'AAPL', 'Bid': '95.70'})
+        self.assertEqual(
+            self.store.as_of_many(['AAPL', 'YHOO', 'GOOGL'], 250,
+                                  ['PERatio', 'Bid']),
+            {'AAPL': {'PERatio': None, 'Bid': '95.70'},
+             'YHOO': {'PERatio': None, 'Bid': '36.49'}})
+
+    def test_many_tickers(self):
+        """Test bulk as-of queries beyond the SQLite parameter limit."""
+        tickers = ['T{0}'.format(i) for i in range(2000)]
+        self.store.record_many(dict((t, {'Bid': t}) for t in tickers),
+                               ts=100)
+        result = self.store.as_of_many(tickers, 100)
+        self.assertEqual(len(result), 2000)
+        self.assertEqual(result['T1999'], {'Bid': 'T1999'})
+
+    def test_many_fields(self):
+        """Test as-of queries of more fields than the parameter limit."""
+        fields = ['F{0}'.format(i) for i in range(1000)]
+        self.store.record('AAPL', dict((f, f) for f in fields), ts=200)
+        result = self.store.as_of_many(['AAPL', 'YHOO'], 200, fields)
+        self.assertEqual(result['AAPL']['F999'], 'F999')
+        self.assertEqual(len(result['AAPL']), 1000)
+        self.assertNotIn('YHOO', result)
+
+    def test_reopen(self):
+        """Test keeping deltas against the stored values after reopening."""
+        self.store.close()
+        self.store = FundamentalsStore(self.path)
+        self.assertEqual(self.store.tickers(), ['AAPL', 'YHOO'])
+        self.assertEqual(self.store.record('YHOO', {'Symbol': 'YHOO',
+                                                    'Bid': '36.49'}, ts=200),
+                         0)
+        with self.assertRaises(ValueError):
+            self.store.record('AAPL', {'Bid': '1'}, ts=50)
+
+    def tearDown(self):
+        """Cleaning up."""
+        self.store.close()
+        shutil.rmtree(self.output_folder)
+
+
+if __name__ == '__main__':
+    sys.exit(unittest.main())
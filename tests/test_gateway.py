@@ -0,0 +1,145 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+test_gateway
+----------------------------------
+
+Tests for `gateway` module.
+"""
+
+import json
+import sys
+import threading
+import unittest
+
+try:
+    from urllib.request import urlopen
+except ImportError:
+    from urllib2 import urlopen
+
+import rtstock.error as error
+import rtstock.utils as utils
+from rtstock.gateway import QuoteGateway
+from rtstock.providers import GatewayProvider
+
+
+class FakeFetch(object):
+    """Quotes source returning an increasing price on every poll."""
+
+    def __init__(self):
+        """Instantiate FakeFetch class."""
+        self.calls = []
+
+    def __call__(self, tickers_list, selected_columns):
+        """Poll the quotes."""
+        self.calls.append(tickers_list)
+        quotes = [{'Symbol': t, 'Name': t + ' Inc.',
+                   'LastTradePriceOnly': str(len(self.calls))}
+                  for t in tickers_list if t not in ('fake_ticker', 'DOWN')]
+        errors = {}
+        if 'fake_ticker' in tickers_list:
+            errors['fake_ticker'] = error.RequestError('Unable to process.')
+        if 'DOWN' in tickers_list:
+            errors['DOWN'] = error.ProviderError('No provider answered.')
+        return quotes, errors
+
+
+class TestQuoteGateway(unittest.TestCase):
+    """Tests for QuoteGateway class."""
+
+    def setUp(self):
+        """SetUp."""
+        self.fetch = FakeFetch()
+        self.gateway = QuoteGateway(interval=3600, fetch=self.fetch)
+        server = self.gateway.bind('localhost', 0)
+        self.url = 'http://localhost:{0}'.format(server.server_address[1])
+        thread = threading.Thread(target=server.serve_forever)
+        thread.daemon = True
+        thread.start()
+        utils.use_gateway(self.url)
+
+    def test_request_quotes(self):
+        """Test request_quotes through the gateway."""
+        response = utils.request_quotes(['AAPL', 'YHOO'], ['Name'])
+        self.assertEqual(response, [{'Name': 'AAPL Inc.'},
+                                    {'Name': 'YHOO Inc.'}])
+        # Cached tickers are not requested upstream again
+        utils.request_quotes(['AAPL'], ['Name'])
+        self.assertEqual(self.fetch.calls, [['AAPL', 'YHOO']])
+        with self.assertRaises(error.RequestError):
+            utils.request_quotes(['fake_ticker'], ['Name'])
+
+    def test_provider_errors(self):
+        """Test the gateway provider failing on tickers without quotes."""
+        provider = GatewayProvider(
+            lambda url, timeout=None: urlopen(url).read(), self.url)
+        self.assertEqual(provider.request_quotes(['AAPL'], ['Name']),
+                         [{'Name': 'AAPL Inc.'}])
+        with self.assertRaises(error.RequestError):
+            provider.request_quotes(['AAPL', 'fake_ticker'], ['Name'])
+        # Outages upstream fail the provider, so the request fails over
+        with self.assertRaises(IOError):
+            provider.request_quotes(['AAPL', 'DOWN'], ['Name'])
+
+    def test_slow_upstream(self):
+        """Test snapshots of known tickers not waiting for new ones."""
+        self.gateway.snapshot(['AAPL'])
+        started = threading.Event()
+        release = threading.Event()
+
+        def slow_fetch(tickers_list, selected_columns):
+            started.set()
+            release.wait(5)
+            return self.fetch(tickers_list, selected_columns)
+
+        self.gateway._QuoteGateway__fetch = slow_fetch
+        thread = threading.Thread(target=self.gateway.snapshot,
+                                  args=(['YHOO'],))
+        thread.start()
+        self.assertTrue(started.wait(5))
+        quotes, errors = self.gateway.snapshot(['AAPL'], ['Name'])
+        self.assertEqual(quotes, [{'Name': 'AAPL Inc.'}])
+        release.set()
+        thread.join(5)
+        # Waits for the fetch already running instead of starting another
+        quotes, errors = self.gateway.snapshot(['YHOO'], ['Name'])
+        self.assertEqual(quotes, [{'Name': 'YHOO Inc.'}])
+        self.assertEqual(self.fetch.calls, [['AAPL'], ['YHOO']])
+
+    def test_forget(self):
+        """Test tickers no client asks for anymore not being polled."""
+        gateway = QuoteGateway(interval=3600, fetch=self.fetch,
+                               max_tickers=2)
+        gateway.snapshot(['AAPL', 'YHOO'])
+        gateway.snapshot(['GOOGL'])
+        gateway.snapshot(['YHOO'])
+        gateway.poll()
+        self.assertEqual(sorted(self.fetch.calls[-1]), ['GOOGL', 'YHOO'])
+        gateway.idle = -1
+        gateway.poll()
+        self.assertEqual(len(self.fetch.calls), 3)
+        self.assertEqual(gateway.snapshot(['AAPL'], ['Name'])[0],
+                         [{'Name': 'AAPL Inc.'}])
+        self.assertEqual(self.fetch.calls[-1], ['AAPL'])
+
+    def test_stream(self):
+        """Test streaming the changes of a ticker."""
+        response = urlopen(self.url + '/stream?tickers=AAPL')
+        first = json.loads(response.readline().decode('utf-8'))
+        self.assertEqual(first['LastTradePriceOnly'], '1')
+        self.assertEqual(first['Name'], 'AAPL Inc.')
+        self.gateway.poll()
+        delta = json.loads(response.readline().decode('utf-8'))
+        self.assertEqual(delta, {'Symbol': 'AAPL',
+                                 'LastTradePriceOnly': '2'})
+        response.close()
+
+    def tearDown(self):
+        """Cleaning up."""
+        utils.use_gateway(None)
+        self.gateway.stop()
+
+
+if __name__ == '__main__':
+    sys.exit(unittest.main())
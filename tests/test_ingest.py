@@ -0,0 +1,92 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+test_ingest
+----------------------------------
+
+Tests for `ingest` module.
+"""
+
+import array
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+try:
+    from unittest import mock
+except ImportError:
+    import mock
+
+import rtstock.ingest as ingest
+from rtstock.ingest import (ingest_folder, parse_history, read_store,
+                            write_store)
+
+
+class TestIngest(unittest.TestCase):
+    """Tests for ingest functions."""
+
+    def setUp(self):
+        """SetUp."""
+        self.folder = tempfile.mkdtemp()
+        for ticker, close in [('AAPL', '100.75'), ('YHOO', '36.35'),
+                              ('BRK-A', '214000')]:
+            with open(os.path.join(self.folder, ticker + '.csv'), 'w') as f:
+                f.write('Date,Open,High,Low,Close,Volume,Adj Close\n')
+                f.write('2016-03-02,1.5,2.5,0.5,{0},33169600,{0}\n'
+                        .format(close))
+                f.write('2016-03-01,1,2,0.5,1.25,50407100,1.2\n')
+
+    def test_parse_history(self):
+        """Test parsing a file into typed columns."""
+        columns = parse_history(os.path.join(self.folder, 'AAPL.csv'))
+        self.assertEqual(columns['Date'], array.array('i', [16862, 16861]))
+        self.assertEqual(columns['Close'], array.array('d', [100.75, 1.25]))
+        self.assertEqual(columns['Volume'],
+                         array.array('q', [33169600, 50407100]))
+
+    def test_invalid_file(self):
+        """Test parsing a file with another layout."""
+        path = os.path.join(self.folder, 'other.txt')
+        with open(path, 'w') as f:
+            f.write('Date,Close\n2016-03-02,1\n')
+        with self.assertRaises(ValueError):
+            parse_history(path)
+
+    def test_ingest_folder(self):
+        """Test ingesting a folder in parallel and storing it."""
+        store = os.path.join(self.folder, 'history.rth')
+        history = ingest_folder(self.folder, workers=2, output=store)
+        self.assertEqual(sorted(history), ['AAPL', 'BRK-A', 'YHOO'])
+        self.assertEqual(history['BRK-A']['Close'][0], 214000.0)
+        self.assertEqual(ingest_folder(self.folder, workers=1), history)
+        self.assertEqual(read_store(store), history)
+
+    def test_empty_store(self):
+        """Test storing a ticker without rows."""
+        store = os.path.join(self.folder, 'empty.rth')
+        history = {'AAPL': parse_history(os.path.join(self.folder,
+                                                      'AAPL.csv')),
+                   'NONE': dict((c, array.array(a.typecode)) for c, a in
+                                parse_history(os.path.join(
+                                    self.folder, 'AAPL.csv')).items())}
+        write_store(store, history)
+        self.assertEqual(read_store(store), history)
+
+    def test_unsupported(self):
+        """Test failing clearly without 64 bits integer arrays."""
+        with mock.patch.object(ingest.array, 'typecodes', 'bBuhHiIlLfd'):
+            with self.assertRaises(ImportError):
+                ingest_folder(self.folder)
+            with self.assertRaises(ImportError):
+                read_store(os.path.join(self.folder, 'history.rth'))
+
+    def tearDown(self):
+        """Cleaning up."""
+        shutil.rmtree(self.folder)
+
+
+if __name__ == '__main__':
+    sys.exit(unittest.main())
@@ -0,0 +1,114 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+test_journal
+----------------------------------
+
+Tests for `journal` module.
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+try:
+    from unittest import mock
+except ImportError:
+    import mock
+
+import rtstock.journal as journal
+from rtstock.journal import (RECORD, JournalIndex, TickJournal,
+                             read_journal, read_journals)
+
+
+class TestTickJournal(unittest.TestCase):
+    """Tests for TickJournal class and its readers."""
+
+    def setUp(self):
+        """SetUp."""
+        self.folder = tempfile.mkdtemp()
+        # 2016-03-01 14:30 UTC, with a tick every 30 seconds
+        self.start = 1456842600.0
+        self.ticks = []
+        for i in range(200):
+            ticker = ['AAPL', 'YHOO', 'BRK-A'][i % 3]
+            price = {'AAPL': 100.0, 'YHOO': 35.0, 'BRK-A': 214000.0}[ticker]
+            self.ticks.append((self.start + 30 * i, ticker,
+                               price + 0.01 * i, 1000 * i))
+
+    def write(self, **kwargs):
+        """Write the ticks to a journal."""
+        with TickJournal(self.folder, **kwargs) as journal:
+            for timestamp, ticker, price, volume in self.ticks:
+                journal.record(ticker, price, volume, timestamp)
+        return sorted(os.listdir(self.folder))
+
+    def assertTicksEqual(self, first, second):
+        """Compare ticks, rounding floating point times and prices."""
+        def rounded(ticks):
+            return [(round(t, 6), n, round(p, 4), v) for t, n, p, v in ticks]
+        self.assertEqual(rounded(first), rounded(second))
+
+    def test_roundtrip(self):
+        """Test reading back the recorded ticks."""
+        names = self.write(checkpoint=50)
+        self.assertEqual(names, ['20160301-0000.rtj'])
+        self.assertTicksEqual(
+            list(read_journal(os.path.join(self.folder, names[0]))),
+            self.ticks)
+
+    def test_fixed_width(self):
+        """Test every record having the same width."""
+        names = self.write()
+        size = os.path.getsize(os.path.join(self.folder, names[0]))
+        self.assertEqual((size - 8) % RECORD.size, 0)
+        # One tick per update plus a few declarations
+        self.assertTrue(size < 8 + RECORD.size * (len(self.ticks) + 10))
+
+    def test_rotation(self):
+        """Test rotating files by size and by day."""
+        self.ticks.append((self.start + 86400, 'AAPL', 101.0, 0))
+        names = self.write(max_bytes=2048)
+        self.assertTrue(len(names) > 2)
+        self.assertEqual(names[-1], '20160302-0000.rtj')
+        self.assertTicksEqual(list(read_journals(self.folder)), self.ticks)
+
+    def test_index(self):
+        """Test reading a time range through the index."""
+        self.write(max_bytes=2048, checkpoint=16)
+        index = JournalIndex(self.folder)
+        start = self.start + 30 * 57
+        end = self.start + 30 * 143
+        self.assertTicksEqual(list(index.read(start, end)),
+                              self.ticks[57:143])
+        self.assertTicksEqual(list(index.read()), self.ticks)
+
+    def test_record_quotes(self):
+        """Test recording quotes as returned by request_quotes."""
+        with TickJournal(self.folder) as journal:
+            journal.record_quotes([
+                {'Symbol': 'AAPL', 'LastTradePriceOnly': '95.89',
+                 'Volume': '33169600'},
+                {'Symbol': 'fake_ticker', 'LastTradePriceOnly': None},
+            ], timestamp=self.start)
+        self.assertTicksEqual(list(read_journals(self.folder)),
+                              [(self.start, 'AAPL', 95.89, 33169600)])
+
+    def test_unsupported(self):
+        """Test failing clearly where records cannot be bulk unpacked."""
+        with mock.patch.object(journal, 'RECORD', object()):
+            with self.assertRaises(ImportError):
+                TickJournal(self.folder)
+            with self.assertRaises(ImportError):
+                JournalIndex(self.folder)
+
+    def tearDown(self):
+        """Cleaning up."""
+        shutil.rmtree(self.folder)
+
+
+if __name__ == '__main__':
+    sys.exit(unittest.main())
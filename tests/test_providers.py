@@ -0,0 +1,254 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+test_providers
+----------------------------------
+
+Tests for `providers` module.
+"""
+
+import json
+import sys
+import time
+import unittest
+
+import rtstock.error as error
+from rtstock.providers import (GatewayProvider, normalize_quote, Provider,
+                               ProviderRouter, YahooProvider, YQLProvider)
+
+
+class FakeProvider(Provider):
+    """Provider answering quotes after a fixed delay, or failing."""
+
+    def __init__(self, name, fail=False, preferred=False):
+        """Instantiate FakeProvider class."""
+        super(FakeProvider, self).__init__(None)
+        self.name = name
+        self.fail = fail
+        self.preferred = preferred
+        self.calls = 0
+
+    def request_quotes(self, tickers_list, selected_columns):
+        """Request recent quotes."""
+        self.calls += 1
+        if self.fail:
+            raise IOError('connection refused')
+        if 'fake_ticker' in tickers_list:
+            raise error.RequestError('Invalid ticker')
+        return [{'Symbol': t, 'Provider': self.name} for t in tickers_list]
+
+
+class TestProviderRouter(unittest.TestCase):
+    """Tests for ProviderRouter class."""
+
+    def test_failover(self):
+        """Test failing over to the next provider."""
+        down = FakeProvider('down', fail=True)
+        up = FakeProvider('up')
+        router = ProviderRouter([down, up])
+        quotes = router.call('request_quotes', ['AAPL'], ['*'])
+        self.assertEqual(quotes[0]['Provider'], 'up')
+        stats = router.stats()
+        self.assertFalse(stats['down']['healthy'])
+        self.assertEqual(stats['down']['last_error'], 'connection refused')
+        self.assertTrue(stats['up']['healthy'])
+        # Unhealthy providers go last
+        self.assertEqual(router.ranked(), [up, down])
+        router.call('request_quotes', ['AAPL'], ['*'])
+        self.assertEqual(down.calls, 1)
+
+    def test_all_failing(self):
+        """Test every provider failing."""
+        router = ProviderRouter([FakeProvider('a', fail=True),
+                                 FakeProvider('b', fail=True)])
+        with self.assertRaises(error.ProviderError) as context:
+            router.call('request_quotes', ['AAPL'], ['*'])
+        self.assertEqual(sorted(context.exception.errors), ['a', 'b'])
+        # Unhealthy providers are still tried as a last resort
+        with self.assertRaises(error.ProviderError):
+            router.call('request_quotes', ['AAPL'], ['*'])
+        self.assertEqual(router.stats()['a']['failures'], 2)
+
+    def test_request_error(self):
+        """Test negative answers not failing over."""
+        first = FakeProvider('first')
+        second = FakeProvider('second')
+        router = ProviderRouter([first, second])
+        with self.assertRaises(error.RequestError):
+            router.call('request_quotes', ['fake_ticker'], ['*'])
+        self.assertEqual(second.calls, 0)
+        self.assertTrue(router.stats()['first']['healthy'])
+
+    def test_latency_routing(self):
+        """Test routing to the fastest provider."""
+        slow = FakeProvider('slow')
+        fast = FakeProvider('fast')
+        gateway = FakeProvider('gateway', preferred=True)
+        router = ProviderRouter([slow, fast])
+        router.call('request_quotes', ['AAPL'], ['*'])
+        self.assertEqual(router.ranked()[0], fast)
+        router.providers = [slow, fast, gateway]
+        self.assertEqual(router.ranked()[0], gateway)
+        self.assertEqual(router.stats()['slow']['successes'], 1)
+
+    def test_deadline(self):
+        """Test passing the time left and failing once it has passed."""
+        class SlowProvider(FakeProvider):
+            def request_quotes(self, tickers_list, selected_columns,
+                               timeout=None):
+                self.timeout = timeout
+                raise IOError('timed out')
+
+        slow = SlowProvider('slow')
+        router = ProviderRouter([slow])
+        with self.assertRaises(error.ProviderError):
+            router.call('request_quotes', ['AAPL'], ['*'],
+                        deadline=time.time() + 10)
+        self.assertTrue(0 < slow.timeout <= 10)
+        with self.assertRaises(error.DeadlineError):
+            router.call('request_quotes', ['AAPL'], ['*'],
+                        deadline=time.time() - 1)
+
+    def test_not_implemented(self):
+        """Test skipping providers without the requested method."""
+        router = ProviderRouter([FakeProvider('quotes')])
+        with self.assertRaises(error.ProviderError):
+            router.call('request_historical', 'AAPL', '2016-03-01',
+                        '2016-03-02')
+        self.assertTrue(router.stats()['quotes']['healthy'])
+
+    def test_iterate(self):
+        """Test failing over halfway through an iteration."""
+        class DaysProvider(FakeProvider):
+            def iter_historical(self, ticker, days, timeout=None):
+                self.calls += 1
+                for day in range(days, 0, -1):
+                    if self.fail and day < days:
+                        raise IOError('connection reset')
+                    yield {'Date': day}
+
+        broken = DaysProvider('broken', fail=True)
+        working = DaysProvider('working')
+        router = ProviderRouter([broken, working])
+        rows = router.iterate('iter_historical', 'AAPL', 3,
+                              resume=lambda args, row: (args[0],
+                                                        row['Date'] - 1))
+        self.assertEqual([r['Date'] for r in rows], [3, 2, 1])
+        self.assertEqual((broken.calls, working.calls), (1, 1))
+        self.assertFalse(router.stats()['broken']['healthy'])
+        with self.assertRaises(IOError):
+            list(ProviderRouter([broken]).iterate('iter_historical', 'AAPL',
+                                                  3))
+
+
+class TestProviders(unittest.TestCase):
+    """Tests for the YQL and Yahoo Finance providers."""
+
+    def test_yql(self):
+        """Test YQL requests and single results."""
+        urls = []
+
+        def fetch(url, **kwargs):
+            urls.append(url)
+            return json.dumps({'query': {'results': {'quote': {
+                'Symbol': 'AAPL'}}}}).encode('utf-8')
+
+        provider = YQLProvider(fetch)
+        self.assertEqual(provider.request_quotes(['AAPL'], ['Symbol']),
+                         [{'Symbol': 'AAPL'}])
+        self.assertIn('yahoo.finance.quotes', urls[0])
+
+    def test_quotes_url_length(self):
+        """Test the estimated lengths of quotes request URLs."""
+        urls = []
+
+        def fetch(url, **kwargs):
+            urls.append(url)
+            raise IOError('connection refused')
+
+        tickers_list = ['AAPL', 'BRK-B']
+        for provider in (YQLProvider(fetch), YahooProvider(fetch),
+                         GatewayProvider(fetch, 'http://localhost:8765')):
+            base, item_length = provider.quotes_url_length(['Symbol'])
+            with self.assertRaises(IOError):
+                provider.request_quotes(tickers_list, ['Symbol'])
+            length = base + sum(item_length(t) for t in tickers_list)
+            # Only the first ticker goes without a separator
+            self.assertTrue(0 <= length - len(urls[-1]) <= 6)
+
+    def test_normalize_quote(self):
+        """Test renaming Yahoo Finance fields."""
+        quote = normalize_quote({'symbol': 'AAPL', 'longName': 'Apple Inc.',
+                                 'shortName': 'Apple',
+                                 'regularMarketPrice': 95.6,
+                                 'regularMarketChangePercent': 1.254,
+                                 'regularMarketVolume': 1000,
+                                 'unknownField': 1})
+        self.assertEqual(quote, {'Symbol': 'AAPL', 'Name': 'Apple Inc.',
+                                 'LastTradePriceOnly': '95.6',
+                                 'ChangeinPercent': '+1.25%',
+                                 'Volume': '1000'})
+        self.assertEqual(normalize_quote({'symbol': 'AAPL'}, ['Name']),
+                         {'Name': None})
+
+    def test_yahoo_quotes(self):
+        """Test Yahoo Finance quotes in request order."""
+        def fetch(url, **kwargs):
+            return json.dumps({'quoteResponse': {'result': [
+                {'symbol': 'YHOO', 'regularMarketPrice': 36.5},
+                {'symbol': 'AAPL', 'regularMarketPrice': 95.6}]}}
+            ).encode('utf-8')
+
+        quotes = YahooProvider(fetch).request_quotes(
+            ['AAPL', 'YHOO', 'fake_ticker'], ['Symbol', 'LastTradePriceOnly'])
+        self.assertEqual(quotes, [
+            {'Symbol': 'AAPL', 'LastTradePriceOnly': '95.6'},
+            {'Symbol': 'YHOO', 'LastTradePriceOnly': '36.5'},
+            {'Symbol': 'fake_ticker', 'LastTradePriceOnly': None}])
+        # Symbols are matched whatever their case, keeping the requested one
+        quotes = YahooProvider(fetch).request_quotes(['aapl'], ['Symbol'])
+        self.assertEqual(quotes, [{'Symbol': 'aapl'}])
+        quotes = YahooProvider(fetch).request_quotes(
+            ['aapl'], ['LastTradePriceOnly'])
+        self.assertEqual(quotes, [{'LastTradePriceOnly': '95.6'}])
+
+    def test_yahoo_historical(self):
+        """Test Yahoo Finance chart rows, newest first."""
+        def fetch(url, **kwargs):
+            return json.dumps({'chart': {'result': [{
+                'timestamp': [1456756200, 1456842600, 1456929000],
+                'indicators': {
+                    'quote': [{'open': [None, 97.65, 100.51],
+                               'high': [None, 100.77, 100.89],
+                               'low': [None, 97.42, 99.64],
+                               'close': [None, 100.53, 100.75],
+                               'volume': [None, 50407100, 33169600]}],
+                    'adjclose': [{'adjclose': [None, 99.92, 100.14]}]}}]}}
+            ).encode('utf-8')
+
+        rows = YahooProvider(fetch).request_historical('AAPL', '2016-03-01',
+                                                       '2016-03-02')
+        self.assertEqual(rows[0], {'Date': '2016-03-02', 'Open': '100.51',
+                                   'High': '100.89', 'Low': '99.64',
+                                   'Close': '100.75', 'Volume': '33169600',
+                                   'Adj_Close': '100.14'})
+        self.assertEqual([r['Date'] for r in rows[1:]], ['2016-03-01'])
+
+    def test_yahoo_download(self):
+        """Test Yahoo Finance downloads in the legacy layout."""
+        def fetch(url, **kwargs):
+            return b'Date,Open,High,Low,Close,Adj Close,Volume\n' \
+                b'2016-02-29,null,null,null,null,null,null\n' \
+                b'2016-03-01,97.65,100.77,97.42,100.53,99.92,50407100\n' \
+                b'2016-03-02,100.51,100.89,99.64,100.75,100.14,33169600\n'
+
+        data = YahooProvider(fetch).download_historical('AAPL')
+        self.assertEqual(data.decode('ascii').splitlines(), [
+            'Date,Open,High,Low,Close,Volume,Adj Close',
+            '2016-03-02,100.51,100.89,99.64,100.75,33169600,100.14',
+            '2016-03-01,97.65,100.77,97.42,100.53,50407100,99.92'])
+
+
+if __name__ == '__main__':
+    sys.exit(unittest.main())
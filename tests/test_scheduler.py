@@ -0,0 +1,117 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+test_scheduler
+----------------------------------
+
+Tests for `scheduler` module.
+"""
+
+import sys
+import unittest
+
+import rtstock.error as error
+from rtstock.scheduler import PollingScheduler
+
+
+class TestPollingScheduler(unittest.TestCase):
+    """Tests for PollingScheduler class."""
+
+    def setUp(self):
+        """SetUp."""
+        self.batches = []
+
+        def fetch(tickers_list, selected_columns):
+            self.batches.append(tickers_list)
+            if 'fake_ticker' in tickers_list:
+                raise error.RequestError('Unable.')
+            return [{'Symbol': t} for t in tickers_list]
+
+        self.scheduler = PollingScheduler(budget=2, batch_size=3, fetch=fetch)
+        self.hot = ['AAPL', 'YHOO']
+        self.cold = ['C{0}'.format(i) for i in range(20)]
+        self.scheduler.add_many(self.hot, freshness=1, priority='hot')
+        self.scheduler.add_many(self.cold, freshness=60, priority='cold')
+
+    def test_budget(self):
+        """Test cycles never exceeding the request budget."""
+        for i in range(100):
+            self.scheduler.run_cycle(now=i * 0.5)
+        metrics = self.scheduler.metrics(now=50)
+        # 2 requests of burst plus 2 per second
+        self.assertTrue(metrics['requests'] <= 2 + 2 * 50)
+        self.assertTrue(metrics['budget_utilisation'] <= 1.0)
+        for batch in self.batches:
+            self.assertTrue(len(batch) <= 3)
+
+    def test_freshness(self):
+        """Test hot tickers kept within their target."""
+        for i in range(100):
+            self.scheduler.run_cycle(now=i * 0.5)
+        metrics = self.scheduler.metrics(now=49.5)
+        self.assertTrue(metrics['classes']['hot']['max_staleness'] <= 1.0)
+        self.assertTrue(metrics['classes']['cold']['max_staleness'] <= 60)
+        self.assertEqual(metrics['classes']['cold']['tickers'], 20)
+
+    def test_piggyback(self):
+        """Test spare room in a batch being filled with upcoming tickers."""
+        scheduler = PollingScheduler(budget=2, batch_size=3,
+                                     fetch=lambda t, c: [])
+        scheduler.add('AAPL', freshness=1)
+        scheduler.add_many(['C1', 'C2', 'C3'], freshness=60)
+        self.assertEqual(scheduler.plan(now=0), [['AAPL', 'C1', 'C2'],
+                                                 ['C3']])
+        scheduler.run_cycle(now=0)
+        scheduler.run_cycle(now=1)
+        # Only AAPL is due, the batch is completed with the next deadlines
+        self.assertEqual(scheduler.plan(now=2), [['AAPL', 'C3', 'C1']])
+
+    def test_errors(self):
+        """Test failing tickers being retried later."""
+        for ticker in self.hot + self.cold:
+            self.scheduler.remove(ticker)
+        self.scheduler.add('fake_ticker', freshness=1, priority='hot')
+        self.scheduler.run_cycle(now=0)
+        self.scheduler.run_cycle(now=0.5)
+        self.assertEqual(sum(b.count('fake_ticker') for b in self.batches), 1)
+        self.scheduler.run_cycle(now=2)
+        self.assertEqual(sum(b.count('fake_ticker') for b in self.batches), 2)
+        self.assertEqual(self.scheduler.metrics(now=2)['errors'], 2)
+
+    def test_split(self):
+        """Test failing batches split and paid one token per request."""
+        for ticker in self.hot + self.cold:
+            self.scheduler.remove(ticker)
+        self.scheduler.add_many(['AAPL', 'fake_ticker', 'YHOO'], freshness=1)
+        quotes = self.scheduler.run_cycle(now=0)
+        self.assertEqual(self.batches, [['AAPL', 'YHOO', 'fake_ticker'],
+                                        ['AAPL']])
+        self.assertEqual(quotes, [{'Symbol': 'AAPL'}])
+        self.assertEqual(self.scheduler.metrics(now=0)['requests'], 2)
+        # The other half waits for the tokens of the next cycle
+        self.assertEqual(self.scheduler.plan(now=0.5),
+                         [['YHOO', 'fake_ticker', 'AAPL']])
+
+    def test_priorities(self):
+        """Test priority classes taken before earlier deadlines."""
+        scheduler = PollingScheduler(budget=1, batch_size=1,
+                                     fetch=lambda t, c: [],
+                                     priorities=['hot', 'cold'])
+        scheduler.add('C1', freshness=1, priority='cold')
+        scheduler.add('H1', freshness=60, priority='hot')
+        self.assertEqual(scheduler.plan(now=0), [['H1']])
+        # Without priorities, tighter freshness targets go first
+        scheduler.priorities = []
+        self.assertEqual(scheduler.plan(now=0), [['C1']])
+
+    def test_remove(self):
+        """Test removed tickers not being polled."""
+        self.scheduler.remove('AAPL')
+        for i in range(10):
+            self.scheduler.run_cycle(now=i)
+        self.assertFalse(any('AAPL' in b for b in self.batches))
+
+
+if __name__ == '__main__':
+    sys.exit(unittest.main())
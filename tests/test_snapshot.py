@@ -0,0 +1,91 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+test_snapshot
+----------------------------------
+
+Tests for `snapshot` module.
+"""
+
+import math
+import sys
+import unittest
+
+try:
+    from unittest import mock
+except ImportError:
+    import mock
+
+import rtstock.error as error
+import rtstock.snapshot as snapshot
+import rtstock.utils as utils
+
+
+@unittest.skipIf(snapshot.np is None, 'NumPy is not installed')
+class TestSnapshot(unittest.TestCase):
+    """Tests for snapshot function."""
+
+    def setUp(self):
+        """SetUp."""
+        self.tickers_list = ['AAPL', 'YHOO', 'fake_ticker']
+        self.fields = ['LastTradePriceOnly', 'MarketCapitalization']
+        self.quotes = [
+            {'Symbol': 'YHOO', 'LastTradePriceOnly': '36.35',
+             'MarketCapitalization': '34.5B'},
+            {'Symbol': 'AAPL', 'LastTradePriceOnly': '95.89',
+             'MarketCapitalization': None},
+        ]
+
+    def test_snapshot(self):
+        """Test snapshot building the matrix."""
+        errors = {'fake_ticker': error.RequestError('Invalid ticker')}
+        with mock.patch.object(snapshot, 'request_quote_values',
+                               side_effect=errors['fake_ticker']), \
+                mock.patch.object(snapshot, 'request_quotes_isolated',
+                                  return_value=(self.quotes, errors)):
+            snap, snap_errors = snapshot.snapshot(self.tickers_list,
+                                                  self.fields)
+        self.assertEqual(snap_errors, errors)
+        self.assertEqual(snap.values.shape, (3, 2))
+        self.assertEqual(snap.values.dtype, snapshot.np.float64)
+        self.assertEqual(snap.row('YHOO')[1], 34.5e9)
+        self.assertEqual(snap.column('LastTradePriceOnly')[0], 95.89)
+        self.assertTrue(math.isnan(snap.row('AAPL')[1]))
+        self.assertTrue(snapshot.np.isnan(snap.row('fake_ticker')).all())
+
+    def test_values(self):
+        """Test snapshot decoding values straight into the matrix."""
+        rows = [('YHOO', 36.35, 34.5e9), ('AAPL', 95.89, float('nan'))]
+        with mock.patch.object(snapshot, 'request_quote_values',
+                               return_value=rows) as request, \
+                mock.patch.object(snapshot,
+                                  'request_quotes_isolated') as isolated:
+            snap, snap_errors = snapshot.snapshot(self.tickers_list[:2],
+                                                  self.fields)
+        args = request.call_args[0]
+        self.assertEqual(args[1], ['Symbol'] + self.fields)
+        self.assertEqual(sorted(args[2]), sorted(self.fields))
+        self.assertFalse(isolated.called)
+        self.assertEqual(snap_errors, {})
+        self.assertEqual(snap.row('YHOO').tolist(), [36.35, 34.5e9])
+        self.assertEqual(snap.row('AAPL')[0], 95.89)
+        snap.fill_values([('fake_ticker', 1.0, 2.0)])
+        self.assertEqual(snap.row('YHOO')[0], 36.35)
+
+
+class TestToFloat(unittest.TestCase):
+    """Tests for to_float function."""
+
+    def test_conversion(self):
+        """Test converting YQL fields."""
+        self.assertEqual(utils.to_float('95.89'), 95.89)
+        self.assertEqual(utils.to_float('+1.25%'), 1.25)
+        self.assertEqual(utils.to_float('1.5M'), 1.5e6)
+        self.assertTrue(math.isnan(utils.to_float('N/A')))
+        self.assertTrue(math.isnan(utils.to_float(None)))
+        self.assertTrue(math.isnan(utils.to_float('94.10 - 96.30')))
+
+
+if __name__ == '__main__':
+    sys.exit(unittest.main())
@@ -10,6 +10,7 @@ Tests for `rtstock` module.
 
 
 import os
+import pickle
 import sys
 import unittest
 
@@ -187,5 +188,32 @@ class TestStockGetHistorical(unittest.TestCase):
             self.stock.get_historical(self.end_date, self.start_date)
 
 
+class TestStockIdentity(unittest.TestCase):
+    """Tests for Stock comparison and hashing."""
+
+    def test_identity(self):
+        """Test equality, inequality and hashing by ticker."""
+        stock = Stock('AAPL')
+        self.assertEqual(stock, Stock('AAPL'))
+        self.assertFalse(stock != Stock('AAPL'))
+        self.assertNotEqual(stock, Stock('YHOO'))
+        self.assertNotEqual(stock, 'AAPL')
+        self.assertEqual(len(set([stock, Stock('AAPL'), Stock('YHOO')])), 2)
+        self.assertEqual(hash(stock), stock.get_symbol_id())
+
+    def test_set_ticker(self):
+        """Test identity following set_ticker."""
+        stock = Stock('AAPL')
+        stock.set_ticker('YHOO')
+        self.assertEqual(stock, Stock('YHOO'))
+
+    def test_pickle(self):
+        """Test pickling by ticker."""
+        stock = Stock('AAPL')
+        self.assertEqual(pickle.loads(pickle.dumps(stock)), stock)
+        with self.assertRaises(AttributeError):
+            stock.price = 1
+
+
 if __name__ == '__main__':
     sys.exit(unittest.main())
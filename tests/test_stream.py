@@ -0,0 +1,93 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+test_stream
+----------------------------------
+
+Tests for `stream` module.
+"""
+
+import asyncio
+import sys
+import unittest
+
+import rtstock
+from rtstock.stream import Subscription
+
+
+class FakeFetch(object):
+    """Quotes source returning an increasing price on every poll."""
+
+    def __init__(self):
+        """Instantiate FakeFetch class."""
+        self.polls = 0
+
+    def __call__(self, tickers_list, selected_columns):
+        """Poll the quotes."""
+        self.polls += 1
+        quotes = [{'Symbol': t, 'LastTradePriceOnly': str(self.polls)}
+                  for t in tickers_list]
+        return [dict((k, v) for k, v in q.items() if k in selected_columns)
+                for q in quotes], {}
+
+
+class TestSubscription(unittest.TestCase):
+    """Tests for Subscription class."""
+
+    def consume(self, count, delay=0.0, **kwargs):
+        """Consume count quotes, sleeping delay seconds after each one."""
+        async def main():
+            quotes = []
+            async with rtstock.subscribe(['AAPL', 'YHOO'], interval=0.01,
+                                         fetch=FakeFetch(),
+                                         **kwargs) as subscription:
+                async for quote in subscription:
+                    quotes.append(quote)
+                    await asyncio.sleep(delay)
+                    if len(quotes) == count:
+                        break
+                return quotes, subscription.metrics()
+        return asyncio.run(main())
+
+    def test_block(self):
+        """Test block policy delivering every quote in order."""
+        quotes, metrics = self.consume(6, delay=0.02, maxsize=2)
+        self.assertEqual([q['LastTradePriceOnly'] for q in quotes],
+                         ['1', '1', '2', '2', '3', '3'])
+        self.assertEqual(metrics['dropped'], 0)
+        self.assertTrue(metrics['queued'] <= 2)
+
+    def test_drop_oldest(self):
+        """Test drop_oldest policy discarding quotes of a slow consumer."""
+        quotes, metrics = self.consume(3, delay=0.05, maxsize=2,
+                                       overflow='drop_oldest')
+        self.assertTrue(metrics['dropped'] > 0)
+        self.assertTrue(metrics['queued'] <= 2)
+
+    def test_conflate(self):
+        """Test conflate policy keeping one quote per ticker."""
+        quotes, metrics = self.consume(4, delay=0.05, overflow='conflate')
+        self.assertTrue(metrics['conflated'] > 0)
+        self.assertTrue(metrics['queued'] <= 2)
+        # Conflated quotes are newer than the ones first delivered
+        self.assertTrue(int(quotes[-1]['LastTradePriceOnly']) > 1)
+
+    def test_conflate_without_symbol(self):
+        """Test conflate policy telling tickers apart without Symbol."""
+        quotes, metrics = self.consume(
+            2, overflow='conflate', selected_columns=['LastTradePriceOnly'])
+        # Both tickers of the first poll are buffered, instead of one
+        # replacing the other
+        self.assertEqual(quotes, [{'LastTradePriceOnly': '1'},
+                                  {'LastTradePriceOnly': '1'}])
+        self.assertEqual(metrics['conflated'], 0)
+
+    def test_invalid_policy(self):
+        """Test an unknown overflow policy."""
+        with self.assertRaises(ValueError):
+            Subscription(['AAPL'], overflow='unknown')
+
+
+if __name__ == '__main__':
+    sys.exit(unittest.main())
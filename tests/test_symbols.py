@@ -0,0 +1,60 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+test_symbols
+----------------------------------
+
+Tests for `symbols` module.
+"""
+
+import sys
+import unittest
+
+from rtstock.bars import BarAggregator
+from rtstock.symbols import (intern_symbol, position_index, symbol_name,
+                             symbol_table, SymbolTable, ticker_of)
+
+
+class TestSymbolTable(unittest.TestCase):
+    """Tests for SymbolTable class."""
+
+    def test_intern(self):
+        """Test interning tickers."""
+        table = SymbolTable()
+        self.assertEqual(table.intern('AAPL'), 0)
+        self.assertEqual(table.intern('YHOO'), 1)
+        self.assertEqual(table.intern('AAPL'), 0)
+        self.assertEqual(table.name(1), 'YHOO')
+        self.assertEqual(table.get('GOOGL'), None)
+        self.assertNotIn('GOOGL', table)
+        self.assertEqual(len(table), 2)
+        self.assertEqual(table.names(), ['AAPL', 'YHOO'])
+        with self.assertRaises(IndexError):
+            table.name(2)
+        with self.assertRaises(IndexError):
+            table.name(-1)
+
+    def test_global_table(self):
+        """Test the global symbol table."""
+        symbol_id = intern_symbol('AAPL')
+        self.assertIn('AAPL', symbol_table())
+        self.assertEqual(symbol_name(symbol_id), 'AAPL')
+        self.assertEqual(ticker_of(symbol_id), 'AAPL')
+        self.assertEqual(ticker_of('AAPL'), 'AAPL')
+        index = position_index(['AAPL', 'YHOO'])
+        self.assertEqual(index['YHOO'], 1)
+        self.assertEqual(index[intern_symbol('YHOO')], 1)
+
+    def test_bars(self):
+        """Test bar aggregation by symbol id."""
+        bars = BarAggregator('1m')
+        bars.update(intern_symbol('AAPL'), 10.0, timestamp=60)
+        bars.update('AAPL', 12.0, timestamp=61)
+        self.assertEqual(bars.tickers, ['AAPL'])
+        self.assertEqual(bars.current(intern_symbol('AAPL'))[:4],
+                         (10.0, 12.0, 10.0, 12.0))
+
+
+if __name__ == '__main__':
+    sys.exit(unittest.main())
@@ -0,0 +1,119 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+test_tracing
+----------------------------------
+
+Tests for `tracing` module.
+"""
+
+import json
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+try:
+    from unittest import mock
+except ImportError:
+    import mock
+
+import rtstock.utils as utils
+from rtstock import tracing
+from rtstock.stock import Stock
+
+
+class FakeResponse(object):
+    """HTTP response returned by a mocked urlopen."""
+
+    def __init__(self, body):
+        """Instantiate FakeResponse class."""
+        self.body = body
+
+    def read(self):
+        """Response body."""
+        return self.body
+
+    def info(self):
+        """Response headers."""
+        return {}
+
+
+class TestTracing(unittest.TestCase):
+    """Tests for tracing module."""
+
+    def setUp(self):
+        """SetUp."""
+        self.output_folder = tempfile.mkdtemp()
+
+    def test_disabled(self):
+        """Test spans doing nothing while disabled."""
+        self.assertFalse(tracing.is_enabled())
+        with tracing.span('request_quotes', tickers=1) as span:
+            span.set(quotes=1)
+        self.assertFalse(isinstance(span, tracing.Span))
+
+    def test_nesting(self):
+        """Test nested spans and the Chrome trace export."""
+        recorder = tracing.enable()
+        with tracing.span('outer', tickers=2):
+            with tracing.span('inner') as inner:
+                inner.set(rows=3)
+            tracing.record('queue', tracing.clock() - 1, tracing.clock())
+        with self.assertRaises(ValueError):
+            with tracing.span('failing'):
+                raise ValueError('failed')
+        spans = recorder.spans()
+        self.assertEqual([s.name for s in spans],
+                         ['inner', 'queue', 'outer', 'failing'])
+        self.assertEqual(spans[0].parent_id, spans[2].span_id)
+        self.assertEqual(spans[1].parent_id, spans[2].span_id)
+        self.assertEqual(spans[3].args['error'], 'ValueError')
+
+        path = os.path.join(self.output_folder, 'trace.json')
+        recorder.export_chrome(path)
+        with open(path) as f:
+            events = json.load(f)['traceEvents']
+        inner = [e for e in events if e['name'] == 'inner'][0]
+        self.assertEqual(inner['ph'], 'X')
+        self.assertEqual(inner['args']['rows'], 3)
+        self.assertTrue(inner['dur'] >= 0)
+
+    def test_max_spans(self):
+        """Test the recorder dropping the oldest spans."""
+        recorder = tracing.enable(tracing.TraceRecorder(max_spans=2))
+        for name in ['first', 'second', 'third']:
+            with tracing.span(name):
+                pass
+        self.assertEqual([s.name for s in recorder.spans()],
+                         ['second', 'third'])
+        self.assertEqual(recorder.dropped, 1)
+
+    def test_requests(self):
+        """Test the spans of a Stock request."""
+        spans = []
+        tracing.enable(spans.append)
+        body = json.dumps({'query': {'results': {'quote': {
+            'LastTradePriceOnly': '95.60',
+            'LastTradeTime': '4:00pm'}}}}).encode('utf-8')
+        with mock.patch.object(utils, 'urlopen',
+                               return_value=FakeResponse(body)):
+            Stock('T_TRACE').get_latest_price()
+        names = [s.name for s in spans]
+        for name in ['connect', 'transfer', 'decompress', 'decode',
+                     'request_quotes', 'Stock.get_latest_price']:
+            self.assertIn(name, names)
+        self.assertEqual(names[-1], 'Stock.get_latest_price')
+        request = spans[names.index('request_quotes')]
+        self.assertEqual(request.args['tickers'], 1)
+
+    def tearDown(self):
+        """Cleaning up."""
+        tracing.disable()
+        shutil.rmtree(self.output_folder)
+
+
+if __name__ == '__main__':
+    sys.exit(unittest.main())
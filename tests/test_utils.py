@@ -8,12 +8,31 @@ test_utils
 Tests for `utils` module.
 """
 
+import gzip
+import io
+import json
 import os
+import shutil
 import sys
+import tempfile
+import threading
+import time
 import unittest
 
+try:
+    from unittest import mock
+except ImportError:
+    import mock
+
+try:
+    from urllib.error import HTTPError
+except ImportError:
+    from urllib2 import HTTPError
+
 import rtstock.error as error
 import rtstock.utils as utils
+from rtstock.batching import AdaptiveBatcher
+from rtstock.validation import SymbolIndex
 
 
 class TestRequestQuotes(unittest.TestCase):
@@ -58,6 +77,306 @@ class TestRequestQuotes(unittest.TestCase):
         self.assertFalse(response[0]['Name'])
         self.assertFalse(response[0]['PreviousClose'])
 
+    def test_symbol_index(self):
+        """Test request_quotes matching quotes to tickers by Symbol."""
+        index = SymbolIndex()
+        quotes = [{'Symbol': 'YHOO', 'Name': 'Yahoo! Inc.'},
+                  {'Symbol': 'fake_company', 'Name': None}]
+        with mock.patch.object(utils.ProviderRouter, 'call',
+                               return_value=quotes):
+            utils.request_quotes(['AAPL', 'YHOO', 'fake_company'],
+                                 ['Symbol', 'Name'], symbol_index=index)
+        self.assertEqual(index.status('AAPL'), None)
+        self.assertTrue(index.is_valid('YHOO'))
+        self.assertTrue(index.is_invalid('fake_company'))
+        # A quote with only the symbol says nothing about the ticker
+        with mock.patch.object(utils.ProviderRouter, 'call',
+                               return_value=[{'Symbol': 'AAPL'}]):
+            utils.request_quotes(['AAPL'], ['Symbol'], symbol_index=index)
+        self.assertEqual(index.status('AAPL'), None)
+
+
+class TestRequestQuotesIsolated(unittest.TestCase):
+    """Tests for request_quotes_isolated function."""
+
+    def setUp(self):
+        """SetUp."""
+        self.tickers_list = ['T{0}'.format(i) for i in range(16)]
+        self.invalid = ['T3', 'T12']
+        self.calls = []
+
+        def fake_request_quotes(tickers_list, selected_columns, timeout=None):
+            self.calls.append(tickers_list)
+            if any(t in self.invalid for t in tickers_list):
+                raise error.RequestError('Unable to process the request.')
+            return [{'Symbol': t} for t in tickers_list]
+
+        patcher = mock.patch.object(utils, 'request_quotes',
+                                    side_effect=fake_request_quotes)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_isolates_invalid(self):
+        """Test request_quotes_isolated splitting out invalid tickers."""
+        quotes, errors = utils.request_quotes_isolated(self.tickers_list,
+                                                       ['Symbol'])
+        valid = [t for t in self.tickers_list if t not in self.invalid]
+        self.assertEqual([q['Symbol'] for q in quotes], valid)
+        self.assertEqual(sorted(errors.keys()), sorted(self.invalid))
+        for e in errors.values():
+            self.assertTrue(isinstance(e, error.RequestError))
+        # Bisection needs far fewer requests than one per ticker
+        self.assertTrue(len(self.calls) < len(self.tickers_list))
+
+    def test_all_valid(self):
+        """Test request_quotes_isolated with a single successful request."""
+        self.invalid = []
+        quotes, errors = utils.request_quotes_isolated(self.tickers_list,
+                                                       ['Symbol'])
+        self.assertEqual(len(quotes), len(self.tickers_list))
+        self.assertEqual(errors, {})
+        self.assertEqual(len(self.calls), 1)
+
+    def test_provider_outage(self):
+        """Test request_quotes_isolated not splitting on outages."""
+        def fake_request_quotes(tickers_list, selected_columns, timeout=None):
+            self.calls.append(tickers_list)
+            raise error.ProviderError('Unable to process the request.')
+
+        utils.request_quotes.side_effect = fake_request_quotes
+        quotes, errors = utils.request_quotes_isolated(self.tickers_list,
+                                                       ['Symbol'])
+        self.assertEqual(quotes, [])
+        self.assertEqual(len(self.calls), 1)
+        self.assertEqual(sorted(errors), sorted(self.tickers_list))
+        self.assertFalse(utils.is_ticker_error(errors['T0']))
+
+    def test_invalid_columns(self):
+        """Test request_quotes_isolated blaming columns nobody answers."""
+        def fake_request_quotes(tickers_list, selected_columns, timeout=None):
+            self.calls.append(tickers_list)
+            raise error.ColumnError('Unable to process the request.')
+
+        utils.request_quotes.side_effect = fake_request_quotes
+        quotes, errors = utils.request_quotes_isolated(self.tickers_list,
+                                                       ['invalid_field'])
+        self.assertEqual(quotes, [])
+        self.assertEqual(sorted(errors), sorted(self.tickers_list))
+        for e in errors.values():
+            self.assertFalse(utils.is_ticker_error(e))
+
+    def test_empty_batch(self):
+        """Test request_quotes_isolated splitting batches answered empty."""
+        def fake_request_quotes(tickers_list, selected_columns, timeout=None):
+            self.calls.append(tickers_list)
+            if 'DEAD' in tickers_list:
+                raise error.ColumnError('Unable to process the request.')
+            return [{'Symbol': t} for t in tickers_list]
+
+        utils.request_quotes.side_effect = fake_request_quotes
+        for tickers_list in (['AAPL', 'MSFT', 'DEAD', 'YHOO'],
+                             ['DEAD', 'AAPL', 'MSFT', 'YHOO']):
+            quotes, errors = utils.request_quotes_isolated(tickers_list,
+                                                           ['Name'])
+            self.assertEqual([q['Symbol'] for q in quotes],
+                             [t for t in tickers_list if t != 'DEAD'])
+            self.assertEqual(list(errors), ['DEAD'])
+            self.assertTrue(utils.is_ticker_error(errors['DEAD']))
+
+    def test_not_a_list(self):
+        """Test request_quotes_isolated passing a string."""
+        with self.assertRaises(TypeError):
+            utils.request_quotes_isolated('AAPL')
+
+
+class TestRequestQuotesBatched(unittest.TestCase):
+    """Tests for request_quotes_batched function."""
+
+    def test_batches(self):
+        """Test request_quotes_batched splitting and merging batches."""
+        tickers_list = ['T{0}'.format(i) for i in range(30)]
+        batcher = AdaptiveBatcher(initial_size=10)
+
+        def fake_isolated(tickers_list, selected_columns, timeout=None):
+            errors = {}
+            if 'T15' in tickers_list:
+                errors['T15'] = error.RequestError('Unable to process.')
+            return [{'Symbol': t} for t in tickers_list
+                    if t not in errors], errors
+
+        with mock.patch.object(utils, 'request_quotes_isolated',
+                               side_effect=fake_isolated) as request:
+            quotes, errors = utils.request_quotes_batched(
+                tickers_list, ['Symbol'], batcher=batcher)
+        self.assertEqual(request.call_count, 3)
+        self.assertEqual(len(quotes), 29)
+        self.assertEqual(list(errors.keys()), ['T15'])
+        # Only the two clean batches were observed
+        self.assertNotEqual(batcher.throughput(10), None)
+
+    def test_size_failures(self):
+        """Test batches too long for every provider lowering the size."""
+        batcher = AdaptiveBatcher(initial_size=10)
+        too_long = HTTPError('http://localhost', 414, 'URI Too Long', {},
+                             None)
+
+        def fake_isolated(tickers_list, selected_columns, timeout=None):
+            e = error.ProviderError('Unable to process the request.',
+                                    {'yql': too_long, 'yahoo': too_long})
+            return [], dict((t, e) for t in tickers_list)
+
+        with mock.patch.object(utils, 'request_quotes_isolated',
+                               side_effect=fake_isolated):
+            utils.request_quotes_batched(['T{0}'.format(i) for i in range(10)],
+                                         ['Symbol'], batcher=batcher)
+        self.assertTrue(batcher.batch_size() < 10)
+
+
+class TestDeadlines(unittest.TestCase):
+    """Tests for requests bounded by a timeout."""
+
+    def test_batched_partial(self):
+        """Test request_quotes_batched returning what arrived in time."""
+        tickers_list = ['T{0}'.format(i) for i in range(30)]
+        release = threading.Event()
+        self.addCleanup(release.set)
+
+        def fake_isolated(tickers_list, selected_columns, timeout=None):
+            if 'T15' in tickers_list:
+                release.wait(5)
+            return [{'Symbol': t} for t in tickers_list], {}
+
+        with mock.patch.object(utils, 'request_quotes_isolated',
+                               side_effect=fake_isolated):
+            quotes, errors = utils.request_quotes_batched(
+                tickers_list, ['Symbol'],
+                batcher=AdaptiveBatcher(initial_size=10), timeout=0.2,
+                workers=3)
+        self.assertEqual([q['Symbol'] for q in quotes],
+                         tickers_list[:10] + tickers_list[20:])
+        self.assertEqual(sorted(errors), sorted(tickers_list[10:20]))
+        for e in errors.values():
+            self.assertTrue(isinstance(e, error.DeadlineError))
+
+    def test_isolated_partial(self):
+        """Test request_quotes_isolated marking the tickers left."""
+        def fake_request_quotes(tickers_list, selected_columns, timeout=None):
+            if 'T0' in tickers_list:
+                raise error.RequestError('Unable to process the request.')
+            raise error.DeadlineError('Unable to process the request.')
+
+        with mock.patch.object(utils, 'request_quotes',
+                               side_effect=fake_request_quotes):
+            quotes, errors = utils.request_quotes_isolated(
+                ['T0', 'T1', 'T2', 'T3'], ['Symbol'], timeout=1)
+        self.assertEqual(quotes, [])
+        self.assertEqual(sorted(errors), ['T0', 'T1', 'T2', 'T3'])
+        self.assertTrue(isinstance(errors['T2'], error.DeadlineError))
+
+    def test_urlopen_timeout(self):
+        """Test passing the time left to urlopen."""
+        body = json.dumps({'query': {'results': {'quote': {
+            'Symbol': 'AAPL'}}}}).encode('utf-8')
+        with mock.patch.object(utils, 'urlopen',
+                               return_value=FakeResponse(body, {})) as urlopen:
+            utils.request_quotes(['T_TIMEOUT'], ['Symbol'], timeout=5)
+        timeout = urlopen.call_args[1]['timeout']
+        self.assertTrue(0 < timeout <= 5)
+
+    def test_read_deadline(self):
+        """Test responses arriving after the deadline failing."""
+        class SlowResponse(StreamResponse):
+            def read(self, size=-1):
+                time.sleep(0.02)
+                return StreamResponse.read(self, size)
+
+        body = json.dumps({'query': {'results': {'quote': {
+            'Symbol': 'AAPL', 'Name': 'A' * 100}}}}).encode('utf-8')
+        with mock.patch.object(utils, 'urlopen',
+                               side_effect=lambda r, timeout:
+                               SlowResponse(body)):
+            started = time.time()
+            with self.assertRaises(error.DeadlineError):
+                utils.request_quotes(['T_SLOW'], ['Symbol'], timeout=0.1)
+        self.assertTrue(time.time() - started < 0.5)
+
+
+class FakeResponse(object):
+    """HTTP response returned by a mocked urlopen."""
+
+    def __init__(self, body, headers):
+        """Instantiate FakeResponse class."""
+        self.stream = io.BytesIO(body)
+        self.headers = headers
+
+    def read(self, size=-1):
+        """Read at most size bytes of the body."""
+        return self.stream.read(size)
+
+    def info(self):
+        """Response headers."""
+        return self.headers
+
+
+class TestConditionalTransfers(unittest.TestCase):
+    """Tests for compressed and conditional requests."""
+
+    def setUp(self):
+        """SetUp."""
+        self.requests = []
+        self.modified = True
+        self.output_folder = tempfile.mkdtemp()
+
+        def fake_urlopen(request):
+            self.requests.append(request)
+            if not self.modified and (request.get_header('If-none-match') or
+                                      request.get_header('If-modified-since')):
+                raise HTTPError(request.get_full_url(), 304, 'Not Modified',
+                                {}, None)
+            if 'yql' in request.get_full_url():
+                data = json.dumps({'query': {'results': {'quote': {
+                    'Symbol': 'AAPL', 'Name': 'Apple Inc.'}}}})
+            else:
+                data = 'Date,Open,High,Low,Close,Volume,Adj Close\n'
+            buf = io.BytesIO()
+            with gzip.GzipFile(fileobj=buf, mode='wb') as f:
+                f.write(data.encode('utf-8'))
+            return FakeResponse(buf.getvalue(), {'Content-Encoding': 'gzip',
+                                                 'ETag': '"v1"'})
+
+        patcher = mock.patch.object(utils, 'urlopen', side_effect=fake_urlopen)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_quotes(self):
+        """Test request_quotes decoding gzip and reusing unchanged bodies."""
+        response = utils.request_quotes(['AAPL'], ['Symbol', 'Name'])
+        self.assertEqual(response[0]['Name'], 'Apple Inc.')
+        self.assertEqual(self.requests[0].get_header('Accept-encoding'),
+                         'gzip, deflate')
+        self.modified = False
+        self.assertEqual(utils.request_quotes(['AAPL'], ['Symbol', 'Name']),
+                         response)
+        self.assertEqual(self.requests[1].get_header('If-none-match'),
+                         '"v1"')
+
+    def test_download(self):
+        """Test download_historical keeping unchanged files."""
+        file_name = os.path.join(self.output_folder, 'AAPL.csv')
+        utils.download_historical(['AAPL'], self.output_folder)
+        with open(file_name, 'rb') as f:
+            self.assertEqual(f.readline(),
+                             b'Date,Open,High,Low,Close,Volume,Adj Close\n')
+        os.utime(file_name, (0, 0))
+        self.modified = False
+        utils.download_historical(['AAPL'], self.output_folder)
+        self.assertEqual(len(self.requests), 2)
+        self.assertEqual(os.path.getmtime(file_name), 0)
+
+    def tearDown(self):
+        """Cleaning up."""
+        shutil.rmtree(self.output_folder)
+
 
 class TestRequestHistorical(unittest.TestCase):
     """Tests for request_historical function."""
@@ -102,6 +421,87 @@ class TestRequestHistorical(unittest.TestCase):
                                      self.end_date, self.start_date)
 
 
+class StreamResponse(object):
+    """HTTP response returning its body in small blocks."""
+
+    def __init__(self, body, block_size=7):
+        """Instantiate StreamResponse class."""
+        self.stream = io.BytesIO(body)
+        self.block_size = block_size
+
+    def read(self, size=-1):
+        """Read at most block_size bytes."""
+        return self.stream.read(min(size, self.block_size))
+
+    def info(self):
+        """Response headers."""
+        return {}
+
+
+class TestIterHistorical(unittest.TestCase):
+    """Tests for iter_historical and iter_historical_csv functions."""
+
+    def setUp(self):
+        """SetUp."""
+        self.rows = [
+            {'Date': '2016-03-02', 'Open': '100.510002', 'High': '100.889999',
+             'Low': '99.639999', 'Close': '100.75', 'Volume': '33169600',
+             'Adj_Close': '100.140301'},
+            {'Date': '2016-03-01', 'Open': '97.650002', 'High': '100.769997',
+             'Low': '97.419998', 'Close': '100.529999', 'Volume': '50407100',
+             'Adj_Close': '99.921631'},
+        ]
+        self.output_folder = tempfile.mkdtemp()
+
+    def test_network(self):
+        """Test iter_historical parsing a response in small blocks."""
+        body = json.dumps({'query': {'count': 2, 'results': {
+            'quote': self.rows}}}).encode('utf-8')
+        with mock.patch.object(utils, 'urlopen',
+                               return_value=StreamResponse(body)):
+            rows = utils.iter_historical('AAPL', '2016-03-01', '2016-03-02')
+            self.assertEqual(next(rows), self.rows[0])
+            self.assertEqual(list(rows), self.rows[1:])
+
+    def test_network_years(self):
+        """Test iter_historical splitting long periods into years."""
+        body = json.dumps({'query': {'results': {
+            'quote': self.rows[0]}}}).encode('utf-8')
+        with mock.patch.object(utils, 'urlopen',
+                               side_effect=lambda r: StreamResponse(body)) \
+                as urlopen:
+            chunks = list(utils.iter_historical('AAPL', '2013-03-01',
+                                                '2016-03-02', chunk_size=2))
+        self.assertEqual(urlopen.call_count, 3)
+        self.assertEqual([len(c['Date']) for c in chunks], [2, 1])
+
+    def test_network_invalid(self):
+        """Test iter_historical with an invalid ticker."""
+        body = b'{"query": {"count": 0, "results": null}}'
+        with mock.patch.object(utils, 'urlopen',
+                               return_value=StreamResponse(body)):
+            with self.assertRaises(error.RequestError):
+                list(utils.iter_historical('fake_ticker', '2016-03-01',
+                                           '2016-03-02'))
+
+    def test_csv(self):
+        """Test iter_historical_csv reading a downloaded file."""
+        file_name = os.path.join(self.output_folder, 'AAPL.csv')
+        with open(file_name, 'w') as f:
+            f.write('Date,Open,High,Low,Close,Volume,Adj Close\n')
+            for row in self.rows:
+                f.write(','.join(row[c] for c in utils.HISTORICAL_COLUMNS) +
+                        '\n')
+        self.assertEqual(list(utils.iter_historical_csv(file_name)),
+                         self.rows)
+        chunks = list(utils.iter_historical_csv(file_name, chunk_size=1))
+        self.assertEqual(chunks[1]['Adj_Close'], ['99.921631'])
+
+    def tearDown(self):
+        """Cleaning up."""
+        shutil.rmtree(self.output_folder)
+
+
 class TestDownloadHistorical(unittest.TestCase):
     """Tests for download_historical function."""
 
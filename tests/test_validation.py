@@ -0,0 +1,90 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+test_validation
+----------------------------------
+
+Tests for `validation` module.
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+try:
+    from unittest import mock
+except ImportError:
+    import mock
+
+import rtstock.error as error
+import rtstock.validation as validation
+from rtstock.validation import SymbolIndex
+
+
+class TestSymbolIndex(unittest.TestCase):
+    """Tests for SymbolIndex class."""
+
+    def setUp(self):
+        """SetUp."""
+        self.folder = tempfile.mkdtemp()
+        self.path = os.path.join(self.folder, 'symbols.json')
+        self.index = SymbolIndex(self.path)
+
+    def test_status(self):
+        """Test marking tickers."""
+        self.assertEqual(self.index.status('AAPL'), None)
+        self.index.mark_valid('AAPL')
+        self.index.mark_invalid('fake_ticker')
+        self.assertTrue(self.index.is_valid('AAPL'))
+        self.assertTrue(self.index.is_invalid('fake_ticker'))
+        self.assertEqual(self.index.filter(['fake_ticker', 'AAPL', 'YHOO']),
+                         (['AAPL', 'YHOO'], ['fake_ticker']))
+
+    def test_expiry(self):
+        """Test entries expiring."""
+        index = SymbolIndex(ttl=-1)
+        index.mark_invalid('fake_ticker')
+        self.assertEqual(index.status('fake_ticker'), None)
+        self.assertEqual(len(index), 0)
+
+    def test_persistence(self):
+        """Test saving and loading the index."""
+        self.index.mark_invalid('fake_ticker')
+        self.index.save()
+        index = SymbolIndex(self.path)
+        self.assertTrue(index.is_invalid('fake_ticker'))
+
+    def test_validate(self):
+        """Test validate requesting only unknown tickers."""
+        self.index.mark_invalid('dead')
+        quotes = [{'Symbol': 'AAPL', 'Name': 'Apple Inc.'},
+                  {'Symbol': 'fake_ticker', 'Name': None}]
+        with mock.patch.object(validation, 'request_quotes_isolated',
+                               return_value=(quotes, {})) as request:
+            result = self.index.validate(['AAPL', 'fake_ticker', 'dead'])
+        request.assert_called_once_with(['AAPL', 'fake_ticker'],
+                                        ['Symbol', 'Name'])
+        self.assertEqual(result, {'AAPL': True, 'fake_ticker': False,
+                                  'dead': False})
+        self.assertTrue(os.path.exists(self.path))
+
+    def test_validate_outage(self):
+        """Test validate leaving tickers unknown during an outage."""
+        outage = error.ProviderError('Unable to process the request.')
+        errors = {'AAPL': outage, 'fake_ticker': outage}
+        with mock.patch.object(validation, 'request_quotes_isolated',
+                               return_value=([], errors)):
+            result = self.index.validate(['AAPL', 'fake_ticker'])
+        self.assertEqual(result, {'AAPL': None, 'fake_ticker': None})
+        self.assertEqual(self.index.status('AAPL'), None)
+
+    def tearDown(self):
+        """Cleaning up."""
+        shutil.rmtree(self.folder)
+
+
+if __name__ == '__main__':
+    sys.exit(unittest.main())